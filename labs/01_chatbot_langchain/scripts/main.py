@@ -10,7 +10,7 @@ from pathlib import Path
 # Adiciona o diretório raiz ao path para que os imports funcionem
 sys.path.append(str(Path(__file__).parent.parent))
 
-from src.utils.logging_config import setup_logging
+from src.utils.logging_config import setup_logging, log_metrics
 from src.utils.config import load_config
 from src.core.chatbot import ChatbotEngine
 
@@ -47,8 +47,11 @@ def display_response(pergunta, resultado):
     # Exibe métricas de forma amigável
     print(f"📊 Métricas:")
     print(f"   ⏱️  Tempo de resposta: {resultado['response_time']:.3f}s")
-    print(f"   🔤 Tokens utilizados: {resultado['tokens_used']}")
+    print(f"   🔤 Tokens utilizados: {resultado['tokens_used']} "
+          f"(prompt {resultado.get('prompt_tokens', 0)} | resposta {resultado.get('completion_tokens', 0)})")
     print(f"   🎯 Confiança: {resultado['confidence']:.2f}")
+    if resultado.get("cache_hit"):
+        print("   💾 Resposta do cache (sem chamada à API)")
     
     if not resultado["success"]:
         print(f"   ❌ Erro: {resultado['error_message']}")
@@ -61,7 +64,7 @@ def main():
     # Carrega configurações e inicializa chatbot
     try:
         config = load_config()
-        chatbot = ChatbotEngine(config)
+        chatbot = ChatbotEngine(config, logger)
         logger.info("Chatbot inicializado com sucesso.")
     except Exception as e:
         print(f"❌ Erro ao inicializar chatbot: {e}")
@@ -95,7 +98,7 @@ def main():
             
             # Log da resposta e métricas
             logger.info(f"Resposta: {resultado['response']}")
-            logger.info(f"Métricas: tempo={resultado['response_time']:.3f}s, tokens={resultado['tokens_used']}, confiança={resultado['confidence']:.2f}")
+            log_metrics(logger, resultado)
             
             if not resultado["success"]:
                 logger.error(f"Erro no processamento: {resultado['error_message']}")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Executa a suíte de testes do arquivo de entrada com requisições concorrentes
+Útil para conjuntos grandes de queries de regressão
+"""
+
+import sys
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+# Adiciona o diretório raiz ao path para que os imports funcionem
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.logging_config import setup_logging
+from src.utils.config import load_config
+from src.utils.metrics import MetricsCollector
+from src.utils.testing import TestRunner
+from src.utils.reporting import generate_report
+from src.core.chatbot import ChatbotEngine
+
+def parse_args():
+    """Lê os argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Executa os testes do chatbot em paralelo")
+    parser.add_argument("--concurrency", "-c", type=int, help="Requisições simultâneas (padrão: TEST_CONCURRENCY)")
+    parser.add_argument("--timeout", type=float, help="Timeout por requisição em segundos (padrão: REQUEST_TIMEOUT)")
+    parser.add_argument("--input", "-i", help="Arquivo de queries (padrão: input/inputs.txt)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    logger = setup_logging("logs/run_tests.log")
+
+    try:
+        config = load_config()
+        if args.timeout:
+            config["request_timeout"] = args.timeout
+        if args.input:
+            config["test_queries_file"] = args.input
+        chatbot = ChatbotEngine(config, logger)
+    except Exception as e:
+        print(f"❌ Erro ao inicializar chatbot: {e}")
+        logger.error(f"Erro na inicialização: {e}")
+        return 1
+
+    runner = TestRunner(config, chatbot, MetricsCollector())
+    queries = runner.load_test_queries()
+    concurrency = args.concurrency or config["test_concurrency"]
+
+    print("🧪 TESTES DO CHATBOT LANGCHAIN")
+    print("=" * 60)
+    print(f"📝 {len(queries)} queries | concorrência: {concurrency} | timeout: {config['request_timeout']:.0f}s")
+
+    results = runner.run_all_tests(queries, concurrency)
+    summary = results["summary"]
+    execution = results["execution"]
+
+    print("\n📈 RESUMO DOS TESTES")
+    print("=" * 60)
+    print(f"✅ Queries bem-sucedidas: {summary['successful_tests']}/{summary['total_tests']}")
+    print(f"📊 Taxa de sucesso: {summary['success_rate']:.1f}%")
+    print(f"⏱️  Tempo total (parede): {execution['wall_time']:.3f}s")
+    print(f"⏱️  Latência somada: {execution['summed_latency']:.3f}s ({execution['speedup']:.1f}x)")
+    print(f"🔤 Total de tokens: {summary['total_tokens_used']} "
+          f"(prompt {summary['total_prompt_tokens']} | resposta {summary['total_completion_tokens']})")
+    print(f"🚀 Vazão: {execution['tokens_per_minute']:.0f} tokens/min")
+    if chatbot.response_cache is not None:
+        print(f"💾 Respostas do cache: {summary['cache_hits']}/{summary['total_tests']} "
+              f"({summary['cache_hit_rate']:.1f}%), {summary['total_cached_tokens']} tokens evitados")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_file = f"metrics/test_report_{timestamp}.json"
+    generate_report(results, report_file, f"metrics/test_metrics_{timestamp}.json")
+    print(f"📝 Relatório salvo em: {report_file}")
+
+    logger.info(f"Testes concluídos: {summary['successful_tests']}/{summary['total_tests']} sucessos "
+                f"em {execution['wall_time']:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,7 +11,7 @@ from pathlib import Path
 # Adiciona o diretório raiz ao path para que os imports funcionem
 sys.path.append(str(Path(__file__).parent.parent))
 
-from src.utils.logging_config import setup_logging
+from src.utils.logging_config import setup_logging, log_metrics
 from src.utils.config import load_config
 from src.core.chatbot import ChatbotEngine
 
@@ -25,7 +25,7 @@ def run_test_queries():
     # Carrega configurações e inicializa chatbot
     try:
         config = load_config()
-        chatbot = ChatbotEngine(config)
+        chatbot = ChatbotEngine(config, logger)
         logger.info("Chatbot inicializado para testes.")
     except Exception as e:
         print(f"❌ Erro ao inicializar chatbot: {e}")
@@ -66,7 +66,8 @@ def run_test_queries():
             print(f"🤖 Resposta: {response_preview}")
             
             # Exibe métricas
-            print(f"📊 Tempo: {resultado['response_time']:.3f}s | Tokens: {resultado['tokens_used']} | Confiança: {resultado['confidence']:.2f}")
+            cache_info = " | 💾 cache" if resultado.get("cache_hit") else ""
+            print(f"📊 Tempo: {resultado['response_time']:.3f}s | Tokens: {resultado['tokens_used']} | Confiança: {resultado['confidence']:.2f}{cache_info}")
             
             if resultado["success"]:
                 successful_queries += 1
@@ -76,7 +77,7 @@ def run_test_queries():
                 print(f"❌ Erro: {resultado['error_message']}")
             
             # Log da interação
-            logger.info(f"Teste {i}: Pergunta='{pergunta}' | Sucesso={resultado['success']} | Tempo={resultado['response_time']:.3f}s | Tokens={resultado['tokens_used']}")
+            log_metrics(logger, resultado, test_index=i, query=pergunta)
             
         except Exception as e:
             print(f"❌ Erro inesperado: {e}")
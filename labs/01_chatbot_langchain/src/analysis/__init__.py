@@ -3,11 +3,29 @@
 Módulo Analysis - Análise de logs e métricas
 """
 
-from .analyze_logs import load_json_logs, extract_metrics_from_logs, print_metrics, save_metrics_report
+from .analyze_logs import (
+    LogAggregate, analyze_log_files, expand_log_paths,
+    load_json_logs, extract_metrics_from_logs, print_metrics, save_metrics_report
+)
+from .incremental import AnalysisCheckpoint, analyze_incremental, follow_log
+from .timeseries import TimeSeriesAggregate, parse_window, save_timeseries
+from .traces import TraceAnalysis, analyze_traces, print_traces
 
 __all__ = [
+    'LogAggregate',
+    'analyze_log_files',
+    'expand_log_paths',
+    'AnalysisCheckpoint',
+    'analyze_incremental',
+    'follow_log',
+    'TimeSeriesAggregate',
+    'parse_window',
+    'save_timeseries',
+    'TraceAnalysis',
+    'analyze_traces',
+    'print_traces',
     'load_json_logs',
     'extract_metrics_from_logs',
     'print_metrics',
     'save_metrics_report'
-] 
\ No newline at end of file
+]
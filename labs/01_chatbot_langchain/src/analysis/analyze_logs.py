@@ -1,27 +1,363 @@
 #!/usr/bin/env python3
 """
 Script para analisar logs JSON e calcular métricas
+
+Os arquivos são lidos em streaming: arquivos grandes são mapeados em memória
+(mmap) e divididos em faixas de bytes processadas em paralelo por um pool de
+processos; cada faixa produz um agregado parcial (LogAggregate) que é
+combinado com os demais. A memória usada não depende do tamanho dos logs.
+Aceita vários arquivos e padrões glob, incluindo logs rotacionados em gzip.
+
+As métricas são lidas dos eventos estruturados ("event": "metrics", ver
+src.utils.logging_config.log_metrics) pelos campos tipados, sem interpretar a
+mensagem; logs antigos com mensagens "Métricas: ..." continuam suportados.
+
+Uso: python -m src.analysis.analyze_logs "logs/app.log*" -o metrics/report.json
+     python -m src.analysis.analyze_logs logs/app.log --checkpoint metrics/analysis_checkpoint.json
+     python -m src.analysis.analyze_logs logs/app.log --follow
+     python -m src.analysis.analyze_logs "logs/app.log*" --timeseries 1m 1h --timeseries-output metrics/series.csv
+     python -m src.analysis.analyze_logs "logs/app.log*" --traces --top 5 --slow-ms 2000
 """
 
+import os
+import glob
+import gzip
 import json
+import mmap
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from datetime import datetime
-import statistics
+
+from .sketches import Distribution
+
+# Tipo dos eventos de métricas (mesmo valor de src.utils.logging_config.METRICS_EVENT)
+METRICS_EVENT = "metrics"
+
+# Marcador das mensagens de métricas em texto livre (logs antigos)
+METRICS_MARKER = "Métricas:"
+
+# Filtros verificados nos bytes da linha, antes do parse JSON
+_METRICS_EVENT_BYTES = json.dumps({"event": METRICS_EVENT})[1:-1].encode("utf-8")
+_METRICS_MARKER_BYTES = METRICS_MARKER.encode("utf-8")
+
+# Faixa de bytes processada por tarefa
+DEFAULT_CHUNK_SIZE = 32 * 1024 * 1024
+
+# (arquivo, início, fim); fim None = arquivo gzip lido do início (bytes
+# descomprimidos a pular) até o fim
+ScanTask = Tuple[str, int, Optional[int]]
+
+class LogAggregate:
+    """Agregado parcial e combinável das métricas extraídas dos logs"""
+
+    def __init__(self):
+        self.total_logs = 0
+        self.metric_logs = 0
+        self.invalid_lines = 0
+        self.cache_hits = 0
+        self.failed_queries = 0
+        self.bytes_read = 0
+        self.response_time = Distribution()
+        self.tokens = Distribution()
+        self.confidence = Distribution()
+
+    def add_line(self, line: bytes):
+        """Processa uma linha do log (só decodifica o JSON das linhas de métricas)"""
+        self.bytes_read += len(line)
+        if not line.strip():
+            return
+        self.total_logs += 1
+        if _METRICS_EVENT_BYTES not in line and _METRICS_MARKER_BYTES not in line:
+            return
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            self.invalid_lines += 1
+            return
+        self._add_metrics_entry(entry)
+
+    def add_entry(self, entry: Dict[str, Any]):
+        """Processa uma entrada já decodificada"""
+        self.total_logs += 1
+        self._add_metrics_entry(entry)
+
+    def _add_metrics_entry(self, entry: Dict[str, Any]):
+        if entry.get("event") == METRICS_EVENT:
+            self._add_metrics_event(entry)
+        elif str(entry.get("message", "")).startswith(METRICS_MARKER):
+            self._add_metrics_message(entry)
+
+    def _add_metrics_event(self, entry: Dict[str, Any]):
+        """Evento estruturado: lê os campos tipados"""
+        self.metric_logs += 1
+        try:
+            response_time = float(entry["response_time"])
+            tokens = int(entry["tokens_used"])
+            confidence = float(entry["confidence"])
+        except (KeyError, TypeError, ValueError):
+            self.invalid_lines += 1
+            return
+        self._add_query(entry, response_time, tokens, confidence,
+                        entry.get("cache_hit") is True, entry.get("success") is not False)
+
+    def _add_metrics_message(self, entry: Dict[str, Any]):
+        """Mensagem em texto livre dos logs antigos"""
+        self.metric_logs += 1
+
+        # Parse da mensagem de métricas
+        # Exemplo: "Métricas: tempo=1.234s, tokens=150, confiança=0.85, cache=False"
+        values: Dict[str, Any] = {}
+        try:
+            parts = entry["message"].split(METRICS_MARKER)[1].strip().split(", ")
+            for part in parts:
+                if "tempo=" in part:
+                    values["response_time"] = float(part.split("=")[1].replace("s", ""))
+                elif "tokens=" in part:
+                    values["tokens"] = int(part.split("=")[1])
+                elif "confiança=" in part:
+                    values["confidence"] = float(part.split("=")[1])
+                elif "cache=" in part:
+                    values["cache_hit"] = part.split("=")[1] == "True"
+        except (IndexError, ValueError):
+            self.invalid_lines += 1
+            return
+        self._add_query(entry, values.get("response_time"), values.get("tokens"),
+                        values.get("confidence"), values.get("cache_hit", False), True)
+
+    def _add_query(self, entry: Dict[str, Any], response_time: Optional[float], tokens: Optional[int],
+                   confidence: Optional[float], cache_hit: bool, success: bool):
+        """Acumula os valores de uma query (ponto de extensão para agregados derivados)"""
+        if response_time is not None:
+            self.response_time.add(response_time)
+        if tokens is not None:
+            self.tokens.add(tokens)
+        if confidence is not None:
+            self.confidence.add(confidence)
+        self.cache_hits += cache_hit
+        self.failed_queries += not success
+
+    def merge(self, other: "LogAggregate") -> "LogAggregate":
+        """Combina com outro agregado parcial"""
+        self.total_logs += other.total_logs
+        self.metric_logs += other.metric_logs
+        self.invalid_lines += other.invalid_lines
+        self.cache_hits += other.cache_hits
+        self.failed_queries += other.failed_queries
+        self.bytes_read += other.bytes_read
+        self.response_time.merge(other.response_time)
+        self.tokens.merge(other.tokens)
+        self.confidence.merge(other.confidence)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Estado serializável em JSON (checkpoints)"""
+        return {
+            "total_logs": self.total_logs,
+            "metric_logs": self.metric_logs,
+            "invalid_lines": self.invalid_lines,
+            "cache_hits": self.cache_hits,
+            "failed_queries": self.failed_queries,
+            "bytes_read": self.bytes_read,
+            "response_time": self.response_time.to_dict(),
+            "tokens": self.tokens.to_dict(),
+            "confidence": self.confidence.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogAggregate":
+        aggregate = cls()
+        for name in ("total_logs", "metric_logs", "invalid_lines", "cache_hits", "failed_queries", "bytes_read"):
+            setattr(aggregate, name, data.get(name, 0))
+        for name in ("response_time", "tokens", "confidence"):
+            setattr(aggregate, name, Distribution.from_dict(data[name]))
+        return aggregate
+
+    def to_metrics(self) -> Dict[str, Any]:
+        """
+        Métricas finais (mesmo formato de extract_metrics_from_logs)
+
+        As medianas vêm do sketch de quantis (erro relativo de até 1%).
+        """
+        if not self.metric_logs:
+            return {
+                "error": "Nenhum log de métricas encontrado",
+                "total_logs": self.total_logs,
+                "metric_logs": 0
+            }
+
+        rt, tk, cf = self.response_time.stats, self.tokens.stats, self.confidence.stats
+        return {
+            "total_logs": self.total_logs,
+            "metric_logs": self.metric_logs,
+            "invalid_lines": self.invalid_lines,
+            "total_queries": rt.count,
+            "cache_hits": self.cache_hits,
+            "failed_queries": self.failed_queries,
+            "response_time": {
+                "count": rt.count,
+                "mean": rt.mean,
+                "median": self.response_time.quantile(0.5),
+                "min": rt.min if rt.count else 0,
+                "max": rt.max if rt.count else 0,
+                "std": rt.std
+            },
+            "tokens": {
+                "count": tk.count,
+                "mean": tk.mean,
+                "median": self.tokens.quantile(0.5),
+                "min": int(tk.min) if tk.count else 0,
+                "max": int(tk.max) if tk.count else 0,
+                "total": int(tk.total)
+            },
+            "confidence": {
+                "count": cf.count,
+                "mean": cf.mean,
+                "median": self.confidence.quantile(0.5),
+                "min": cf.min if cf.count else 0,
+                "max": cf.max if cf.count else 0
+            }
+        }
+
+# Cria um agregado vazio (LogAggregate ou subclasse)
+AggregateFactory = Callable[[], LogAggregate]
+
+def expand_log_paths(patterns: Iterable[str]) -> List[str]:
+    """
+    Expande arquivos e padrões glob (ex.: "logs/app.log*")
+
+    Args:
+        patterns: Caminhos ou padrões glob
+
+    Returns:
+        Arquivos existentes, sem repetição, na ordem dos padrões
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if Path(path).is_file() and path not in paths:
+                paths.append(path)
+    return paths
+
+def is_gzip(path: str) -> bool:
+    """Verifica pela assinatura se o arquivo é gzip"""
+    with open(path, "rb") as f:
+        return f.read(2) == b"\x1f\x8b"
+
+def plan_scan_tasks(paths: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[ScanTask]:
+    """
+    Divide os arquivos em faixas de bytes
+
+    Arquivos gzip não permitem acesso aleatório e viram uma tarefa cada.
+    """
+    tasks: List[ScanTask] = []
+    for path in paths:
+        if is_gzip(path):
+            tasks.append((path, 0, None))
+        else:
+            tasks.extend(split_range(path, 0, os.path.getsize(path), chunk_size))
+    return tasks
+
+def split_range(path: str, start: int, end: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[ScanTask]:
+    """Divide a faixa [start, end) de um arquivo texto em tarefas de até chunk_size bytes"""
+    return [(path, offset, min(offset + chunk_size, end)) for offset in range(start, end, chunk_size)]
+
+def iter_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    """
+    Linhas cujo primeiro byte está em [start, end)
+
+    A linha que cruza o limite da faixa pertence à faixa onde começa, então
+    faixas vizinhas nunca processam a mesma linha.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if start > 0:
+                newline = mm.find(b"\n", start - 1)
+                if newline == -1 or newline + 1 >= end:
+                    return
+                start = newline + 1
+            mm.seek(start)
+            while mm.tell() < end:
+                line = mm.readline()
+                if not line:
+                    break
+                yield line
+
+def scan_task(task: ScanTask, factory: AggregateFactory = LogAggregate) -> LogAggregate:
+    """Processa uma tarefa (faixa de bytes ou arquivo gzip) e retorna o agregado parcial"""
+    path, start, end = task
+    aggregate = factory()
+    if end is None:
+        with gzip.open(path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                aggregate.add_line(line)
+    else:
+        for line in iter_range(path, start, end):
+            aggregate.add_line(line)
+    return aggregate
+
+def analyze_log_files(patterns: Iterable[str], workers: Optional[int] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      factory: AggregateFactory = LogAggregate) -> LogAggregate:
+    """
+    Analisa um ou mais arquivos de log em paralelo
+
+    Args:
+        patterns: Arquivos ou padrões glob (.gz são descomprimidos em streaming)
+        workers: Processos do pool (padrão: número de CPUs; 1 = sem pool)
+        chunk_size: Tamanho das faixas de bytes
+        factory: Cria os agregados parciais (ex.: TimeSeriesAggregate)
+
+    Returns:
+        Agregado com todas as métricas
+    """
+    tasks = plan_scan_tasks(expand_log_paths(patterns), chunk_size)
+    total = factory()
+    for aggregate in run_scan_tasks(tasks, workers, factory):
+        total.merge(aggregate)
+    return total
+
+def run_scan_tasks(tasks: List[ScanTask], workers: Optional[int] = None,
+                   factory: AggregateFactory = LogAggregate) -> List[LogAggregate]:
+    """
+    Executa as tarefas em um pool de processos
+
+    Args:
+        tasks: Tarefas de leitura
+        workers: Processos do pool (padrão: número de CPUs; 1 = sem pool)
+        factory: Cria os agregados parciais (precisa ser serializável com pickle)
+
+    Returns:
+        Agregados parciais, na ordem das tarefas
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        return [scan_task(task, factory) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        return list(executor.map(partial(scan_task, factory=factory), tasks))
 
 def load_json_logs(log_file: str) -> List[Dict[str, Any]]:
     """
     Carrega logs em formato JSON (uma linha por entrada)
-    
+
+    Mantém todas as entradas em memória; para arquivos grandes use
+    analyze_log_files.
+
     Args:
-        log_file: Caminho para o arquivo de log
-        
+        log_file: Caminho para o arquivo de log (texto ou gzip)
+
     Returns:
         Lista de entradas de log como dicionários
     """
     logs = []
-    with open(log_file, 'r', encoding='utf-8') as f:
+    opener = gzip.open if is_gzip(log_file) else open
+    with opener(log_file, 'rt', encoding='utf-8') as f:
         for line in f:
             line = line.strip()
             if line:
@@ -36,102 +372,41 @@ def load_json_logs(log_file: str) -> List[Dict[str, Any]]:
 def extract_metrics_from_logs(logs: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Extrai métricas dos logs
-    
+
     Args:
         logs: Lista de entradas de log
-        
+
     Returns:
         Dicionário com métricas calculadas
     """
-    # Filtra logs relacionados a métricas
-    metric_logs = []
+    aggregate = LogAggregate()
     for log in logs:
-        if "Métricas:" in log.get("message", ""):
-            metric_logs.append(log)
-    
-    if not metric_logs:
-        return {
-            "error": "Nenhum log de métricas encontrado",
-            "total_logs": len(logs),
-            "metric_logs": 0
-        }
-    
-    # Extrai métricas dos logs
-    response_times = []
-    tokens_used = []
-    confidences = []
-    
-    for log in metric_logs:
-        message = log.get("message", "")
-        if "Métricas:" in message:
-            # Parse da mensagem de métricas
-            # Exemplo: "Métricas: tempo=1.234s, tokens=150, confiança=0.85"
-            try:
-                parts = message.split("Métricas:")[1].strip().split(", ")
-                for part in parts:
-                    if "tempo=" in part:
-                        time_str = part.split("=")[1].replace("s", "")
-                        response_times.append(float(time_str))
-                    elif "tokens=" in part:
-                        tokens_str = part.split("=")[1]
-                        tokens_used.append(int(tokens_str))
-                    elif "confiança=" in part:
-                        conf_str = part.split("=")[1]
-                        confidences.append(float(conf_str))
-            except (IndexError, ValueError) as e:
-                print(f"Erro ao parsear métricas: {message}")
-                continue
-    
-    # Calcula estatísticas
-    metrics = {
-        "total_logs": len(logs),
-        "metric_logs": len(metric_logs),
-        "total_queries": len(response_times),
-        "response_time": {
-            "count": len(response_times),
-            "mean": statistics.mean(response_times) if response_times else 0,
-            "median": statistics.median(response_times) if response_times else 0,
-            "min": min(response_times) if response_times else 0,
-            "max": max(response_times) if response_times else 0,
-            "std": statistics.stdev(response_times) if len(response_times) > 1 else 0
-        },
-        "tokens": {
-            "count": len(tokens_used),
-            "mean": statistics.mean(tokens_used) if tokens_used else 0,
-            "median": statistics.median(tokens_used) if tokens_used else 0,
-            "min": min(tokens_used) if tokens_used else 0,
-            "max": max(tokens_used) if tokens_used else 0,
-            "total": sum(tokens_used) if tokens_used else 0
-        },
-        "confidence": {
-            "count": len(confidences),
-            "mean": statistics.mean(confidences) if confidences else 0,
-            "median": statistics.median(confidences) if confidences else 0,
-            "min": min(confidences) if confidences else 0,
-            "max": max(confidences) if confidences else 0
-        }
-    }
-    
-    return metrics
+        aggregate.add_entry(log)
+    return aggregate.to_metrics()
 
 def print_metrics(metrics: Dict[str, Any]):
     """
     Exibe métricas formatadas
-    
+
     Args:
         metrics: Dicionário com métricas
     """
     if "error" in metrics:
         print(f"❌ {metrics['error']}")
         return
-    
+
     print("📊 MÉTRICAS CALCULADAS DOS LOGS")
     print("=" * 50)
     print(f"📝 Total de logs: {metrics['total_logs']}")
     print(f"🔍 Logs com métricas: {metrics['metric_logs']}")
     print(f"💬 Total de queries: {metrics['total_queries']}")
+    print(f"💾 Respostas do cache: {metrics['cache_hits']}")
+    if metrics.get("failed_queries"):
+        print(f"❌ Queries com erro: {metrics['failed_queries']}")
+    if metrics.get("invalid_lines"):
+        print(f"⚠️  Linhas inválidas: {metrics['invalid_lines']}")
     print()
-    
+
     print("⏱️  TEMPO DE RESPOSTA")
     print("-" * 30)
     rt = metrics['response_time']
@@ -141,7 +416,7 @@ def print_metrics(metrics: Dict[str, Any]):
     print(f"  Máximo: {rt['max']:.3f}s")
     print(f"  Desvio padrão: {rt['std']:.3f}s")
     print()
-    
+
     print("🔤 TOKENS UTILIZADOS")
     print("-" * 30)
     tk = metrics['tokens']
@@ -151,7 +426,7 @@ def print_metrics(metrics: Dict[str, Any]):
     print(f"  Máximo: {tk['max']}")
     print(f"  Total: {tk['total']}")
     print()
-    
+
     print("🎯 CONFIANÇA")
     print("-" * 30)
     cf = metrics['confidence']
@@ -163,7 +438,7 @@ def print_metrics(metrics: Dict[str, Any]):
 def save_metrics_report(metrics: Dict[str, Any], output_file: str):
     """
     Salva relatório de métricas em arquivo JSON
-    
+
     Args:
         metrics: Dicionário com métricas
         output_file: Arquivo de saída
@@ -173,42 +448,123 @@ def save_metrics_report(metrics: Dict[str, Any], output_file: str):
         "timestamp": datetime.now().isoformat(),
         "metrics": metrics
     }
-    
+
     # Cria diretório se não existir
     Path(output_file).parent.mkdir(parents=True, exist_ok=True)
-    
+
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
-    
+
     print(f"📄 Relatório salvo em: {output_file}")
 
-def main():
+def build_arg_parser(default_log: Optional[str] = None) -> argparse.ArgumentParser:
+    """
+    Argumentos de linha de comando da análise
+
+    Args:
+        default_log: Log usado quando nenhum arquivo é informado (None = obrigatório)
+    """
     parser = argparse.ArgumentParser(description="Analisa logs JSON e calcula métricas")
-    parser.add_argument("log_file", help="Arquivo de log para analisar")
+    if default_log:
+        parser.add_argument("log_files", nargs="*", default=[default_log],
+                            help=f"Arquivos ou padrões glob (padrão: {default_log})")
+    else:
+        parser.add_argument("log_files", nargs="+", help="Arquivos ou padrões glob (ex.: 'logs/app.log*')")
     parser.add_argument("--output", "-o", help="Arquivo de saída para o relatório")
-    
-    args = parser.parse_args()
-    
-    # Verifica se arquivo existe
-    if not Path(args.log_file).exists():
-        print(f"❌ Arquivo não encontrado: {args.log_file}")
+    parser.add_argument("--workers", "-w", type=int, help="Processos paralelos (padrão: número de CPUs)")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_SIZE // (1024 * 1024),
+                        help="Tamanho das faixas de bytes por tarefa, em MB (padrão: 32)")
+    parser.add_argument("--checkpoint", "-c",
+                        help="Checkpoint da análise incremental: processa só os bytes novos desde a última execução")
+    parser.add_argument("--follow", "-f", action="store_true",
+                        help="Acompanha o primeiro arquivo ao vivo (p50/p95 e vazão na janela móvel)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Segundos entre leituras no --follow (padrão: 2)")
+    parser.add_argument("--window", type=float, default=60.0, help="Janela móvel do --follow em segundos (padrão: 60)")
+    parser.add_argument("--timeseries", "-t", nargs="+", metavar="JANELA",
+                        help="Série temporal por janela de tempo (ex.: 1m 5m 1h): vazão, taxa de erro e p50/p95/p99")
+    parser.add_argument("--timeseries-output",
+                        help="Arquivo .csv ou .json da série (com várias janelas: nome_1m.csv, nome_5m.csv...)")
+    parser.add_argument("--traces", action="store_true",
+                        help="Reconstrói as requisições pelos spans: tempo por estágio e waterfall das mais lentas")
+    parser.add_argument("--top", type=int, default=5, help="Requisições mais lentas exibidas no --traces (padrão: 5)")
+    parser.add_argument("--slow-ms", type=float,
+                        help="Duração a partir da qual a requisição é lenta no --traces (padrão: as --top mais lentas)")
+    parser.add_argument("--traces-output", help="Arquivo JSON com o resumo e os waterfalls do --traces")
+    return parser
+
+def run_analysis(args: argparse.Namespace):
+    """Executa a análise com os argumentos já lidos"""
+    if args.follow:
+        from .incremental import follow_log
+        follow_log(args.log_files[0], interval=args.interval, window_seconds=args.window)
+        return
+
+    paths = expand_log_paths(args.log_files)
+    if not paths:
+        print(f"❌ Arquivo não encontrado: {', '.join(args.log_files)}")
+        return
+
+    print(f"📖 Analisando logs: {', '.join(paths)}")
+
+    if args.traces:
+        from .traces import analyze_traces, print_traces, save_traces_report
+        report = analyze_traces(paths, top=args.top, slow_ms=args.slow_ms).report()
+        print_traces(report)
+        if args.traces_output:
+            save_traces_report(report, args.traces_output)
         return
-    
-    print(f"📖 Analisando logs: {args.log_file}")
-    
-    # Carrega logs
-    logs = load_json_logs(args.log_file)
-    print(f"📊 Carregados {len(logs)} logs")
-    
+
+    windows = []
+    if args.timeseries:
+        from .timeseries import parse_window
+        if args.checkpoint:
+            print("❌ --timeseries não pode ser combinado com --checkpoint")
+            return
+        try:
+            windows = [parse_window(window) for window in args.timeseries]
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+
+    # Processa os arquivos em paralelo
+    chunk_size = args.chunk_mb * 1024 * 1024
+    if windows:
+        from .timeseries import TimeSeriesAggregate
+        aggregate = analyze_log_files(paths, workers=args.workers, chunk_size=chunk_size,
+                                      factory=partial(TimeSeriesAggregate, windows))
+        print(f"📊 Processados {aggregate.total_logs} logs")
+    elif args.checkpoint:
+        from .incremental import analyze_incremental
+        aggregate, new_data = analyze_incremental(paths, args.checkpoint, workers=args.workers, chunk_size=chunk_size)
+        print(f"📊 Processados {new_data.total_logs} logs novos ({new_data.bytes_read / 1024 / 1024:.1f} MB); "
+              f"{aggregate.total_logs} no total")
+        print(f"💾 Checkpoint atualizado: {args.checkpoint}")
+    else:
+        aggregate = analyze_log_files(paths, workers=args.workers, chunk_size=chunk_size)
+        print(f"📊 Processados {aggregate.total_logs} logs")
+
     # Calcula métricas
-    metrics = extract_metrics_from_logs(logs)
-    
+    metrics = aggregate.to_metrics()
+
     # Exibe métricas
     print_metrics(metrics)
-    
+
     # Salva relatório se especificado
     if args.output:
         save_metrics_report(metrics, args.output)
 
+    # Séries temporais
+    if windows:
+        from .timeseries import print_timeseries, save_timeseries, timeseries_output_path
+        for window in windows:
+            rows = aggregate.rows(window)
+            print_timeseries(rows, window)
+            if args.timeseries_output:
+                output = timeseries_output_path(args.timeseries_output, window, len(windows) > 1)
+                save_timeseries(rows, output, window)
+
+def main():
+    run_analysis(build_arg_parser().parse_args())
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
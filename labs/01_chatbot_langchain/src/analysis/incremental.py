@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Análise incremental (com checkpoint) e acompanhamento ao vivo dos logs
+
+O checkpoint guarda, para cada arquivo já lido, o inode, a impressão digital
+da primeira linha e o offset até onde as linhas completas foram processadas,
+além dos agregados acumulados (LogAggregate serializado). A próxima execução
+lê apenas os bytes novos, então o custo é proporcional aos dados novos e não
+ao histórico inteiro. A impressão digital reconhece o mesmo conteúdo depois de
+uma rotação (app.log -> app.log.1) ou de compressão (app.log.1.gz).
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .analyze_logs import (
+    DEFAULT_CHUNK_SIZE, LogAggregate, ScanTask,
+    expand_log_paths, is_gzip, run_scan_tasks, split_range
+)
+
+# Bytes iniciais usados na impressão digital (até o fim da primeira linha)
+FINGERPRINT_SIZE = 4096
+
+CHECKPOINT_VERSION = 1
+
+def file_fingerprint(path: str, compressed: bool = False) -> Optional[str]:
+    """
+    Hash da primeira linha do arquivo (conteúdo descomprimido, se gzip)
+
+    Returns:
+        Hash em hexadecimal ou None se a primeira linha ainda está incompleta
+    """
+    opener = gzip.open if compressed else open
+    with opener(path, "rb") as f:
+        head = f.read(FINGERPRINT_SIZE)
+    newline = head.find(b"\n")
+    if newline != -1:
+        head = head[:newline + 1]
+    elif len(head) < FINGERPRINT_SIZE:
+        return None
+    return hashlib.sha1(head).hexdigest()
+
+def complete_lines_end(path: str, size: int) -> int:
+    """Offset logo após a última quebra de linha (a última linha pode estar sendo escrita)"""
+    if size == 0:
+        return 0
+    with open(path, "rb") as f:
+        # Procura de trás para frente em blocos pequenos
+        position = size
+        while position > 0:
+            block = min(64 * 1024, position)
+            position -= block
+            f.seek(position)
+            newline = f.read(block).rfind(b"\n")
+            if newline != -1:
+                return position + newline + 1
+    return 0
+
+class AnalysisCheckpoint:
+    """Estado persistido entre execuções da análise incremental"""
+
+    def __init__(self, path: str):
+        """
+        Carrega o checkpoint (ou começa vazio se o arquivo não existir)
+
+        Args:
+            path: Arquivo JSON do checkpoint
+        """
+        self.path = Path(path)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.aggregate = LogAggregate()
+        self.updated_at: Optional[str] = None
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CHECKPOINT_VERSION:
+                raise ValueError(f"Versão de checkpoint não suportada: {data.get('version')}")
+            self.files = data["files"]
+            self.aggregate = LogAggregate.from_dict(data["aggregate"])
+            self.updated_at = data.get("updated_at")
+
+    def plan(self, paths: Iterable[str],
+             chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[List[ScanTask], Dict[str, Dict[str, Any]]]:
+        """
+        Tarefas com os bytes ainda não processados de cada arquivo
+
+        Returns:
+            (tarefas, novos estados dos arquivos por impressão digital)
+        """
+        tasks: List[ScanTask] = []
+        pending: Dict[str, Dict[str, Any]] = {}
+        by_inode = {(entry["device"], entry["inode"]): key for key, entry in self.files.items()}
+
+        for path in paths:
+            stat = os.stat(path)
+            known = self.files.get(by_inode.get((stat.st_dev, stat.st_ino)))
+            if (known and known["path"] == path and known["size"] == stat.st_size
+                    and known["offset"] == known["end"]):
+                # Arquivo inalterado desde a última execução (só stat, sem leitura)
+                pending[by_inode[(stat.st_dev, stat.st_ino)]] = known
+                continue
+
+            compressed = is_gzip(path)
+            fingerprint = file_fingerprint(path, compressed)
+            if fingerprint is None or fingerprint in pending:
+                # Primeira linha incompleta ou mesmo conteúdo já incluído nesta execução
+                continue
+            offset = self.files.get(fingerprint, {}).get("offset", 0)
+
+            if compressed:
+                # Gzip não tem acesso aleatório: pula os bytes descomprimidos já lidos
+                end = None
+                tasks.append((path, offset, None))
+            else:
+                end = complete_lines_end(path, stat.st_size)
+                if offset > end:
+                    # Arquivo truncado: recomeça do início
+                    offset = 0
+                tasks.extend(split_range(path, offset, end, chunk_size))
+
+            pending[fingerprint] = {
+                "path": path,
+                "device": stat.st_dev,
+                "inode": stat.st_ino,
+                "size": stat.st_size,
+                "compressed": compressed,
+                "offset": offset,
+                "end": end
+            }
+        return tasks, pending
+
+    def save(self):
+        """Grava o checkpoint de forma atômica (arquivo temporário + rename)"""
+        self.updated_at = datetime.now().isoformat()
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "updated_at": self.updated_at,
+            "files": self.files,
+            "aggregate": self.aggregate.to_dict()
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+def analyze_incremental(patterns: Iterable[str], checkpoint_path: str, workers: Optional[int] = None,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[LogAggregate, LogAggregate]:
+    """
+    Processa só os bytes novos desde o último checkpoint e atualiza o checkpoint
+
+    Args:
+        patterns: Arquivos ou padrões glob
+        checkpoint_path: Arquivo JSON do checkpoint (criado se não existir)
+        workers: Processos do pool (padrão: número de CPUs)
+        chunk_size: Tamanho das faixas de bytes
+
+    Returns:
+        (agregado acumulado, agregado só dos dados novos)
+    """
+    checkpoint = AnalysisCheckpoint(checkpoint_path)
+    tasks, pending = checkpoint.plan(expand_log_paths(patterns), chunk_size)
+
+    new_data = LogAggregate()
+    for task, aggregate in zip(tasks, run_scan_tasks(tasks, workers)):
+        new_data.merge(aggregate)
+        if task[2] is None:
+            # Gzip: o fim só é conhecido depois da leitura
+            for state in pending.values():
+                if state["path"] == task[0] and state["compressed"]:
+                    state["end"] = task[1] + aggregate.bytes_read
+
+    for state in pending.values():
+        state["offset"] = state["end"]
+
+    # Mantém os arquivos não vistos nesta execução enquanto ainda existirem
+    for key, state in checkpoint.files.items():
+        if key not in pending and Path(state["path"]).exists():
+            pending[key] = state
+
+    checkpoint.files = pending
+    checkpoint.aggregate.merge(new_data)
+    checkpoint.save()
+    return checkpoint.aggregate, new_data
+
+class RollingWindow:
+    """Agregados por intervalo de leitura, combinados na janela móvel"""
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.buckets: Deque[Tuple[float, LogAggregate]] = deque()
+
+    def add(self, timestamp: float, aggregate: LogAggregate):
+        self.buckets.append((timestamp, aggregate))
+        while self.buckets and self.buckets[0][0] <= timestamp - self.window_seconds:
+            self.buckets.popleft()
+
+    def snapshot(self) -> LogAggregate:
+        total = LogAggregate()
+        for _, aggregate in self.buckets:
+            total.merge(aggregate)
+        return total
+
+def format_window(aggregate: LogAggregate, seconds: float) -> str:
+    """Linha de resumo da janela: vazão, p50/p95 de latência e tokens por minuto"""
+    queries = aggregate.response_time.stats.count
+    line = f"{queries} queries ({queries / seconds:.2f}/s)"
+    if queries:
+        line += (f" | p50 {aggregate.response_time.quantile(0.5):.3f}s"
+                 f" | p95 {aggregate.response_time.quantile(0.95):.3f}s"
+                 f" | {aggregate.tokens.stats.total * 60 / seconds:.0f} tokens/min")
+    return line
+
+def follow_log(path: str, interval: float = 2.0, window_seconds: float = 60.0,
+               from_start: bool = False, max_updates: Optional[int] = None):
+    """
+    Acompanha o log como "tail -f" e imprime métricas da janela móvel
+
+    Linhas incompletas esperam a próxima leitura; quando o arquivo é rotacionado
+    (inode diferente ou tamanho menor), o restante do arquivo antigo é lido e o
+    novo é aberto do início.
+
+    Args:
+        path: Arquivo de log
+        interval: Segundos entre leituras
+        window_seconds: Tamanho da janela móvel
+        from_start: Lê o arquivo desde o início (padrão: só linhas novas)
+        max_updates: Número de atualizações antes de parar (None = até Ctrl+C)
+    """
+    window = RollingWindow(window_seconds)
+    started = time.time()
+    handle = None
+    partial = b""
+    updates = 0
+
+    def read_new(f) -> LogAggregate:
+        nonlocal partial
+        aggregate = LogAggregate()
+        for line in f:
+            if not line.endswith(b"\n"):
+                partial += line
+                break
+            aggregate.add_line(partial + line)
+            partial = b""
+        return aggregate
+
+    print(f"👀 Acompanhando {path} (janela de {window_seconds:.0f}s, Ctrl+C para sair)")
+    try:
+        while max_updates is None or updates < max_updates:
+            tick = LogAggregate()
+            if handle is None and os.path.exists(path):
+                handle = open(path, "rb")
+                if not from_start:
+                    handle.seek(0, os.SEEK_END)
+                from_start = True
+
+            if handle is not None:
+                tick.merge(read_new(handle))
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    stat = None
+                current = os.fstat(handle.fileno())
+                if stat is None or stat.st_ino != current.st_ino or stat.st_size < handle.tell():
+                    # Rotação: o arquivo antigo já foi lido até o fim
+                    handle.close()
+                    handle, partial = None, b""
+                    if stat is not None:
+                        handle = open(path, "rb")
+                        tick.merge(read_new(handle))
+
+            now = time.time()
+            window.add(now, tick)
+            seconds = max(min(window_seconds, now - started), interval)
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {format_window(window.snapshot(), seconds)}",
+                  flush=True)
+            updates += 1
+            if max_updates is None or updates < max_updates:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n👋 Acompanhamento encerrado")
+    finally:
+        if handle is not None:
+            handle.close()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Estruturas de agregação incrementais e combináveis para a análise de logs
+
+Cada estrutura ocupa memória constante (independente do número de valores),
+pode ser combinada com outra (merge) para juntar resultados parciais de
+processos diferentes e pode ser serializada em dicionários JSON.
+"""
+
+import math
+from typing import Any, Dict, Optional
+
+class RunningStats:
+    """Contagem, média, variância (Welford), mínimo, máximo e soma"""
+
+    __slots__ = ("count", "mean", "m2", "min", "max", "total")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.total = 0.0
+
+    def add(self, value: float):
+        """Acrescenta um valor"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "RunningStats"):
+        """Combina com outro resultado parcial (algoritmo de Chan)"""
+        if not other.count:
+            return
+        if not self.count:
+            for name in self.__slots__:
+                setattr(self, name, getattr(other, name))
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        """Desvio padrão amostral"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__} if self.count else {"count": 0}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningStats":
+        stats = cls()
+        if data.get("count"):
+            for name in cls.__slots__:
+                setattr(stats, name, data[name])
+        return stats
+
+class QuantileSketch:
+    """
+    Sketch de quantis com erro relativo limitado (no estilo do DDSketch)
+
+    Os valores positivos caem em faixas logarítmicas de razão gamma; cada
+    quantil é estimado pelo centro da faixa, com erro relativo de no máximo
+    relative_accuracy. Valores menores ou iguais a min_value contam como zero.
+    """
+
+    __slots__ = ("relative_accuracy", "min_value", "count", "zero_count", "bins", "_log_gamma")
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.count = 0
+        self.zero_count = 0
+        self.bins: Dict[int, int] = {}
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(gamma)
+
+    def add(self, value: float, weight: int = 1):
+        """Acrescenta um valor"""
+        self.count += weight
+        if value <= self.min_value:
+            self.zero_count += weight
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + weight
+
+    def merge(self, other: "QuantileSketch"):
+        """Combina com outro sketch de mesma precisão"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Sketches com precisões diferentes não podem ser combinados")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for index, weight in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + weight
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estima o quantil q (entre 0 e 1)
+
+        Returns:
+            Valor estimado ou None se o sketch estiver vazio
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Centro da faixa (gamma^(i-1), gamma^i]
+                gamma = math.exp(self._log_gamma)
+                return 2 * math.exp(index * self._log_gamma) / (gamma + 1)
+        return 2 * math.exp(max(self.bins) * self._log_gamma) / (math.exp(self._log_gamma) + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "count": self.count,
+            "zero_count": self.zero_count,
+            "bins": {str(index): weight for index, weight in self.bins.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"], data["min_value"])
+        sketch.count = data["count"]
+        sketch.zero_count = data["zero_count"]
+        sketch.bins = {int(index): weight for index, weight in data["bins"].items()}
+        return sketch
+
+class Distribution:
+    """Estatísticas exatas (RunningStats) e quantis aproximados (QuantileSketch) de uma série"""
+
+    __slots__ = ("stats", "sketch")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value: float):
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other: "Distribution"):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def quantile(self, q: float) -> float:
+        """Quantil limitado ao intervalo observado (0 se vazio)"""
+        value = self.sketch.quantile(q)
+        if value is None:
+            return 0.0
+        return min(max(value, self.stats.min), self.stats.max)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stats": self.stats.to_dict(), "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Distribution":
+        distribution = cls()
+        distribution.stats = RunningStats.from_dict(data["stats"])
+        distribution.sketch = QuantileSketch.from_dict(data["sketch"])
+        return distribution
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Séries temporais de vazão, erros e latência a partir dos logs
+
+Cada query é colocada na janela do seu timestamp (ex.: 1m, 5m, 1h). Por janela
+são calculados taxa de requisições, taxa de erro e p50/p95/p99 da latência com
+sketches de quantis, então os agregados continuam combináveis entre processos
+e a memória depende só do número de janelas. O resultado sai em CSV ou JSON
+para gráficos e para correlacionar latência com carga.
+
+A taxa de erro considera os eventos de métricas com "success": false; os
+demais registros ERROR da janela aparecem na coluna error_logs.
+"""
+
+import csv
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .analyze_logs import LogAggregate, _METRICS_EVENT_BYTES
+from .sketches import Distribution
+
+# Linhas de erro (verificado nos bytes, antes do parse JSON)
+_ERROR_LEVEL_BYTES = b'"level": "ERROR"'
+
+_WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Colunas do CSV
+TIMESERIES_FIELDS = [
+    "window_start", "window_end", "requests", "requests_per_second", "failed", "error_logs",
+    "error_rate", "latency_mean", "latency_p50", "latency_p95", "latency_p99", "latency_max", "tokens"
+]
+
+def parse_window(value: str) -> int:
+    """
+    Converte a duração da janela em segundos ("30s", "1m", "5m", "1h", "1d" ou "90")
+
+    Raises:
+        ValueError: Formato inválido
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*([smhd]?)\s*", value.lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Janela inválida: {value!r} (use por exemplo 30s, 1m, 5m, 1h)")
+    return int(match.group(1)) * _WINDOW_UNITS[match.group(2) or "s"]
+
+def window_label(seconds: int) -> str:
+    """Representação curta da janela (inverso de parse_window)"""
+    for unit in ("d", "h", "m"):
+        if seconds % _WINDOW_UNITS[unit] == 0:
+            return f"{seconds // _WINDOW_UNITS[unit]}{unit}"
+    return f"{seconds}s"
+
+def entry_timestamp(entry: Dict[str, Any]) -> Optional[float]:
+    """Timestamp da entrada em segundos (None se ausente ou inválido)"""
+    try:
+        return datetime.fromisoformat(entry["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+class WindowBucket:
+    """Métricas de uma janela de tempo"""
+
+    __slots__ = ("requests", "failed", "error_logs", "tokens", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.failed = 0
+        self.error_logs = 0
+        self.tokens = 0
+        self.latency = Distribution()
+
+    def merge(self, other: "WindowBucket"):
+        self.requests += other.requests
+        self.failed += other.failed
+        self.error_logs += other.error_logs
+        self.tokens += other.tokens
+        self.latency.merge(other.latency)
+
+    def to_row(self, start: int, window: int) -> Dict[str, Any]:
+        """Linha da série (error_rate = queries com falha / queries)"""
+        stats = self.latency.stats
+        return {
+            "window_start": datetime.fromtimestamp(start).isoformat(),
+            "window_end": datetime.fromtimestamp(start + window).isoformat(),
+            "requests": self.requests,
+            "requests_per_second": round(self.requests / window, 4),
+            "failed": self.failed,
+            "error_logs": self.error_logs,
+            "error_rate": round(self.failed / self.requests, 4) if self.requests else 0.0,
+            "latency_mean": round(stats.mean, 4) if stats.count else None,
+            "latency_p50": round(self.latency.quantile(0.5), 4) if stats.count else None,
+            "latency_p95": round(self.latency.quantile(0.95), 4) if stats.count else None,
+            "latency_p99": round(self.latency.quantile(0.99), 4) if stats.count else None,
+            "latency_max": round(stats.max, 4) if stats.count else None,
+            "tokens": self.tokens
+        }
+
+class TimeSeriesAggregate(LogAggregate):
+    """LogAggregate que também distribui as queries em janelas de tempo"""
+
+    def __init__(self, windows: Sequence[int] = (60,)):
+        """
+        Args:
+            windows: Tamanhos das janelas em segundos (ex.: (60, 300, 3600))
+        """
+        super().__init__()
+        self.windows = tuple(windows)
+        self.series: Dict[int, Dict[int, WindowBucket]] = {window: {} for window in self.windows}
+        self.untimed = 0
+
+    def _buckets(self, timestamp: float) -> List[WindowBucket]:
+        buckets = []
+        for window, series in self.series.items():
+            start = int(timestamp // window) * window
+            bucket = series.get(start)
+            if bucket is None:
+                bucket = series[start] = WindowBucket()
+            buckets.append(bucket)
+        return buckets
+
+    def add_line(self, line: bytes):
+        super().add_line(line)
+        if _ERROR_LEVEL_BYTES in line and _METRICS_EVENT_BYTES not in line:
+            # Registros ERROR que não são eventos de métricas (contados à parte)
+            try:
+                timestamp = entry_timestamp(json.loads(line))
+            except ValueError:
+                return
+            if timestamp is not None:
+                for bucket in self._buckets(timestamp):
+                    bucket.error_logs += 1
+
+    def _add_query(self, entry: Dict[str, Any], response_time: Optional[float], tokens: Optional[int],
+                   confidence: Optional[float], cache_hit: bool, success: bool):
+        super()._add_query(entry, response_time, tokens, confidence, cache_hit, success)
+        timestamp = entry_timestamp(entry)
+        if timestamp is None:
+            self.untimed += 1
+            return
+        for bucket in self._buckets(timestamp):
+            bucket.requests += 1
+            bucket.failed += not success
+            bucket.tokens += tokens or 0
+            if response_time is not None:
+                bucket.latency.add(response_time)
+
+    def merge(self, other: "LogAggregate") -> "LogAggregate":
+        super().merge(other)
+        if isinstance(other, TimeSeriesAggregate):
+            self.untimed += other.untimed
+            for window, series in other.series.items():
+                target = self.series.setdefault(window, {})
+                for start, bucket in series.items():
+                    if start in target:
+                        target[start].merge(bucket)
+                    else:
+                        target[start] = bucket
+        return self
+
+    def rows(self, window: int, fill_gaps: bool = True) -> List[Dict[str, Any]]:
+        """
+        Série de uma janela em ordem cronológica
+
+        Args:
+            window: Tamanho da janela em segundos
+            fill_gaps: Inclui janelas sem tráfego (zeros) entre a primeira e a última
+        """
+        series = self.series.get(window, {})
+        if not series:
+            return []
+        starts = range(min(series), max(series) + window, window) if fill_gaps else sorted(series)
+        return [series.get(start, WindowBucket()).to_row(start, window) for start in starts]
+
+def timeseries_output_path(output: str, window: int, multiple: bool) -> str:
+    """Com várias janelas, acrescenta a janela ao nome (ex.: series_5m.csv)"""
+    if not multiple:
+        return output
+    path = Path(output)
+    return str(path.with_name(f"{path.stem}_{window_label(window)}{path.suffix}"))
+
+def save_timeseries(rows: List[Dict[str, Any]], output_file: str, window: int):
+    """
+    Salva a série em CSV ou JSON (pela extensão do arquivo)
+
+    Args:
+        rows: Linhas de TimeSeriesAggregate.rows
+        output_file: Arquivo .csv ou .json
+        window: Tamanho da janela em segundos
+    """
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    if output_file.lower().endswith(".csv"):
+        with open(output_file, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=TIMESERIES_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        report = {
+            "timestamp": datetime.now().isoformat(),
+            "window": window_label(window),
+            "window_seconds": window,
+            "series": rows
+        }
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📄 Série temporal ({window_label(window)}) salva em: {output_file}")
+
+def print_timeseries(rows: List[Dict[str, Any]], window: int, limit: int = 30):
+    """Exibe as últimas janelas da série em tabela"""
+    print(f"\n📈 SÉRIE TEMPORAL (janelas de {window_label(window)})")
+    print("-" * 84)
+    print(f"{'início':<20} {'reqs':>6} {'req/s':>7} {'erro%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'tokens':>10}")
+    if len(rows) > limit:
+        print(f"  ... {len(rows) - limit} janelas anteriores omitidas")
+    for row in rows[-limit:]:
+        latency = [f"{row[key]:.3f}s" if row[key] is not None else "-"
+                   for key in ("latency_p50", "latency_p95", "latency_p99")]
+        print(f"{row['window_start'][:19]:<20} {row['requests']:>6} {row['requests_per_second']:>7.2f} "
+              f"{row['error_rate'] * 100:>5.1f}% {latency[0]:>8} {latency[1]:>8} {latency[2]:>8} {row['tokens']:>10}")
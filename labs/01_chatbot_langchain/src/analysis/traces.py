@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Reconstrução das requisições a partir dos eventos de span dos logs
+
+Os registros "span_start"/"span_end" (ver src.utils.tracing) são agrupados
+pelo request_id. Quando o span raiz de uma requisição termina, ela vira uma
+linha do tempo (waterfall) com o deslocamento e a duração de cada estágio, e
+o estágio mais lento é o de maior tempo próprio (duração menos a dos filhos).
+Só as N requisições mais lentas são guardadas inteiras; as demais entram
+apenas nas estatísticas por estágio, então a memória depende das requisições
+em andamento e não do tamanho dos logs. Funciona com os logs JSON dos três
+labs (no lab 03, com LOG_FORMAT=json).
+"""
+
+import gzip
+import heapq
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .analyze_logs import expand_log_paths, is_gzip, iter_range
+from .sketches import Distribution
+
+SPAN_START_EVENT = "span_start"
+SPAN_END_EVENT = "span_end"
+
+# Linhas de span (verificado nos bytes, antes do parse JSON)
+_SPAN_EVENT_BYTES = b'"event": "span_'
+
+# Largura da barra do waterfall
+BAR_WIDTH = 40
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    """Timestamp ISO em segundos (None se ausente ou inválido)"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class TraceSpan:
+    """Um estágio da requisição"""
+
+    __slots__ = ("span_id", "name", "parent_id", "start", "duration_ms", "status")
+
+    def __init__(self, span_id: str, name: str, parent_id: Optional[str]):
+        self.span_id = span_id
+        self.name = name
+        self.parent_id = parent_id
+        self.start: Optional[float] = None
+        self.duration_ms: Optional[float] = None
+        self.status = "open"
+
+class RequestTrace:
+    """Spans de uma requisição e a linha do tempo derivada deles"""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.spans: Dict[str, TraceSpan] = {}
+        self.root: Optional[TraceSpan] = None
+
+    def add(self, entry: Dict[str, Any]):
+        """Acrescenta um evento span_start ou span_end"""
+        span_id = entry.get("span_id")
+        if not span_id:
+            return
+        span = self.spans.get(span_id)
+        if span is None:
+            span = self.spans[span_id] = TraceSpan(span_id, entry.get("span", "?"), entry.get("parent_span_id"))
+            if span.parent_id is None:
+                self.root = span
+        timestamp = _parse_timestamp(entry.get("timestamp"))
+        if entry["event"] == SPAN_START_EVENT:
+            span.start = timestamp
+        else:
+            span.duration_ms = float(entry.get("duration_ms") or 0.0)
+            span.status = entry.get("status", "ok")
+            if span.start is None and timestamp is not None:
+                # Início perdido (ex.: arquivo rotacionado): estimado pelo fim
+                span.start = timestamp - span.duration_ms / 1000
+
+    @property
+    def complete(self) -> bool:
+        return self.root is not None and self.root.duration_ms is not None
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms if self.complete else 0.0
+
+    def self_times(self) -> Dict[str, float]:
+        """Tempo próprio de cada span (duração menos a soma dos filhos diretos)"""
+        children: Dict[str, float] = {}
+        for span in self.spans.values():
+            if span.parent_id and span.duration_ms is not None:
+                children[span.parent_id] = children.get(span.parent_id, 0.0) + span.duration_ms
+        return {
+            span_id: max(0.0, span.duration_ms - children.get(span_id, 0.0))
+            for span_id, span in self.spans.items() if span.duration_ms is not None
+        }
+
+    def slowest_stage(self) -> Optional[TraceSpan]:
+        """
+        Span com o maior tempo próprio
+
+        A raiz só é escolhida quando o seu tempo próprio (fora de qualquer estágio)
+        supera o de todos os estágios; nesse caso o gargalo é código sem span.
+        """
+        self_times = self.self_times()
+        stages = [span for span in self.spans.values() if span is not self.root and span.span_id in self_times]
+        slowest = max(stages, key=lambda span: self_times[span.span_id]) if stages else None
+        if self.root and self.root.span_id in self_times and (
+                slowest is None or self_times[self.root.span_id] > self_times[slowest.span_id]):
+            return self.root
+        return slowest
+
+    def stage_label(self, span: Optional[TraceSpan]) -> Optional[str]:
+        """Nome do estágio (o tempo próprio da raiz vira "<raiz> (self)")"""
+        if span is None:
+            return None
+        return f"{span.name} (self)" if span is self.root else span.name
+
+    def waterfall(self) -> List[Dict[str, Any]]:
+        """Spans em ordem de início, com deslocamento relativo ao início da requisição"""
+        origin = self.root.start if self.root and self.root.start is not None else min(
+            (span.start for span in self.spans.values() if span.start is not None), default=0.0)
+        self_times = self.self_times()
+        depths: Dict[str, int] = {}
+
+        def depth(span: TraceSpan) -> int:
+            if span.span_id not in depths:
+                parent = self.spans.get(span.parent_id) if span.parent_id else None
+                depths[span.span_id] = depth(parent) + 1 if parent else 0
+            return depths[span.span_id]
+
+        rows = []
+        for span in sorted(self.spans.values(), key=lambda span: (span.start or origin, depth(span))):
+            rows.append({
+                "span": span.name,
+                "span_id": span.span_id,
+                "parent_span_id": span.parent_id,
+                "depth": depth(span),
+                "offset_ms": round(((span.start or origin) - origin) * 1000, 3),
+                "duration_ms": span.duration_ms,
+                "self_ms": round(self_times[span.span_id], 3) if span.span_id in self_times else None,
+                "status": span.status
+            })
+        return rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        slowest = self.slowest_stage()
+        return {
+            "request_id": self.request_id,
+            "name": self.root.name if self.root else None,
+            "start": datetime.fromtimestamp(self.root.start).isoformat() if self.root and self.root.start else None,
+            "duration_ms": self.duration_ms,
+            "status": self.root.status if self.root else "open",
+            "slowest_stage": self.stage_label(slowest),
+            "slowest_span_id": slowest.span_id if slowest else None,
+            "spans": self.waterfall()
+        }
+
+class TraceAnalysis:
+    """Agrupa os eventos de span por requisição e acumula estatísticas por estágio"""
+
+    def __init__(self, top: int = 5, slow_ms: Optional[float] = None):
+        """
+        Args:
+            top: Número de requisições mais lentas guardadas com o waterfall
+            slow_ms: Requisições a partir desta duração contam como lentas
+                (padrão: as `top` mais lentas)
+        """
+        self.top = top
+        self.slow_ms = slow_ms
+        self.pending: Dict[str, RequestTrace] = {}
+        self.requests = 0
+        self.failed = 0
+        self.incomplete = 0
+        self.invalid_lines = 0
+        self.latency = Distribution()
+        self.stages: Dict[str, Distribution] = {}
+        self.stage_self_ms: Counter = Counter()
+        self.slow_requests = 0
+        self.slow_stages: Counter = Counter()
+        self._slowest: List[Any] = []
+        self._sequence = 0
+
+    def add_line(self, line: bytes):
+        """Processa uma linha de log (JSON); linhas que não são spans são ignoradas"""
+        if _SPAN_EVENT_BYTES not in line:
+            return
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            self.invalid_lines += 1
+            return
+        self.add_entry(entry)
+
+    def add_entry(self, entry: Dict[str, Any]):
+        request_id = entry.get("request_id")
+        if not request_id or entry.get("event") not in (SPAN_START_EVENT, SPAN_END_EVENT):
+            return
+        trace = self.pending.get(request_id)
+        if trace is None:
+            trace = self.pending[request_id] = RequestTrace(request_id)
+        trace.add(entry)
+        if trace.complete:
+            del self.pending[request_id]
+            self._finish(trace)
+
+    def _finish(self, trace: RequestTrace):
+        duration = trace.duration_ms
+        self.requests += 1
+        self.failed += trace.root.status == "error"
+        self.latency.add(duration)
+
+        self_times = trace.self_times()
+        for span in trace.spans.values():
+            if span is trace.root or span.duration_ms is None:
+                continue
+            if span.name not in self.stages:
+                self.stages[span.name] = Distribution()
+            self.stages[span.name].add(span.duration_ms)
+            self.stage_self_ms[span.name] += self_times[span.span_id]
+
+        if self.slow_ms is not None and duration >= self.slow_ms:
+            self.slow_requests += 1
+            slowest = trace.slowest_stage()
+            if slowest:
+                self.slow_stages[trace.stage_label(slowest)] += 1
+
+        # Min-heap com as `top` requisições mais lentas (sequence desempata)
+        self._sequence += 1
+        item = (duration, self._sequence, trace)
+        if len(self._slowest) < self.top:
+            heapq.heappush(self._slowest, item)
+        elif self.top and duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def finish(self):
+        """Encerra a leitura: requisições sem o fim do span raiz contam como incompletas"""
+        self.incomplete += len(self.pending)
+        self.pending.clear()
+
+    def slowest(self) -> List[RequestTrace]:
+        """Requisições mais lentas, da mais lenta para a menos lenta"""
+        return [trace for _, _, trace in sorted(self._slowest, key=lambda item: (-item[0], item[1]))]
+
+    def report(self) -> Dict[str, Any]:
+        """Resumo serializável em JSON"""
+        slowest = self.slowest()
+        if self.slow_ms is None:
+            slow_requests = len(slowest)
+            labels = (trace.stage_label(trace.slowest_stage()) for trace in slowest)
+            slow_stages = Counter(label for label in labels if label)
+        else:
+            slow_requests, slow_stages = self.slow_requests, self.slow_stages
+        total_ms = self.latency.stats.total
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "requests": self.requests,
+            "failed": self.failed,
+            "incomplete": self.incomplete,
+            "invalid_lines": self.invalid_lines,
+            "latency_ms": {
+                "mean": round(self.latency.stats.mean, 3),
+                "p50": round(self.latency.quantile(0.5), 3),
+                "p95": round(self.latency.quantile(0.95), 3),
+                "p99": round(self.latency.quantile(0.99), 3),
+                "max": round(self.latency.stats.max, 3) if self.requests else 0.0
+            },
+            "stages": {
+                name: {
+                    "count": distribution.stats.count,
+                    "mean_ms": round(distribution.stats.mean, 3),
+                    "p50_ms": round(distribution.quantile(0.5), 3),
+                    "p95_ms": round(distribution.quantile(0.95), 3),
+                    "max_ms": round(distribution.stats.max, 3),
+                    "share": round(self.stage_self_ms[name] / total_ms, 4) if total_ms else 0.0
+                }
+                for name, distribution in sorted(self.stages.items(),
+                                                 key=lambda item: -self.stage_self_ms[item[0]])
+            },
+            "slow_threshold_ms": self.slow_ms,
+            "slow_requests": slow_requests,
+            "slow_stages": dict(slow_stages.most_common()),
+            "slowest_requests": [trace.to_dict() for trace in slowest]
+        }
+
+def iter_log_lines(path: str) -> Iterator[bytes]:
+    """Linhas do arquivo (gzip descomprimido em streaming)"""
+    if is_gzip(path):
+        with gzip.open(path, "rb") as f:
+            yield from f
+    else:
+        yield from iter_range(path, 0, os.path.getsize(path))
+
+def analyze_traces(patterns: Iterable[str], top: int = 5, slow_ms: Optional[float] = None) -> TraceAnalysis:
+    """
+    Reconstrói as requisições dos logs
+
+    Os arquivos são lidos do mais antigo para o mais novo (data de
+    modificação), então uma requisição que cruza uma rotação é remontada.
+
+    Args:
+        patterns: Arquivos ou padrões glob (ex.: "logs/app.log*")
+        top: Número de requisições mais lentas com waterfall
+        slow_ms: Limite de duração das requisições lentas (padrão: as `top` mais lentas)
+
+    Returns:
+        Análise com estatísticas por estágio e as requisições mais lentas
+    """
+    analysis = TraceAnalysis(top=top, slow_ms=slow_ms)
+    for path in sorted(expand_log_paths(patterns), key=os.path.getmtime):
+        for line in iter_log_lines(path):
+            analysis.add_line(line)
+    analysis.finish()
+    return analysis
+
+def _bar(offset: float, duration: float, total: float) -> str:
+    """Barra do waterfall: posição e largura proporcionais à duração da requisição"""
+    if total <= 0:
+        return " " * BAR_WIDTH
+    start = min(BAR_WIDTH - 1, int(offset / total * BAR_WIDTH))
+    length = max(1, round(duration / total * BAR_WIDTH))
+    length = min(length, BAR_WIDTH - start)
+    return " " * start + "█" * length + " " * (BAR_WIDTH - start - length)
+
+def print_traces(report: Dict[str, Any]):
+    """Exibe o resumo por estágio e o waterfall das requisições mais lentas"""
+    print("\n🔎 REQUISIÇÕES (TRACES)")
+    print("=" * 50)
+    if not report["requests"]:
+        print("⚠️  Nenhuma requisição com spans encontrada (os logs precisam ter request_id e eventos de span)")
+        return
+    print(f"💬 Requisições: {report['requests']}")
+    if report["failed"]:
+        print(f"❌ Com erro: {report['failed']}")
+    if report["incomplete"]:
+        print(f"⚠️  Incompletas (sem o fim do span raiz): {report['incomplete']}")
+    latency = report["latency_ms"]
+    print(f"⏱️  Latência: p50 {latency['p50']:.1f} ms | p95 {latency['p95']:.1f} ms | "
+          f"p99 {latency['p99']:.1f} ms | máx {latency['max']:.1f} ms")
+
+    print(f"\n📐 ESTÁGIOS")
+    print("-" * 72)
+    print(f"{'estágio':<20} {'n':>6} {'média':>10} {'p50':>10} {'p95':>10} {'% tempo':>8}")
+    for name, stage in report["stages"].items():
+        print(f"{name:<20} {stage['count']:>6} {stage['mean_ms']:>8.1f}ms {stage['p50_ms']:>8.1f}ms "
+              f"{stage['p95_ms']:>8.1f}ms {stage['share'] * 100:>7.1f}%")
+
+    if report["slow_stages"]:
+        if report["slow_threshold_ms"] is None:
+            print(f"\n🐢 ESTÁGIO MAIS LENTO NAS {report['slow_requests']} REQUISIÇÕES MAIS LENTAS")
+        else:
+            print(f"\n🐢 ESTÁGIO MAIS LENTO NAS {report['slow_requests']} REQUISIÇÕES "
+                  f">= {report['slow_threshold_ms']:.0f} ms")
+        print("-" * 50)
+        for name, count in report["slow_stages"].items():
+            print(f"  {name}: {count} ({count / report['slow_requests'] * 100:.0f}%)")
+
+    for trace in report["slowest_requests"]:
+        print(f"\n🧵 {trace['request_id']} - {trace['name']} {trace['duration_ms']:.1f} ms "
+              f"({trace['status']}) {trace['start'] or ''}")
+        for span in trace["spans"]:
+            if span["duration_ms"] is None:
+                continue
+            name = ("  " * span["depth"] + span["span"])[:22]
+            marker = " ← mais lenta" if span["span_id"] == trace["slowest_span_id"] else ""
+            error = " ❌" if span["status"] == "error" else ""
+            print(f"  {name:<22} +{span['offset_ms']:>9.1f} {span['duration_ms']:>9.1f} ms "
+                  f"|{_bar(span['offset_ms'], span['duration_ms'], trace['duration_ms'])}|{error}{marker}")
+
+def save_traces_report(report: Dict[str, Any], output_file: str):
+    """Salva o resumo e os waterfalls em JSON"""
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"📄 Relatório de traces salvo em: {output_file}")
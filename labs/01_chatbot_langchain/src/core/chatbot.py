@@ -5,26 +5,48 @@ Chatbot Engine usando LangChain
 
 import time
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 
+from .response_cache import ResponseCache
+from .cassette import CassetteChatModel, load_cassette
+from ..utils.tokens import count_tokens, token_usage
+from ..utils.tracing import RequestScope, Span
+
 class ChatbotEngine:
     """Motor do chatbot usando LangChain"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], logger: Optional[logging.Logger] = None):
         """
         Inicializa o chatbot
         
         Args:
             config: Configurações do chatbot
+            logger: Logger (padrão: logger do módulo); passe o de setup_logging
+                para que os spans dos estágios vão para o log JSON
         """
         self.config = config
-        self.llm = ChatOpenAI(
-            model=config["model_name"],
-            temperature=config["temperature"]
-        )
+        self.logger = logger or logging.getLogger(__name__)
+        
+        # Cassete de gravação/reprodução (no replay não há chamadas à API)
+        self.cassette = load_cassette(config, self.logger)
+        self.llm = None
+        if self.cassette is None or self.cassette.recording:
+            self.llm = ChatOpenAI(
+                model=config["model_name"],
+                temperature=config["temperature"],
+                timeout=config.get("request_timeout"),
+                max_retries=config.get("max_retries", 2)
+            )
+        if self.cassette is not None:
+            self.llm = CassetteChatModel(
+                inner=self.llm,
+                cassette=self.cassette,
+                model_key=config["model_name"],
+                temperature=config["temperature"]
+            )
         
         # Template do prompt
         self.prompt_template = ChatPromptTemplate.from_messages([
@@ -35,30 +57,101 @@ class ChatbotEngine:
         # Chain do LangChain
         self.chain = self.prompt_template | self.llm
         
-        self.logger = logging.getLogger(__name__)
+        # Cache de respostas (opcional)
+        self.response_cache = None
+        if config.get("response_cache_enabled"):
+            self.response_cache = ResponseCache(
+                config.get("response_cache_path", "data/response_cache.db"),
+                ttl_seconds=config.get("response_cache_ttl", 86400.0),
+                max_entries=config.get("response_cache_max_entries", 10000),
+                logger=self.logger
+            )
+    
+    def _token_usage(self, messages: List[Any], response: Any, response_text: str) -> Dict[str, Any]:
+        """
+        Tokens da chamada por segmento do prompt (system e user)
+        
+        Args:
+            messages: Mensagens do prompt renderizado
+            response: Mensagem retornada pelo LLM (None quando veio do cache)
+            response_text: Texto da resposta
+            
+        Returns:
+            Contabilização de tokens (ver token_usage)
+        """
+        model_name = self.config["model_name"]
+        segments = {"system": 0, "user": 0}
+        for message in messages:
+            segment = "system" if message.type == "system" else "user"
+            segments[segment] += count_tokens(str(message.content), model_name)
+        completion = getattr(response, "content", response_text)
+        return token_usage(segments, count_tokens(str(completion), model_name), response, len(messages))
     
     def process_query(self, query: str) -> Dict[str, Any]:
         """
         Processa uma query e retorna a resposta com métricas
         
+        Os logs da query levam o mesmo request_id (incluído no resultado) e
+        cada estágio registra um span com a duração.
+        
         Args:
             query: Query do usuário
             
         Returns:
             Dicionário com resposta e métricas
         """
+        with RequestScope(self.logger, "process_query") as scope:
+            result = self._process_query(query)
+            if not result["success"]:
+                scope.status = "error"
+        result["request_id"] = scope.request_id
+        return result
+    
+    def _process_query(self, query: str) -> Dict[str, Any]:
+        """Processa a query dentro do escopo da requisição (ver process_query)"""
         start_time = time.time()
         
         try:
+            # Renderiza o prompt (as mensagens renderizadas compõem a chave do cache)
+            with Span(self.logger, "render_prompt"):
+                prompt = self.prompt_template.invoke({"input": query})
+            
+            cache_key = None
+            response_text = None
+            if self.response_cache is not None:
+                with Span(self.logger, "cache_lookup"):
+                    cache_key = ResponseCache.make_key(
+                        prompt.to_messages(), self.config["model_name"], self.config["temperature"]
+                    )
+                    response_text = self.response_cache.get(cache_key)
+            cache_hit = response_text is not None
+            
             # Processa a query
-            response = self.chain.invoke({"input": query})
+            response = None
+            if not cache_hit:
+                with Span(self.logger, "llm"):
+                    response = self.llm.invoke(prompt)
+                response_text = str(getattr(response, "content", response))
+                if cache_key is not None:
+                    with Span(self.logger, "cache_store"):
+                        self.response_cache.put(cache_key, self.config["model_name"], response_text)
             
             # Calcula métricas
             response_time = time.time() - start_time
             
-            # Simula contagem de tokens (em produção, usar tiktoken)
-            response_text = str(response)
-            tokens_used = len(query.split()) + len(response_text.split())
+            # Tokens por segmento (uso informado pelo provedor ou tiktoken)
+            with Span(self.logger, "token_count"):
+                usage = self._token_usage(prompt.to_messages(), response, response_text)
+            
+            # Resposta do cache não gasta tokens: o que a chamada custaria vai em cached_tokens
+            cached_tokens = 0
+            if cache_hit:
+                cached_tokens = usage["total_tokens"]
+                usage = dict(
+                    usage, prompt_tokens=0, completion_tokens=0, total_tokens=0,
+                    segments={name: 0 for name in usage["segments"]}, source="cache"
+                )
+            tokens_used = usage["total_tokens"]
             
             # Simula score de confiança (em produção, usar modelo de confiança)
             confidence = min(1.0, max(0.0, 1.0 - (response_time / self.config["max_response_time"])))
@@ -68,7 +161,12 @@ class ChatbotEngine:
                 "response": response_text,
                 "response_time": response_time,
                 "tokens_used": tokens_used,
+                "prompt_tokens": usage["prompt_tokens"],
+                "completion_tokens": usage["completion_tokens"],
+                "cached_tokens": cached_tokens,
+                "token_usage": usage,
                 "confidence": confidence,
+                "cache_hit": cache_hit,
                 "error_message": None
             }
             
@@ -81,6 +179,10 @@ class ChatbotEngine:
                 "response": "",
                 "response_time": response_time,
                 "tokens_used": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cached_tokens": 0,
                 "confidence": 0.0,
+                "cache_hit": False,
                 "error_message": str(e)
             } 
\ No newline at end of file
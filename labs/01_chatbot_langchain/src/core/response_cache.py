@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Cache persistente de respostas do LLM em SQLite
+
+A chave é o hash SHA-256 das mensagens do prompt já renderizadas, do nome do
+modelo e da temperatura: a mesma pergunta com o mesmo template e os mesmos
+parâmetros reaproveita a resposta sem chamar a API. As entradas expiram após
+ttl_seconds e, acima de max_entries, as menos usadas recentemente são
+removidas.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Versão do conteúdo guardado (2: só o texto da resposta, sem o repr do AIMessage)
+CACHE_FORMAT = 2
+
+class ResponseCache:
+    """Cache de respostas com TTL e limite de tamanho"""
+
+    def __init__(self, db_path: str = "data/response_cache.db", ttl_seconds: float = 86400.0,
+                 max_entries: int = 10000, logger: Optional[logging.Logger] = None):
+        """
+        Inicializa o cache
+
+        Args:
+            db_path: Caminho do banco SQLite (":memory:" para uso em memória)
+            ttl_seconds: Validade das entradas em segundos (0 = sem expiração)
+            max_entries: Número máximo de entradas (0 = sem limite)
+            logger: Logger opcional
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+
+            CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(messages: List[Any], model: str, temperature: float) -> str:
+        """
+        Gera a chave do cache
+
+        Args:
+            messages: Mensagens do prompt renderizado (BaseMessage do LangChain)
+            model: Nome do modelo
+            temperature: Temperatura usada na geração
+
+        Returns:
+            Hash hexadecimal da combinação
+        """
+        payload = {
+            "format": CACHE_FORMAT,
+            "model": model,
+            "temperature": float(temperature),
+            "messages": [[message.type, message.content] for message in messages]
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Busca uma resposta no cache
+
+        Args:
+            key: Chave gerada por make_key
+
+        Returns:
+            Resposta armazenada ou None se ausente/expirada
+        """
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    row = None
+
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ?, hit_count = hit_count + 1 WHERE key = ?",
+                    (now, key)
+                )
+                self.hits += 1
+                return row[0]
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao ler o cache de respostas: {e}")
+            return None
+
+    def put(self, key: str, model: str, response: str):
+        """
+        Armazena uma resposta e aplica o limite de tamanho
+
+        Args:
+            key: Chave gerada por make_key
+            model: Nome do modelo (informativo)
+            response: Texto da resposta
+        """
+        now = time.time()
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_access, hit_count) "
+                    "VALUES (?, ?, ?, ?, ?, 0)",
+                    (key, model, response, now, now)
+                )
+                if self.max_entries:
+                    # Remove as entradas acessadas há mais tempo além do limite
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN ("
+                        "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro ao gravar no cache de respostas: {e}")
+
+    def purge_expired(self) -> int:
+        """Remove as entradas expiradas e retorna quantas foram removidas"""
+        if not self.ttl_seconds:
+            return 0
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+
+    def clear(self):
+        """Remove todas as entradas"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache nesta execução"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups * 100) if lookups else 0.0
+        }
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()
@@ -4,7 +4,7 @@ Módulo Utils - Funções auxiliares e utilitários
 """
 
 from .config import load_config
-from .logging_config import setup_logging, JSONFormatter
+from .logging_config import setup_logging, log_metrics, JSONFormatter, METRICS_EVENT
 from .metrics import MetricsCollector, TestResult, TestSummary
 from .testing import TestRunner
 from .reporting import generate_report
@@ -12,7 +12,9 @@ from .reporting import generate_report
 __all__ = [
     'load_config',
     'setup_logging',
+    'log_metrics',
     'JSONFormatter',
+    'METRICS_EVENT',
     'MetricsCollector',
     'TestResult',
     'TestSummary',
@@ -24,10 +24,21 @@ def load_config() -> Dict[str, Any]:
         "temperature": float(os.getenv("TEMPERATURE", "0.7")),
         "max_response_time": float(os.getenv("MAX_RESPONSE_TIME", "3.0")),
         "min_success_rate": float(os.getenv("MIN_SUCCESS_RATE", "95.0")),
+        "request_timeout": float(os.getenv("REQUEST_TIMEOUT", "30.0")),
+        "max_retries": int(os.getenv("MAX_RETRIES", "2")),
+        "test_concurrency": int(os.getenv("TEST_CONCURRENCY", "1")),
+        "response_cache_enabled": os.getenv("RESPONSE_CACHE", "false").lower() == "true",
+        "response_cache_path": os.getenv("RESPONSE_CACHE_PATH", "data/response_cache.db"),
+        "response_cache_ttl": float(os.getenv("RESPONSE_CACHE_TTL", "86400")),
+        "response_cache_max_entries": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+        "cassette_mode": os.getenv("CASSETTE_MODE", "off").lower(),
+        "cassette_path": os.getenv("CASSETTE_PATH", "cassettes/chatbot.jsonl.gz"),
+        "cassette_latency_scale": float(os.getenv("CASSETTE_LATENCY_SCALE", "0")),
         "test_queries_file": "input/inputs.txt"
     }
     
-    if not config["openai_api_key"]:
+    # No replay as respostas vêm do cassete e a chave não é necessária
+    if not config["openai_api_key"] and config["cassette_mode"] != "replay":
         raise ValueError("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
     
     return config 
\ No newline at end of file
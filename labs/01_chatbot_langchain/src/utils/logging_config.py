@@ -7,9 +7,27 @@ import json
 import logging
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict
+
+from .log_queue import (
+    BatchingRotatingFileHandler, attach_queue_handlers,
+    LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE
+)
+from .tracing import RequestContextFilter, ExcludeSpanEvents
+
+# Tipo de evento dos registros de métricas (campo "event" do JSON)
+METRICS_EVENT = "metrics"
+
+# Atributos padrão do LogRecord; os demais vieram de extra={...}
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "taskName"}
 
 class JSONFormatter(logging.Formatter):
-    """Formatter para logs em formato JSON"""
+    """
+    Formatter para logs em formato JSON
+    
+    Campos passados em extra={...} viram campos tipados do JSON, sem passar
+    pela mensagem.
+    """
     
     def format(self, record):
         log_entry = {
@@ -22,14 +40,28 @@ class JSONFormatter(logging.Formatter):
             "line": record.lineno
         }
         
-        return json.dumps(log_entry, ensure_ascii=False)
+        # Campos extras (ex.: event, response_time, tokens_used)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in log_entry:
+                log_entry[key] = value
+        
+        return json.dumps(log_entry, ensure_ascii=False, default=str)
 
-def setup_logging(log_file: str) -> logging.Logger:
+def setup_logging(log_file: str, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                  queue_size: int = LOG_QUEUE_SIZE) -> logging.Logger:
     """
     Configura o sistema de logging com formato JSON
     
+    O logger só enfileira os registros; formatação e escrita (arquivo e
+    console) rodam na thread do QueueListener, em lotes (ver log_queue).
+    Cada registro recebe o request_id e o span_id do contexto (ver tracing);
+    os eventos de span vão só para o arquivo.
+    
     Args:
         log_file: Caminho para o arquivo de log
+        max_bytes: Tamanho máximo do arquivo antes da rotação (0 = sem rotação)
+        backup_count: Arquivos rotacionados mantidos (app.log.1, app.log.2...)
+        queue_size: Capacidade da fila; com a fila cheia os registros são descartados
         
     Returns:
         Logger configurado
@@ -41,14 +73,9 @@ def setup_logging(log_file: str) -> logging.Logger:
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.INFO)
     
-    # Remove handlers existentes para evitar duplicação
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Handler para arquivo (JSON)
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    # Handler para arquivo (JSON, rotação por tamanho, escrita em lotes)
+    file_handler = BatchingRotatingFileHandler(log_file, max_bytes=max_bytes, backup_count=backup_count)
     file_handler.setFormatter(JSONFormatter())
-    logger.addHandler(file_handler)
     
     # Handler para console (formato legível)
     console_handler = logging.StreamHandler()
@@ -56,6 +83,40 @@ def setup_logging(log_file: str) -> logging.Logger:
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    console_handler.addFilter(ExcludeSpanEvents())
     
-    return logger 
\ No newline at end of file
+    # Fila entre o logger e os handlers (remove handlers existentes para evitar duplicação)
+    queue_handler = attach_queue_handlers(logger, [file_handler, console_handler], queue_size=queue_size)
+    
+    # request_id/span_id lidos na thread da requisição, antes de enfileirar
+    queue_handler.addFilter(RequestContextFilter())
+    
+    return logger
+
+def log_metrics(logger: logging.Logger, result: Dict[str, Any], **fields: Any):
+    """
+    Registra as métricas de uma query como evento estruturado
+    
+    Args:
+        logger: Logger configurado
+        result: Resultado de ChatbotEngine.process_query
+        **fields: Campos adicionais do evento (ex.: test_index)
+    """
+    logger.info(
+        f"Query processada: tempo={result['response_time']:.3f}s, tokens={result['tokens_used']}, "
+        f"confiança={result['confidence']:.2f}, cache={result.get('cache_hit', False)}",
+        extra={
+            "event": METRICS_EVENT,
+            "success": result["success"],
+            "response_time": result["response_time"],
+            "tokens_used": result["tokens_used"],
+            "prompt_tokens": result.get("prompt_tokens", 0),
+            "completion_tokens": result.get("completion_tokens", 0),
+            "cached_tokens": result.get("cached_tokens", 0),
+            "confidence": result["confidence"],
+            "cache_hit": result.get("cache_hit", False),
+            **({"request_id": result["request_id"]} if result.get("request_id") else {}),
+            **fields
+        },
+        stacklevel=2
+    )
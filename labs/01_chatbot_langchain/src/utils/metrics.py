@@ -4,7 +4,7 @@ Métricas e coleta de dados para o laboratório
 """
 
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 
 @dataclass
@@ -17,6 +17,11 @@ class TestResult:
     tokens_used: int
     confidence: float
     error_message: Optional[str] = None
+    cache_hit: bool = False
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    token_segments: Optional[Dict[str, int]] = None
+    cached_tokens: int = 0  # Tokens que a chamada custaria (respostas do cache)
 
 @dataclass
 class TestSummary:
@@ -29,6 +34,12 @@ class TestSummary:
     total_tokens_used: int
     avg_tokens_per_query: float
     avg_confidence: float
+    cache_hits: int = 0
+    cache_hit_rate: float = 0.0
+    total_prompt_tokens: int = 0
+    total_completion_tokens: int = 0
+    prompt_token_segments: Optional[Dict[str, int]] = None
+    total_cached_tokens: int = 0
 
 class MetricsCollector:
     """Coletor de métricas durante os testes"""
@@ -40,7 +51,7 @@ class MetricsCollector:
     def add_result(self, result: TestResult):
         """Adiciona um resultado de teste"""
         self.results.append(result)
-        self.logger.info(f"Teste {'SUCESSO' if result.success else 'FALHA'}: {result.query[:50]}...")
+        self.logger.info(f"Teste {'SUCESSO' if result.success else 'FALHA'}{' (cache)' if result.cache_hit else ''}: {result.query[:50]}...")
     
     def get_summary(self) -> TestSummary:
         """Calcula resumo das métricas"""
@@ -56,6 +67,13 @@ class MetricsCollector:
         total_tokens_used = sum(r.tokens_used for r in self.results)
         avg_tokens_per_query = total_tokens_used / total_tests
         avg_confidence = sum(r.confidence for r in self.results) / total_tests
+        cache_hits = sum(1 for r in self.results if r.cache_hit)
+        
+        # Tokens do prompt por segmento (system, user, ...)
+        segments: Dict[str, int] = {}
+        for r in self.results:
+            for name, tokens in (r.token_segments or {}).items():
+                segments[name] = segments.get(name, 0) + tokens
         
         return TestSummary(
             total_tests=total_tests,
@@ -65,5 +83,11 @@ class MetricsCollector:
             avg_response_time=avg_response_time,
             total_tokens_used=total_tokens_used,
             avg_tokens_per_query=avg_tokens_per_query,
-            avg_confidence=avg_confidence
+            avg_confidence=avg_confidence,
+            cache_hits=cache_hits,
+            cache_hit_rate=(cache_hits / total_tests) * 100,
+            total_prompt_tokens=sum(r.prompt_tokens for r in self.results),
+            total_completion_tokens=sum(r.completion_tokens for r in self.results),
+            prompt_token_segments=segments,
+            total_cached_tokens=sum(r.cached_tokens for r in self.results)
         ) 
\ No newline at end of file
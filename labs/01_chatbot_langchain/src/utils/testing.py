@@ -3,18 +3,23 @@
 Testes automatizados para o laboratório
 """
 
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
 
-from ..core.chatbot import ChatbotEngine
 from .metrics import MetricsCollector, TestResult, TestSummary
 
+if TYPE_CHECKING:
+    # Só para anotação: core.chatbot importa src.utils (import circular)
+    from ..core.chatbot import ChatbotEngine
+
 class TestRunner:
     """Executor de testes automatizados"""
     
-    def __init__(self, config: Dict[str, Any], chatbot: ChatbotEngine, metrics: MetricsCollector):
+    def __init__(self, config: Dict[str, Any], chatbot: "ChatbotEngine", metrics: MetricsCollector):
         """
         Inicializa o test runner
         
@@ -60,38 +65,74 @@ class TestRunner:
         self.logger.info(f"Carregadas {len(queries)} queries de teste")
         return queries
     
-    def run_all_tests(self) -> Dict[str, Any]:
+    def _run_query(self, query: str) -> TestResult:
+        """Processa uma query e converte o resultado em TestResult"""
+        result_data = self.chatbot.process_query(query)
+        return TestResult(
+            query=query,
+            response=result_data["response"],
+            success=result_data["success"],
+            response_time=result_data["response_time"],
+            tokens_used=result_data["tokens_used"],
+            confidence=result_data["confidence"],
+            error_message=result_data["error_message"],
+            cache_hit=result_data.get("cache_hit", False),
+            prompt_tokens=result_data.get("prompt_tokens", 0),
+            completion_tokens=result_data.get("completion_tokens", 0),
+            token_segments=(result_data.get("token_usage") or {}).get("segments"),
+            cached_tokens=result_data.get("cached_tokens", 0)
+        )
+    
+    def run_all_tests(self, queries: Optional[List[str]] = None,
+                      concurrency: Optional[int] = None) -> Dict[str, Any]:
         """
         Executa todos os testes
         
+        Com concurrency > 1 as queries são processadas em paralelo por um pool
+        de threads; os resultados entram no MetricsCollector na ordem das
+        queries. O timeout por requisição é aplicado pelo cliente do LLM
+        (request_timeout), e requisições que estouram contam como falha.
+        
+        Args:
+            queries: Queries a executar (padrão: arquivo de entrada)
+            concurrency: Requisições simultâneas (padrão: config["test_concurrency"])
+        
         Returns:
-            Dicionário com resultados e resumo
+            Dicionário com resultados, resumo e dados de execução
         """
         self.logger.info("Iniciando execução dos testes...")
         
         # Carrega queries
-        queries = self.load_test_queries()
+        if queries is None:
+            queries = self.load_test_queries()
+        concurrency = max(1, concurrency or self.config.get("test_concurrency", 1))
         
-        # Executa testes
-        for i, query in enumerate(queries, 1):
-            self.logger.info(f"Executando teste {i}/{len(queries)}: {query[:50]}...")
-            
-            # Processa query
-            result_data = self.chatbot.process_query(query)
-            
-            # Cria objeto de resultado
-            result = TestResult(
-                query=query,
-                response=result_data["response"],
-                success=result_data["success"],
-                response_time=result_data["response_time"],
-                tokens_used=result_data["tokens_used"],
-                confidence=result_data["confidence"],
-                error_message=result_data["error_message"]
-            )
-            
-            # Adiciona às métricas
-            self.metrics.add_result(result)
+        start_time = time.time()
+        first_index = len(self.metrics.results)
+        
+        # Executa testes (map devolve os resultados na ordem das queries)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for i, result in enumerate(executor.map(self._run_query, queries), 1):
+                self.logger.info(f"Teste {i}/{len(queries)} concluído: {result.query[:50]}...")
+                
+                # Adiciona às métricas
+                self.metrics.add_result(result)
+        
+        wall_time = time.time() - start_time
+        run_results = self.metrics.results[first_index:]
+        summed_latency = sum(r.response_time for r in run_results)
+        run_tokens = sum(r.tokens_used for r in run_results)
+        execution = {
+            "concurrency": concurrency,
+            "wall_time": wall_time,
+            "summed_latency": summed_latency,
+            "speedup": summed_latency / wall_time if wall_time > 0 else 1.0,
+            "tokens_per_minute": run_tokens / wall_time * 60 if wall_time > 0 else 0.0
+        }
+        self.logger.info(
+            f"{len(queries)} testes em {wall_time:.2f}s (latência somada {summed_latency:.2f}s, "
+            f"concorrência {concurrency})"
+        )
         
         # Calcula resumo
         summary = self.metrics.get_summary()
@@ -102,6 +143,7 @@ class TestRunner:
         return {
             "tests": [result.__dict__ for result in self.metrics.results],
             "summary": summary.__dict__,
+            "execution": execution,
             "timestamp": datetime.now().isoformat()
         }
     
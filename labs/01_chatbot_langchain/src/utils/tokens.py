@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Contagem de tokens para o laboratório de chatbot
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Segmentos do prompt contabilizados separadamente
+TOKEN_SEGMENTS = ("system", "context", "memory", "user")
+
+# Formato de chat da OpenAI: tokens extras por mensagem e para iniciar a resposta
+MESSAGE_OVERHEAD_TOKENS = 3
+REPLY_PRIMING_TOKENS = 3
+
+
+@lru_cache(maxsize=8)
+def get_encoder(model_name: Optional[str] = None):
+    """
+    Retorna o encoder do tiktoken (carregado uma única vez por modelo)
+    
+    Args:
+        model_name: Nome do modelo (opcional)
+        
+    Returns:
+        Encoder do tiktoken ou None se não estiver disponível
+    """
+    try:
+        import tiktoken
+        
+        if model_name:
+            try:
+                return tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception:
+        # Sem tiktoken (ou sem acesso aos arquivos de encoding): usa estimativa
+        return None
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """
+    Conta tokens de um texto
+    
+    Args:
+        text: Texto a ser contado
+        model_name: Nome do modelo para escolher o encoding
+        
+    Returns:
+        Número de tokens (estimado por palavras se o tiktoken não estiver disponível)
+    """
+    if not text:
+        return 0
+    
+    encoder = get_encoder(model_name)
+    if encoder is not None:
+        return len(encoder.encode(text))
+    
+    # Estimativa: português tem em média ~1.4 tokens por palavra
+    return int(len(text.split()) * 1.4) + 1
+
+
+def usage_from_response(response: Any) -> Optional[Dict[str, int]]:
+    """
+    Tokens informados pelo provedor na resposta do LLM
+    
+    Args:
+        response: Mensagem retornada pelo LLM
+        
+    Returns:
+        Dicionário com prompt_tokens e completion_tokens, ou None se a
+        resposta não trouxer uso (modelos locais, respostas simuladas)
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return {"prompt_tokens": int(usage.get("input_tokens", 0)),
+                "completion_tokens": int(usage.get("output_tokens", 0))}
+    
+    # Versões antigas do langchain-openai só preenchem response_metadata
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+    if token_usage:
+        return {"prompt_tokens": int(token_usage.get("prompt_tokens", 0)),
+                "completion_tokens": int(token_usage.get("completion_tokens", 0))}
+    return None
+
+
+def token_usage(segments: Dict[str, int], completion_tokens: int, response: Any = None,
+                message_count: int = 2) -> Dict[str, Any]:
+    """
+    Contabiliza os tokens de uma chamada ao LLM
+    
+    Os totais vêm do uso informado pelo provedor; sem ele, são estimados pelo
+    tiktoken (segmentos + overhead do formato de chat). A diferença entre o
+    total do prompt e a soma dos segmentos fica em "overhead".
+    
+    Args:
+        segments: Tokens de cada segmento do prompt (system, context, memory, user)
+        completion_tokens: Tokens da resposta contados localmente
+        response: Mensagem retornada pelo LLM (para o uso informado)
+        message_count: Mensagens enviadas no prompt
+        
+    Returns:
+        Dicionário com prompt_tokens, completion_tokens, total_tokens,
+        segments e source ("usage" ou "tiktoken")
+    """
+    segment_tokens = {name: int(segments.get(name, 0)) for name in TOKEN_SEGMENTS}
+    counted = sum(segment_tokens.values())
+    
+    usage = usage_from_response(response)
+    if usage:
+        prompt_tokens = usage["prompt_tokens"]
+        completion_tokens = usage["completion_tokens"]
+        source = "usage"
+    else:
+        prompt_tokens = counted + MESSAGE_OVERHEAD_TOKENS * message_count + REPLY_PRIMING_TOKENS
+        source = "tiktoken"
+    
+    segment_tokens["overhead"] = max(0, prompt_tokens - counted)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "segments": segment_tokens,
+        "source": source
+    }
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Correlação dos logs por requisição (request_id) e spans dos estágios
+
+O request_id e o span atual ficam em contextvars, então cada thread e cada
+task asyncio têm os seus, mesmo com requisições concorrentes. O
+RequestContextFilter copia os dois para todos os registros de log (o
+JSONFormatter os grava como campos) e os spans registram eventos de início e
+fim de cada estágio com a duração, permitindo reconstruir a linha do tempo de
+cada requisição a partir dos logs (ver src.analysis.traces).
+"""
+
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Optional
+
+# Tipos de evento dos spans (campo "event" do JSON)
+SPAN_START_EVENT = "span_start"
+SPAN_END_EVENT = "span_end"
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+span_id_var: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+def new_id() -> str:
+    """Identificador curto e aleatório (16 caracteres hexadecimais)"""
+    return uuid.uuid4().hex[:16]
+
+def current_request_id() -> Optional[str]:
+    """request_id da requisição em andamento (None fora de uma requisição)"""
+    return request_id_var.get()
+
+class RequestContextFilter(logging.Filter):
+    """Acrescenta request_id e span_id do contexto atual a cada registro"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        if request_id is not None and not hasattr(record, "request_id"):
+            record.request_id = request_id
+        span_id = span_id_var.get()
+        if span_id is not None and not hasattr(record, "span_id"):
+            record.span_id = span_id
+        return True
+
+class ExcludeSpanEvents(logging.Filter):
+    """Descarta os eventos de span (para o console continuar legível)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return getattr(record, "event", None) not in (SPAN_START_EVENT, SPAN_END_EVENT)
+
+class Span:
+    """
+    Estágio de uma requisição: registra início e fim (com duração e status)
+
+    Uso:
+        with Span(self.logger, "llm"):
+            response = self.llm.invoke(prompt)
+    """
+
+    # Frames entre o logger e o código que abriu o span (module/function/line do registro)
+    _stacklevel = 2
+
+    def __init__(self, logger: logging.Logger, name: str, **fields: Any):
+        self.logger = logger
+        self.name = name
+        self.fields = fields
+        self.span_id = new_id()
+        self.parent_span_id: Optional[str] = None
+        # Status do fim do span ("error" também quando o estágio trata a exceção)
+        self.status: Optional[str] = None
+        self._token = None
+        self._start = 0.0
+
+    def __enter__(self) -> "Span":
+        self.parent_span_id = span_id_var.get()
+        self._token = span_id_var.set(self.span_id)
+        self.logger.info(
+            f"Início: {self.name}",
+            extra={
+                "event": SPAN_START_EVENT,
+                "span": self.name,
+                "span_id": self.span_id,
+                "parent_span_id": self.parent_span_id,
+                **self.fields
+            },
+            stacklevel=self._stacklevel
+        )
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        span_id_var.reset(self._token)
+        self.logger.info(
+            f"Fim: {self.name} ({duration_ms:.1f} ms)",
+            extra={
+                "event": SPAN_END_EVENT,
+                "span": self.name,
+                "span_id": self.span_id,
+                "parent_span_id": self.parent_span_id,
+                "duration_ms": round(duration_ms, 3),
+                "status": "error" if exc_type else (self.status or "ok")
+            },
+            stacklevel=self._stacklevel
+        )
+        return False
+
+class RequestScope(Span):
+    """
+    Span raiz de uma requisição
+
+    Reaproveita o request_id do contexto (ex.: definido por um servidor) ou
+    cria um novo; ao sair, o contexto anterior é restaurado.
+    """
+
+    _stacklevel = 3
+
+    def __init__(self, logger: logging.Logger, name: str = "request", request_id: Optional[str] = None,
+                 **fields: Any):
+        super().__init__(logger, name, **fields)
+        self.request_id = request_id
+        self._request_token = None
+
+    def __enter__(self) -> "RequestScope":
+        if self.request_id or request_id_var.get() is None:
+            self._request_token = request_id_var.set(self.request_id or new_id())
+        self.request_id = request_id_var.get()
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            return super().__exit__(exc_type, exc, tb)
+        finally:
+            if self._request_token is not None:
+                request_id_var.reset(self._request_token)
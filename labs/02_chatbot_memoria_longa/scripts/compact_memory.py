@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compactação offline da memória de longo prazo
+Consolida mensagens antigas por sessão e reporta o espaço recuperado
+"""
+
+import sys
+import json
+import argparse
+from dataclasses import replace
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.logging_config import setup_logging
+from src.utils.config import load_config
+from src.core.chatbot import LongTermMemoryChatbot
+from src.core.memory_compaction import CompactionPolicy
+
+
+def parse_args():
+    """Lê os argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Compacta a memória de longo prazo do chatbot")
+    parser.add_argument("--min-age-hours", type=float, help="Idade mínima das mensagens compactadas")
+    parser.add_argument("--min-session-messages", type=int, help="Mínimo de mensagens antigas por sessão")
+    parser.add_argument("--keep-recent", type=int, help="Mensagens recentes preservadas por sessão")
+    parser.add_argument("--cluster-size", type=int, help="Mensagens por entrada consolidada")
+    parser.add_argument("--drop-importance", type=float, help="Importância abaixo da qual a mensagem é descartada")
+    parser.add_argument("--fact-importance", type=float, help="Importância a partir da qual a mensagem vira fato")
+    parser.add_argument("--no-llm", action="store_true", help="Usa apenas resumo extrativo (sem chamadas ao LLM)")
+    parser.add_argument("--dry-run", action="store_true", help="Apenas calcula o relatório, sem alterar a memória")
+    parser.add_argument("--output", "-o", help="Arquivo JSON para salvar o relatório")
+    return parser.parse_args()
+
+
+def main():
+    """Função principal"""
+    args = parse_args()
+    logger = setup_logging("logs/compaction.log")
+
+    config = load_config()
+    chatbot = LongTermMemoryChatbot(config, logger)
+
+    overrides = {
+        "min_age_hours": args.min_age_hours,
+        "min_session_messages": args.min_session_messages,
+        "keep_recent": args.keep_recent,
+        "cluster_size": args.cluster_size,
+        "drop_importance": args.drop_importance,
+        "fact_importance": args.fact_importance,
+    }
+    policy = replace(
+        CompactionPolicy.from_config(config),
+        **{k: v for k, v in overrides.items() if v is not None},
+        use_llm=not args.no_llm and config.get("compaction_use_llm", True),
+        dry_run=args.dry_run
+    )
+
+    print("🗜️  Compactando memória de longo prazo...")
+    try:
+        report = chatbot.compact_memory(policy)
+    except ValueError as e:
+        logger.error(f"Erro na compactação: {e}")
+        print(f"❌ Erro: {e}")
+        return 1
+
+    print("\n📊 RELATÓRIO DE COMPACTAÇÃO")
+    print("=" * 50)
+    print(f"   • Sessões analisadas: {report.sessions_scanned}")
+    print(f"   • Sessões compactadas: {report.sessions_compacted}")
+    print(f"   • Vetores antes: {report.vectors_before}")
+    print(f"   • Vetores removidos/adicionados: {report.vectors_removed}/{report.vectors_added}")
+    print(f"   • Vetores recuperados: {report.vectors_reclaimed}")
+    print(f"   • Bytes recuperados: {report.bytes_reclaimed}")
+    print(f"   • Fatos preservados: {report.facts_kept} | Resumos: {report.summaries_created}")
+    print(f"   • Mensagens descartadas: {report.messages_dropped}")
+    print(f"   • Duração: {report.duration_seconds:.2f}s")
+    if report.dry_run:
+        print("   ⚠️  Dry-run: nenhuma alteração foi aplicada")
+    for error in report.errors:
+        print(f"   ❌ {error}")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, indent=2, ensure_ascii=False)
+        print(f"\n📄 Relatório salvo em: {args.output}")
+
+    return 0 if not report.errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Teste de carga sintético da memória de longo prazo
+Mede como a latência de recuperação, o tempo de armazenamento e o tamanho do
+prompt crescem conforme a memória vai de 10^3 a 10^6 mensagens, usando
+modelos locais (sem chamadas à OpenAI)
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.logging_config import setup_logging
+from src.utils.config import load_config
+from src.utils.load_generator import SyntheticWorkload, RECALL, RECALL_OPEN
+from src.core.memory_message import MemoryMessage
+from src.core.memory_dedup import simhash, simhash_metadata
+
+# Usuários das sondagens ficam fora da faixa usada na pré-carga
+PROBE_USER_OFFSET = 50_000_000
+
+LOCAL_RESPONSES = [
+    "Entendi! Vou guardar essa informação.",
+    "Pelo que você me contou antes, posso ajudar com isso.",
+    "Claro! Vamos por partes.",
+]
+
+
+def parse_args():
+    """Lê os argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Teste de carga sintético da memória de longo prazo")
+    parser.add_argument("--seed", type=int, default=42, help="Seed da geração (padrão: 42)")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000],
+                        help="Tamanhos da memória medidos (padrão: 10^3 a 10^6)")
+    parser.add_argument("--probe-users", type=int, default=20,
+                        help="Usuários novos cuja conversa é enviada ao chatbot em cada tamanho")
+    parser.add_argument("--dim", type=int, default=256, help="Dimensão dos embeddings locais")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Mensagens por lote na pré-carga")
+    parser.add_argument("--backend", choices=["chroma", "fts5", "hybrid"], default="chroma",
+                        help="Backend da memória de longo prazo (padrão: chroma)")
+    parser.add_argument("--test-mode", action="store_true",
+                        help="Usa a memória simulada (índice invertido) em vez do backend")
+    parser.add_argument("--data-dir", help="Diretório dos bancos (padrão: temporário)")
+    parser.add_argument("--output-dir", default="reports", help="Diretório dos resultados")
+    parser.add_argument("--no-plot", action="store_true", help="Não gera o gráfico")
+    return parser.parse_args()
+
+
+def build_chatbot(args, data_dir: Path, logger):
+    """Cria o chatbot com LLM e embeddings locais"""
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain_core.language_models import FakeListChatModel
+    from src.core.chatbot import LongTermMemoryChatbot
+
+    # Os modelos locais não usam a chave; load_config só exige que exista
+    os.environ.setdefault("OPENAI_API_KEY", "local")
+    config = load_config()
+    config.update(
+        test_mode=args.test_mode,
+        memory_backend=args.backend,
+        memory_fts_path=str(data_dir / "memory_fts.db"),
+        memory_persistence_path=str(data_dir / "chroma_db"),
+        user_facts_db_path=str(data_dir / "user_facts.db"),
+        conversation_log_path=str(data_dir / "conversation_log.db"),
+        compaction_interval_seconds=0,
+    )
+    return LongTermMemoryChatbot(
+        config,
+        logger,
+        llm=FakeListChatModel(responses=LOCAL_RESPONSES),
+        embeddings=DeterministicFakeEmbedding(size=args.dim)
+    )
+
+
+def memory_size(chatbot) -> int:
+    """Número de mensagens na memória de longo prazo"""
+    if chatbot.memory_backend is not None:
+        return chatbot.memory_backend.count()
+    return len(chatbot._test_memory)
+
+
+def prefill(chatbot, messages, count: int, batch_size: int, indices: dict):
+    """
+    Acrescenta count mensagens sintéticas direto na memória, em lotes
+
+    Cada lote vai para o backend em uma única chamada (embeddings em lote no
+    ChromaDB) e os metadados seguem o formato de _store_single_message
+    (índice da mensagem, importância e SimHash).
+    """
+    added = 0
+    while added < count:
+        batch = []
+        for _ in range(min(batch_size, count - added)):
+            session_id, role, content = next(messages)
+            message = MemoryMessage(content, role)
+            index = indices.get(session_id, 0)
+            indices[session_id] = index + 1
+            batch.append((session_id, message, index))
+        added += len(batch)
+
+        if chatbot.memory_backend is None:
+            for session_id, message, _ in batch:
+                chatbot._test_memory.add(session_id, message.to_text())
+            continue
+
+        entries = []
+        for session_id, message, index in batch:
+            metadata = message.metadata(session_id, index)
+            metadata.update(simhash_metadata(simhash(message.content)))
+            entries.append((message.to_text(), metadata))
+        chatbot.memory_backend.add(entries)
+
+
+def percentiles(values, scale: float = 1.0):
+    """Média, p50 e p95 de uma série"""
+    if not values:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0}
+    array = np.asarray(values, dtype=np.float64) * scale
+    return {
+        "mean": float(array.mean()),
+        "p50": float(np.percentile(array, 50)),
+        "p95": float(np.percentile(array, 95)),
+    }
+
+
+def probe(chatbot, workload: SyntheticWorkload, users: int, start: int):
+    """Envia as conversas de usuários novos ao chatbot e coleta os tempos por etapa"""
+    samples = {"retrieval": [], "storage": [], "response": [], "prompt_tokens": []}
+    recalls = recalls_with_memory = failures = 0
+
+    for turn in workload.turns(users, start):
+        result = chatbot.process_query(turn.query, turn.session_id, turn.user_id)
+        if not result["success"]:
+            failures += 1
+            continue
+        memory_metrics = result["memory_metrics"]
+        samples["retrieval"].append(memory_metrics.get("retrieval_time", 0.0))
+        samples["storage"].append(memory_metrics.get("storage_time", 0.0))
+        samples["response"].append(result["response_time"])
+        samples["prompt_tokens"].append(memory_metrics.get("prompt_tokens", 0))
+        if turn.kind in (RECALL, RECALL_OPEN):
+            recalls += 1
+            recalls_with_memory += bool(memory_metrics.get("memory_context_used"))
+
+    return samples, {
+        "queries": len(samples["response"]) + failures,
+        "failures": failures,
+        "recall_memory_rate": (recalls_with_memory / recalls * 100) if recalls else 0.0,
+    }
+
+
+def save_results(rows, info, output_dir: Path, plot: bool):
+    """Grava CSV, JSON e (se o matplotlib estiver instalado) o gráfico"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = output_dir / f"load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    with open(f"{stem}.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(f"{stem}.json", "w", encoding="utf-8") as f:
+        json.dump({"info": info, "results": rows}, f, indent=2, ensure_ascii=False)
+    print(f"📄 Resultados salvos em: {stem}.csv / {stem}.json")
+
+    if not plot:
+        return
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("ℹ️  matplotlib não instalado: gráfico não gerado")
+        return
+
+    sizes = [row["memory_size"] for row in rows]
+    fig, axes = plt.subplots(1, 3, figsize=(15, 4))
+    for ax, (metric, label) in zip(axes, [("retrieval", "Recuperação (ms)"), ("storage", "Armazenamento (ms)"),
+                                          ("prompt_tokens", "Tokens do prompt")]):
+        ax.plot(sizes, [row[f"{metric}_p50"] for row in rows], marker="o", label="p50")
+        ax.plot(sizes, [row[f"{metric}_p95"] for row in rows], marker="o", label="p95")
+        ax.set_xscale("log")
+        ax.set_xlabel("Mensagens na memória")
+        ax.set_title(label)
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(f"{stem}.png", dpi=120)
+    print(f"📈 Gráfico salvo em: {stem}.png")
+
+
+def main():
+    """Função principal"""
+    args = parse_args()
+    logger = setup_logging("logs/load_test.log")
+    # Logs por mensagem distorceriam os tempos medidos
+    logger.setLevel(logging.WARNING)
+
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp(prefix="load_test_"))
+    print(f"🔧 Dados do teste em: {data_dir}")
+
+    try:
+        chatbot = build_chatbot(args, data_dir, logger)
+    except Exception as e:
+        logger.error(f"Erro ao inicializar o chatbot: {e}")
+        print(f"❌ Erro: {e}")
+        return 1
+
+    workload = SyntheticWorkload(seed=args.seed)
+    messages = workload.messages()
+    indices = {}
+    rows = []
+    probe_start = PROBE_USER_OFFSET
+
+    backend = chatbot.memory_backend.name if chatbot.memory_backend else "simulated"
+    print(f"🧪 Backend: {backend} | seed {args.seed}")
+    for scale in sorted(args.scales):
+        missing = scale - memory_size(chatbot)
+        if missing > 0:
+            print(f"\n📥 Pré-carregando {missing} mensagens (alvo: {scale})...")
+            start = time.time()
+            prefill(chatbot, messages, missing, args.batch_size, indices)
+            print(f"   ✅ {missing / (time.time() - start):.0f} mensagens/s")
+
+        size = memory_size(chatbot)
+        print(f"🔄 Sondando com {args.probe_users} usuários novos ({size} mensagens na memória)...")
+        samples, summary = probe(chatbot, workload, args.probe_users, probe_start)
+        probe_start += args.probe_users
+
+        row = {"scale": scale, "memory_size": size, **summary}
+        for metric, scale_factor in [("retrieval", 1000), ("storage", 1000), ("response", 1000), ("prompt_tokens", 1)]:
+            for stat, value in percentiles(samples[metric], scale_factor).items():
+                row[f"{metric}_{stat}"] = value
+        rows.append(row)
+
+        print(f"   ⚡ Recuperação p50/p95: {row['retrieval_p50']:.1f}/{row['retrieval_p95']:.1f} ms | "
+              f"Armazenamento p50/p95: {row['storage_p50']:.1f}/{row['storage_p95']:.1f} ms | "
+              f"Prompt médio: {row['prompt_tokens_mean']:.0f} tokens")
+
+    chatbot.close()
+    info = {
+        "workload": workload.describe(),
+        "backend": backend,
+        "embedding_dim": args.dim,
+        "probe_users": args.probe_users,
+        "timestamp": datetime.now().isoformat(),
+    }
+    save_results(rows, info, Path(args.output_dir), not args.no_plot)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -56,6 +56,12 @@ def main():
         chatbot = LongTermMemoryChatbot(config, logger)
         
         print("✅ Chatbot inicializado com sucesso!")
+        
+        # Recupera a janela da sessão anterior a partir do log de conversas
+        session = chatbot.rehydrate_session("default")
+        if session:
+            print(f"📂 Sessão anterior recuperada: {len(session.messages)} mensagens")
+        
         print_banner()
         
         # Loop principal de conversa
@@ -121,6 +127,8 @@ def main():
         logger.error(f"Erro fatal na inicialização: {e}")
         return 1
     
+    chatbot.save_session_summary("default")
+    chatbot.conversation_log.close()
     logger.info("Chatbot finalizado")
     return 0
 
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Migração da memória de longo prazo para o formato compacto
+Reescreve entradas que armazenaram o repr completo do AIMessage
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.logging_config import setup_logging
+from src.utils.config import load_config
+from src.core.chatbot import LongTermMemoryChatbot
+
+
+def main():
+    """Função principal"""
+    logger = setup_logging("logs/migration.log")
+
+    config = load_config()
+    chatbot = LongTermMemoryChatbot(config, logger)
+
+    print("🔄 Migrando entradas da memória de longo prazo...")
+    try:
+        stats = chatbot.migrate_memory_entries()
+    except ValueError as e:
+        logger.error(f"Erro na migração: {e}")
+        print(f"❌ Erro: {e}")
+        return 1
+
+    print(f"   • Entradas analisadas: {stats['scanned']}")
+    print(f"   • Entradas reescritas: {stats['rewritten']}")
+    print(f"   • Bytes economizados no texto: {stats['bytes_saved']}")
+    print("✅ Migração concluída!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP assíncrono do Chatbot com Memória Longa
+Atende várias sessões de chat simultâneas em um único processo
+"""
+
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.logging_config import setup_logging
+from src.utils.config import load_config
+from src.core.chatbot import LongTermMemoryChatbot
+from src.core.chat_server import ChatServer
+
+
+def parse_args():
+    """Lê os argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Servidor HTTP assíncrono do chatbot")
+    parser.add_argument("--host", help="Endereço de escuta")
+    parser.add_argument("--port", type=int, help="Porta de escuta")
+    parser.add_argument("--max-concurrency", type=int, help="Máximo de queries processadas ao mesmo tempo")
+    return parser.parse_args()
+
+
+def main():
+    """Função principal"""
+    args = parse_args()
+    logger = setup_logging("logs/server.log")
+    chatbot = None
+
+    try:
+        print("🔧 Carregando configurações...")
+        config = load_config()
+
+        print("🤖 Inicializando chatbot...")
+        chatbot = LongTermMemoryChatbot(config, logger)
+
+        server = ChatServer(
+            chatbot,
+            host=args.host or config["server_host"],
+            port=args.port or config["server_port"],
+            max_concurrency=args.max_concurrency or config["server_max_concurrency"],
+            logger=logger
+        )
+
+        print(f"🚀 Servidor ouvindo em http://{server.host}:{server.port} "
+              f"(concorrência máxima: {server.max_concurrency})")
+        print("💡 POST /chat com {\"query\": \"...\", \"session_id\": \"...\"} — Ctrl+C para sair")
+        asyncio.run(server.serve_forever())
+
+    except KeyboardInterrupt:
+        print("\n👋 Servidor encerrado")
+    except Exception as e:
+        logger.error(f"Erro no servidor: {e}")
+        print(f"❌ Erro: {e}")
+        sys.exit(1)
+    finally:
+        # Grava no log os turnos ainda pendentes no buffer antes de sair
+        if chatbot is not None:
+            chatbot.close()
+
+
+if __name__ == "__main__":
+    main()
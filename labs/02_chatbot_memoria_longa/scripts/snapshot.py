@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Exportação e importação de snapshots da memória de longo prazo
+Move ou replica sessões entre nós sem re-embedar as mensagens
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.logging_config import setup_logging
+from src.utils.config import load_config
+from src.core.chatbot import LongTermMemoryChatbot
+
+
+def parse_args():
+    """Lê os argumentos de linha de comando"""
+    parser = argparse.ArgumentParser(description="Exporta/importa snapshots da memória de longo prazo")
+    parser.add_argument("action", choices=["export", "import"], help="Operação")
+    parser.add_argument("path", help="Arquivo do snapshot")
+    parser.add_argument("--session", "-s", action="append", dest="sessions",
+                        help="Sessão a exportar/importar (pode repetir; padrão: todas)")
+    return parser.parse_args()
+
+
+def main():
+    """Função principal"""
+    args = parse_args()
+    logger = setup_logging("logs/snapshot.log")
+
+    config = load_config()
+    chatbot = LongTermMemoryChatbot(config, logger)
+
+    try:
+        if args.action == "export":
+            print(f"📦 Exportando memória para {args.path}...")
+            stats = chatbot.export_sessions(args.path, args.sessions)
+            print(f"✅ {stats['records']} registros de {stats['sessions']} sessões "
+                  f"({stats['bytes'] / 1024 / 1024:.1f} MB)")
+        else:
+            print(f"📥 Importando snapshot {args.path}...")
+            stats = chatbot.import_sessions(args.path, args.sessions)
+            print(f"✅ {stats['imported']} registros importados, {stats['skipped']} já existentes")
+    except (OSError, ValueError) as e:
+        logger.error(f"Erro no snapshot: {e}")
+        print(f"❌ Erro: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,16 +3,20 @@
 Script de validação final do laboratório - Memória de Longo Prazo
 """
 
+import re
 import sys
 import os
 import json
+import time
+import asyncio
+import argparse
 from datetime import datetime
 from pathlib import Path
 
 # Adiciona o diretório src ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-def validate_laboratory():
+def validate_laboratory(max_parallel=0):
     """Validação completa do laboratório"""
     
     print("🧪 VALIDAÇÃO FINAL DO LABORATÓRIO")
@@ -33,18 +37,19 @@ def validate_laboratory():
         config = load_config()
         logger = setup_logging()
         chatbot = LongTermMemoryChatbot(config, logger)
-        metrics = MemoryMetrics()
+        metrics = MemoryMetrics(collect_columns=True)
         
         print("✅ Componentes inicializados")
         
         # Executa cenários de validação
-        validation_scenarios = run_validation_scenarios(chatbot, metrics, logger)
+        validation_scenarios, schedule = run_validation_scenarios(chatbot, metrics, logger, max_parallel)
         
         # Executa validações complementares
         complementary_validations = run_complementary_validations(chatbot, metrics, logger)
         
         # Gera relatório final
         final_report = generate_final_report(metrics, validation_scenarios, complementary_validations)
+        final_report["scenario_schedule"] = schedule
         
         # Exibe resultados
         display_final_results(final_report)
@@ -63,10 +68,10 @@ def validate_laboratory():
         traceback.print_exc()
         return None
 
-def run_validation_scenarios(chatbot, metrics, logger):
-    """Executa cenários de validação específicos do laboratório"""
+def get_validation_scenarios():
+    """Cenários de validação específicos do laboratório"""
     
-    scenarios = [
+    return [
         {
             "id": "basic_memory",
             "name": "Memória Básica",
@@ -187,84 +192,204 @@ def run_validation_scenarios(chatbot, metrics, logger):
             ]
         }
     ]
-    
+
+def group_scenarios(scenarios):
+    """
+    Agrupa os cenários em trilhas independentes
+    
+    Cenários que compartilham uma sessão, ou uma família de sessões
+    (session_cross_1, session_cross_2... -> session_cross), ficam na mesma
+    trilha e são executados em ordem; trilhas diferentes podem rodar em paralelo.
+    """
+    lanes = []  # (famílias de sessão, cenários)
+    for scenario in scenarios:
+        families = {re.sub(r"_\d+$", "", session_id) for _, session_id in scenario["queries"]}
+        merged = [lane for lane in lanes if lane[0] & families]
+        lane = (families, [])
+        for other in merged:
+            lanes.remove(other)
+            lane[0].update(other[0])
+            lane[1].extend(other[1])
+        lane[1].append(scenario)
+        lanes.append(lane)
+    
+    # Mantém a ordem original dos cenários dentro de cada trilha
+    order = {scenario["id"]: i for i, scenario in enumerate(scenarios)}
+    return [sorted(lane, key=lambda scenario: order[scenario["id"]]) for _, lane in lanes]
+
+def _new_scenario_results(scenario):
+    """Estrutura de resultados de um cenário"""
+    return {
+        "total_queries": len(scenario["queries"]),
+        "successful_queries": 0,
+        "memory_used_count": 0,
+        "responses": [],
+        "performance_metrics": {
+            "avg_response_time": 0.0,
+            "min_response_time": float('inf'),
+            "max_response_time": 0.0
+        }
+    }
+
+def _record_result(scenario_results, response_times, metrics, query, session_id, result):
+    """Registra o resultado de uma query nas métricas e no cenário"""
+    metrics.record_query({
+        "query": query,
+        "session_id": session_id,
+        "response": result.get("response", ""),
+        "memory_metrics": result.get("memory_metrics", {}),
+        "response_time": result.get("response_time", 0.0),
+        "tokens_used": result.get("tokens_used", 0),
+        "token_usage": result.get("token_usage"),
+        "confidence": result.get("confidence", 0.0),
+        "success": result.get("success", False)
+    })
+    
+    if result["success"]:
+        scenario_results["successful_queries"] += 1
+        if result["memory_metrics"]["memory_context_used"]:
+            scenario_results["memory_used_count"] += 1
+        
+        # Coleta métricas de performance
+        response_time = result.get("response_time", 0.0)
+        response_times.append(response_time)
+        performance = scenario_results["performance_metrics"]
+        performance["min_response_time"] = min(performance["min_response_time"], response_time)
+        performance["max_response_time"] = max(performance["max_response_time"], response_time)
+        
+        scenario_results["responses"].append({
+            "query": query,
+            "response": result["response"],
+            "memory_used": result["memory_metrics"]["memory_context_used"],
+            "response_time": response_time
+        })
+        return None
+    return result.get('error_message', 'Erro desconhecido')
+
+def _finish_scenario(scenario_results, response_times, duration):
+    """Calcula as métricas de performance do cenário"""
+    if response_times:
+        scenario_results["performance_metrics"]["avg_response_time"] = sum(response_times) / len(response_times)
+    scenario_results["duration_seconds"] = duration
+
+def _print_scenario_summary(scenario, scenario_results):
+    """Exibe a taxa de sucesso, uso de memória e performance do cenário"""
+    success_rate = (scenario_results["successful_queries"] / scenario_results["total_queries"]) * 100
+    memory_rate = (scenario_results["memory_used_count"] / scenario_results["successful_queries"]) * 100 if scenario_results["successful_queries"] > 0 else 0
+    
+    print(f"   ✅ Sucesso: {success_rate:.1f}% | 🧠 Memória: {memory_rate:.1f}%")
+    if scenario_results["responses"]:
+        print(f"   ⚡ Performance: {scenario_results['performance_metrics']['avg_response_time']:.2f}s (média)")
+
+def _run_scenarios_sequential(chatbot, metrics, scenarios):
+    """Executa os cenários um após o outro (process_query)"""
     results = {}
     
     for scenario in scenarios:
         print(f"\n🔄 Executando: {scenario['name']}")
         print(f"   Descrição: {scenario['description']}")
         
-        scenario_results = {
-            "total_queries": len(scenario["queries"]),
-            "successful_queries": 0,
-            "memory_used_count": 0,
-            "responses": [],
-            "performance_metrics": {
-                "avg_response_time": 0.0,
-                "min_response_time": float('inf'),
-                "max_response_time": 0.0
-            }
-        }
-        
+        scenario_start = time.time()
+        scenario_results = _new_scenario_results(scenario)
         response_times = []
         
         for i, (query, session_id) in enumerate(scenario["queries"], 1):
             print(f"   Query {i}: {query[:50]}...")
             
             result = chatbot.process_query(query, session_id)
-            
-            # Registra métricas
-            metrics.record_query({
-                "query": query,
-                "session_id": session_id,
-                "response": result.get("response", ""),
-                "memory_metrics": result.get("memory_metrics", {}),
-                "response_time": result.get("response_time", 0.0),
-                "success": result.get("success", False)
-            })
-            
-            if result["success"]:
-                scenario_results["successful_queries"] += 1
-                if result["memory_metrics"]["memory_context_used"]:
-                    scenario_results["memory_used_count"] += 1
-                
-                # Coleta métricas de performance
-                response_time = result.get("response_time", 0.0)
-                response_times.append(response_time)
-                scenario_results["performance_metrics"]["min_response_time"] = min(
-                    scenario_results["performance_metrics"]["min_response_time"], 
-                    response_time
-                )
-                scenario_results["performance_metrics"]["max_response_time"] = max(
-                    scenario_results["performance_metrics"]["max_response_time"], 
-                    response_time
-                )
-                
-                scenario_results["responses"].append({
-                    "query": query,
-                    "response": result["response"],
-                    "memory_used": result["memory_metrics"]["memory_context_used"],
-                    "response_time": response_time
-                })
-            else:
-                print(f"      ⚠️ Erro: {result.get('error_message', 'Erro desconhecido')}")
-        
-        # Calcula métricas de performance do cenário
-        if response_times:
-            scenario_results["performance_metrics"]["avg_response_time"] = sum(response_times) / len(response_times)
+            error = _record_result(scenario_results, response_times, metrics, query, session_id, result)
+            if error:
+                print(f"      ⚠️ Erro: {error}")
         
+        _finish_scenario(scenario_results, response_times, time.time() - scenario_start)
         results[scenario["id"]] = scenario_results
-        
-        # Calcula taxa de sucesso do cenário
-        success_rate = (scenario_results["successful_queries"] / scenario_results["total_queries"]) * 100
-        memory_rate = (scenario_results["memory_used_count"] / scenario_results["successful_queries"]) * 100 if scenario_results["successful_queries"] > 0 else 0
-        
-        print(f"   ✅ Sucesso: {success_rate:.1f}% | 🧠 Memória: {memory_rate:.1f}%")
-        if response_times:
-            print(f"   ⚡ Performance: {scenario_results['performance_metrics']['avg_response_time']:.2f}s (média)")
+        _print_scenario_summary(scenario, scenario_results)
     
     return results
 
+async def _run_scenarios_parallel(chatbot, metrics, lanes, max_parallel):
+    """
+    Executa as trilhas concorrentemente, em ordem dentro de cada trilha
+    
+    Cada query roda process_query em uma thread (o mesmo caminho da execução
+    sequencial); o event loop só agenda as trilhas.
+    """
+    semaphore = asyncio.Semaphore(max_parallel)
+    results = {}
+    errors = {}
+    
+    async def run_lane(lane):
+        async with semaphore:
+            for scenario in lane:
+                scenario_start = time.time()
+                scenario_results = _new_scenario_results(scenario)
+                response_times = []
+                scenario_errors = errors.setdefault(scenario["id"], [])
+                
+                for query, session_id in scenario["queries"]:
+                    result = await asyncio.to_thread(chatbot.process_query, query, session_id)
+                    error = _record_result(scenario_results, response_times, metrics, query, session_id, result)
+                    if error:
+                        scenario_errors.append(error)
+                
+                _finish_scenario(scenario_results, response_times, time.time() - scenario_start)
+                results[scenario["id"]] = scenario_results
+    
+    await asyncio.gather(*(run_lane(lane) for lane in lanes))
+    return results, errors
+
+def run_validation_scenarios(chatbot, metrics, logger, max_parallel=0):
+    """
+    Executa cenários de validação específicos do laboratório
+    
+    Com max_parallel > 1 (ou 0 = uma trilha por tarefa, o padrão), cenários de
+    sessões independentes rodam em paralelo, com process_query em threads (a
+    ordem das queries de cada trilha é mantida); max_parallel = 1 executa tudo
+    em sequência. Os dois modos validam o mesmo caminho (process_query).
+    
+    Returns:
+        (resultados por cenário, informações de agendamento)
+    """
+    scenarios = get_validation_scenarios()
+    lanes = group_scenarios(scenarios)
+    max_parallel = max_parallel or len(lanes)
+    wall_start = time.time()
+    
+    if max_parallel > 1:
+        print(f"\n⚡ Executando {len(scenarios)} cenários em {len(lanes)} trilhas (até {max_parallel} em paralelo)")
+        unordered, errors = asyncio.run(_run_scenarios_parallel(chatbot, metrics, lanes, max_parallel))
+        
+        # Exibe os resultados na ordem original dos cenários
+        results = {}
+        for scenario in scenarios:
+            results[scenario["id"]] = unordered[scenario["id"]]
+            print(f"\n🔄 {scenario['name']} ({results[scenario['id']]['duration_seconds']:.2f}s)")
+            print(f"   Descrição: {scenario['description']}")
+            for error in errors[scenario["id"]]:
+                print(f"      ⚠️ Erro: {error}")
+            _print_scenario_summary(scenario, results[scenario["id"]])
+    else:
+        results = _run_scenarios_sequential(chatbot, metrics, scenarios)
+    
+    wall_time = time.time() - wall_start
+    sequential_time = sum(r["duration_seconds"] for r in results.values())
+    lane_times = [sum(results[scenario["id"]]["duration_seconds"] for scenario in lane) for lane in lanes]
+    schedule = {
+        "mode": "parallel" if max_parallel > 1 else "sequential",
+        "max_parallel": max_parallel,
+        "lanes": [[scenario["id"] for scenario in lane] for lane in lanes],
+        "wall_time_seconds": wall_time,
+        "sum_scenario_seconds": sequential_time,
+        "longest_lane_seconds": max(lane_times, default=0.0),
+        "speedup": sequential_time / wall_time if wall_time > 0 else 1.0
+    }
+    
+    print(f"\n⏱️  Tempo total: {wall_time:.2f}s | Soma dos cenários: {sequential_time:.2f}s | "
+          f"Trilha mais longa: {schedule['longest_lane_seconds']:.2f}s | Speedup: {schedule['speedup']:.2f}x")
+    logger.info(f"Cenários de validação executados em {wall_time:.2f}s (speedup {schedule['speedup']:.2f}x)")
+    
+    return results, schedule
+
 def run_complementary_validations(chatbot, metrics, logger):
     """Executa validações complementares para garantir cobertura completa"""
     
@@ -312,6 +437,32 @@ def run_complementary_validations(chatbot, metrics, logger):
         complementary_results["technical_validations"]["embeddings_working"] = False
         print(f"   ❌ Erro nos embeddings: {e}")
     
+    # Estatísticas da política de escrita (turnos descartados ou resumidos antes de embedar)
+    write_stats = chatbot.get_write_stats()
+    complementary_results["technical_validations"]["write_policy"] = write_stats
+    print(f"   ✅ Política de escrita: {write_stats['skipped']}/{write_stats['evaluated']} escritas evitadas, "
+          f"{write_stats['stored_summary']} resumidas, "
+          f"{write_stats['embedding_tokens_avoided']}/{write_stats['embedding_tokens_total']} tokens de embedding evitados")
+    
+    # Extração de fatos do perfil: frases genéricas e negações não viram fatos
+    from src.core.user_facts import FactExtractor
+    extraction_cases = [
+        ("Eu não moro em Curitiba.", {}),
+        ("Eu não sou professor.", {}),
+        ("Eu sou muito feliz hoje.", {}),
+        ("Eu sou brasileiro.", {}),
+        ("Meu nome é João e não moro em Recife.", {"nome": "João"}),
+        ("Eu sou professor de matemática e moro em Curitiba.",
+         {"profissao": "professor de matemática", "cidade": "Curitiba"}),
+    ]
+    extractor = FactExtractor()
+    extraction_failures = [text for text, expected in extraction_cases if extractor.extract(text) != expected]
+    complementary_results["technical_validations"]["fact_extraction_working"] = not extraction_failures
+    if extraction_failures:
+        print(f"   ❌ Extração de fatos incorreta: {extraction_failures}")
+    else:
+        print(f"   ✅ Extração de fatos: {len(extraction_cases)} casos (incluindo negações) corretos")
+    
     # 2. Validações de Qualidade
     print("\n🎯 Validações de Qualidade:")
     
@@ -403,9 +554,14 @@ def run_complementary_validations(chatbot, metrics, logger):
 def generate_final_report(metrics, validation_scenarios, complementary_validations):
     """Gera relatório final do laboratório"""
     
+    from src.utils.reporting import MemoryReportGenerator
+    
     # Gera relatório base das métricas
     base_report = metrics.generate_lab_report()
     
+    # Relatório detalhado (retenção, coerência, performance) sobre o histórico em colunas
+    memory_report = MemoryReportGenerator().generate_comprehensive_report(metrics.collector)
+    
     # Adiciona análise dos cenários
     scenario_analysis = analyze_scenarios(validation_scenarios)
     
@@ -427,6 +583,7 @@ def generate_final_report(metrics, validation_scenarios, complementary_validatio
         "scenario_analysis": scenario_analysis,
         "complementary_analysis": complementary_analysis,
         "overall_assessment": assess_overall_performance(base_report, scenario_analysis, complementary_analysis),
+        "memory_report": memory_report,
         "recommendations": base_report["recommendations"]
     }
     
@@ -550,6 +707,14 @@ def display_final_results(report):
     print(f"   • Taxa de Sucesso Geral: {scenario_analysis['overall_success_rate']:.1f}%")
     print(f"   • Efetividade da Memória: {scenario_analysis['overall_memory_rate']:.1f}%")
     
+    # Tokens por segmento do prompt
+    tokens = report["memory_report"]["detailed_reports"]["performance"]["overall_performance"]["token_breakdown"]
+    print(f"\n🔤 TOKENS:")
+    print(f"   • Prompt/Resposta (média): {tokens['avg_prompt_tokens']:.0f}/{tokens['avg_completion_tokens']:.0f}")
+    print(f"   • Segmentos do prompt: " + ", ".join(
+        f"{name} {segment['share'] * 100:.0f}%" for name, segment in tokens["segments"].items()))
+    print(f"   • Vazão: {tokens['tokens_per_minute']:.0f} tokens/min")
+    
     # Análise das validações complementares
     complementary_analysis = report["complementary_analysis"]
     print(f"\n🔍 VALIDAÇÕES COMPLEMENTARES:")
@@ -629,7 +794,14 @@ def print_conclusion(report):
     print("\n" + "🎯" * 20)
 
 if __name__ == "__main__":
-    final_report = validate_laboratory()
+    parser = argparse.ArgumentParser(description="Validação final do laboratório de memória de longo prazo")
+    parser.add_argument("--max-parallel", type=int, default=0,
+                        help="Trilhas de cenários executadas em paralelo (padrão: 0 = todas)")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Executa os cenários um após o outro")
+    args = parser.parse_args()
+    
+    final_report = validate_laboratory(1 if args.sequential else args.max_parallel)
     
     if final_report:
         assessment = final_report["overall_assessment"]
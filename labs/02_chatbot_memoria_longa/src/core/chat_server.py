@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP assíncrono para o chatbot com memória de longo prazo
+
+Atende muitas sessões simultâneas em um único processo usando
+LongTermMemoryChatbot.aprocess_query. Mensagens de uma mesma sessão são
+processadas em ordem (lock por sessão) e o total de queries em andamento é
+limitado por um semáforo global. Implementado sobre asyncio.start_server,
+sem dependências adicionais.
+
+Endpoints:
+    POST /chat   {"query": "...", "session_id": "...", "user_id": "..."}
+    GET  /health
+    GET  /stats
+"""
+
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+HTTP_STATUS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class ChatServer:
+    """Front end HTTP/1.1 com ordenação por sessão e limite global de concorrência"""
+
+    def __init__(self, chatbot, host: str = "127.0.0.1", port: int = 8080,
+                 max_concurrency: int = 64, max_body_bytes: int = 64 * 1024,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Inicializa o servidor
+
+        Args:
+            chatbot: Instância de LongTermMemoryChatbot
+            host: Endereço de escuta
+            port: Porta de escuta
+            max_concurrency: Máximo de queries processadas ao mesmo tempo
+            max_body_bytes: Tamanho máximo do corpo da requisição
+            logger: Logger opcional
+        """
+        self.chatbot = chatbot
+        self.host = host
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.max_body_bytes = max_body_bytes
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Lock por sessão + número de requisições que o usam (removido quando ocioso)
+        self._session_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+        self.stats = {
+            "requests_total": 0,
+            "requests_failed": 0,
+            "active": 0,
+            "max_active": 0,
+        }
+
+    @asynccontextmanager
+    async def _session_lock(self, session_id: str):
+        """Serializa as requisições de uma sessão, mantendo a ordem de chegada"""
+        lock, users = self._session_locks.get(session_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._session_locks[session_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._session_locks[session_id]
+            if users <= 1:
+                del self._session_locks[session_id]
+            else:
+                self._session_locks[session_id] = (lock, users - 1)
+
+    async def handle_chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Processa uma mensagem de chat respeitando a ordem da sessão e o limite global
+
+        Args:
+            payload: Corpo JSON com query, session_id e user_id opcional
+
+        Returns:
+            Resultado de aprocess_query
+        """
+        query = payload["query"]
+        session_id = str(payload.get("session_id") or "default")
+        user_id = payload.get("user_id")
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Primeiro a ordem da sessão, depois a vaga global: quem espera a própria
+        # sessão não ocupa uma das vagas de concorrência
+        async with self._session_lock(session_id):
+            async with self._semaphore:
+                self.stats["active"] += 1
+                self.stats["max_active"] = max(self.stats["max_active"], self.stats["active"])
+                try:
+                    result = await self.chatbot.aprocess_query(query, session_id, user_id)
+                finally:
+                    self.stats["active"] -= 1
+
+        self.stats["requests_total"] += 1
+        if not result.get("success"):
+            self.stats["requests_failed"] += 1
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna as estatísticas do servidor"""
+        return {
+            **self.stats,
+            "sessions_waiting": len(self._session_locks),
+            "max_concurrency": self.max_concurrency,
+        }
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+        """Lê uma requisição HTTP/1.1 (None quando a conexão foi fechada)"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        method, path, version = request_line.decode("latin-1").strip().split(" ", 2)
+
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", "0") or 0)
+        if length > self.max_body_bytes:
+            raise ValueError("payload_too_large")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, version, headers, body
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """Encaminha a requisição para o endpoint correspondente"""
+        path = path.split("?", 1)[0]
+
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.get_stats()
+        if path != "/chat":
+            return 404, {"error": "endpoint não encontrado"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            return 400, {"error": "JSON inválido"}
+        if not isinstance(payload, dict) or not str(payload.get("query", "")).strip():
+            return 400, {"error": "campo 'query' obrigatório"}
+
+        return 200, await self.handle_chat(payload)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atende uma conexão (com keep-alive)"""
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ValueError as e:
+                    status = 413 if str(e) == "payload_too_large" else 400
+                    await self._write_response(writer, status, {"error": HTTP_STATUS[status]}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, version, headers, body = request
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    and version.upper() != "HTTP/1.0"
+                )
+
+                try:
+                    status, payload = await self._route(method, path, body)
+                except Exception as e:
+                    self.logger.error(f"Erro ao processar requisição {method} {path}: {e}")
+                    status, payload = 500, {"error": str(e)}
+
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: int,
+                              payload: Dict[str, Any], keep_alive: bool = True):
+        """Escreve a resposta JSON"""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def start(self) -> asyncio.AbstractServer:
+        """Inicia o servidor (sem bloquear)"""
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.logger.info(
+            f"Servidor de chat ouvindo em http://{self.host}:{self.port} "
+            f"(concorrência máxima: {self.max_concurrency})"
+        )
+        return self._server
+
+    async def serve_forever(self):
+        """Inicia o servidor e atende até ser cancelado"""
+        server = self._server or await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def stop(self):
+        """Encerra o servidor"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            self.logger.info("Servidor de chat encerrado")
@@ -4,49 +4,76 @@ Chatbot Engine com Memória de Longo Prazo usando LangChain
 """
 
 import time
+import atexit
+import asyncio
 import logging
 import json
-from typing import Dict, Any, List, Optional
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.prompts import ChatPromptTemplate
 from langchain.memory import ConversationBufferWindowMemory, ConversationSummaryMemory
 from langchain_chroma import Chroma
-from langchain.schema import BaseMessage, HumanMessage, AIMessage
+from langchain.schema import BaseMessage, HumanMessage, AIMessage, get_buffer_string
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from pydantic import BaseModel
 
-class ConversationMemory(BaseModel):
-    """Modelo para armazenar informações da conversa"""
-    session_id: str
-    messages: List[Dict[str, Any]]
-    summary: Optional[str] = None
-    created_at: str
-    updated_at: str
+from src.core.memory_compaction import MemoryCompactor, CompactionPolicy, CompactionReport
+from src.core.user_facts import FactExtractor, UserFactStore, FACT_LABELS, format_profile_context, memory_source
+from src.core.memory_index import InvertedMemoryIndex
+from src.core.memory_message import MemoryMessage, migrate_bloated_entries
+from src.utils.tokens import count_tokens, token_usage, call_usage
+from src.utils.logging_config import METRICS_EVENT
+from src.utils.tracing import RequestScope, Span
+from src.core.memory_ranking import RankingWeights, rank_memories
+from src.core.write_policy import WritePolicy, WritePolicyConfig, SKIP, SUMMARY
+from src.core.conversation_log import ConversationLog, ConversationMemory
+from src.core.memory_backends import FTS5MemoryBackend, HybridMemoryBackend, create_memory_backend
+from src.core.cassette import CassetteChatModel, CassetteEmbeddings, load_cassette
+from src.core.memory_snapshot import SnapshotReader, write_snapshot, export_collection, import_collection
+from src.core.memory_dedup import (
+    SimHashIndex, simhash, simhash_metadata, find_near_duplicate, dedupe_candidates, dedupe_texts
+)
 
 class LongTermMemoryChatbot:
     """Chatbot com memória de longo prazo usando LangChain e ChromaDB"""
     
-    def __init__(self, config: Dict[str, Any], logger: Optional[logging.Logger] = None):
+    def __init__(self, config: Dict[str, Any], logger: Optional[logging.Logger] = None,
+                 llm: Optional[Any] = None, embeddings: Optional[Any] = None):
         """
         Inicializa o chatbot com memória de longo prazo
         
         Args:
             config: Configurações do chatbot
             logger: Logger opcional (se não fornecido, cria um novo)
+            llm: Modelo de chat opcional (padrão: ChatOpenAI; útil para modelos locais em testes de carga)
+            embeddings: Embeddings opcionais (padrão: OpenAIEmbeddings)
         """
         self.config = config
         self.logger = logger or logging.getLogger(__name__)
         
+        # Cassete de gravação/reprodução (no replay não há chamadas à API)
+        self.cassette = load_cassette(config, self.logger)
+        live = self.cassette is None or self.cassette.recording
+        
         # Inicializa o LLM
-        self.llm = ChatOpenAI(
+        self.llm = llm or (ChatOpenAI(
             model=config["model_name"],
             temperature=config["temperature"]
-        )
+        ) if live else None)
         
         # Inicializa embeddings
-        self.embeddings = OpenAIEmbeddings()
+        self.embeddings = embeddings or (OpenAIEmbeddings() if live else None)
+        
+        if self.cassette is not None:
+            self.llm = CassetteChatModel(
+                inner=self.llm,
+                cassette=self.cassette,
+                model_key=config["model_name"],
+                temperature=config["temperature"]
+            )
+            self.embeddings = CassetteEmbeddings(self.embeddings, self.cassette)
         
         # Configura memória de conversa
         self.conversation_memory = ConversationBufferWindowMemory(
@@ -54,14 +81,42 @@ class LongTermMemoryChatbot:
             return_messages=True
         )
         
-        # Configura memória de resumo para longo prazo
+        # Configura memória de resumo para longo prazo (o resumo de cada sessão
+        # fica no log de conversas; summary_memory.buffer é o da última sessão)
         self.summary_memory = ConversationSummaryMemory(
             llm=self.llm
         )
         
+        # process_query pode rodar em várias threads (trilhas do validate_lab)
+        self._memory_lock = threading.Lock()
+        
+        # Distância de Hamming máxima para considerar duas memórias quase idênticas
+        self.dedup_max_hamming = config.get("memory_dedup_max_hamming", 3)
+        
         # Inicializa vetorstore para memória de longo prazo
         self._setup_vectorstore()
         
+        # Pesos do ranking de memória (distância, recência, tipo e importância)
+        self.ranking_weights = RankingWeights.from_config(config)
+        
+        # Perfil estruturado do usuário (consultado antes da memória vetorial)
+        self.fact_extractor = FactExtractor()
+        self.fact_store = UserFactStore(
+            ":memory:" if config.get("test_mode", False) else config.get("user_facts_db_path", "data/user_facts.db"),
+            logger=self.logger
+        )
+        
+        # Log durável de mensagens por sessão (define o message_index e permite reidratar sessões)
+        self.conversation_log = ConversationLog(
+            ":memory:" if config.get("test_mode", False) else config.get("conversation_log_path", "data/conversation_log.db"),
+            batch_size=config.get("conversation_log_batch_size", 32),
+            flush_interval=config.get("conversation_log_flush_interval", 1.0),
+            logger=self.logger
+        )
+        
+        # Política de escrita: descarta/resume turnos pouco informativos antes de embedar
+        self.write_policy = WritePolicy(WritePolicyConfig.from_config(config), self.fact_extractor)
+        
         # Template do prompt com contexto de memória
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", self._get_system_prompt()),
@@ -71,20 +126,64 @@ class LongTermMemoryChatbot:
         # Chain do LangChain com memória
         self.chain = self.prompt_template | self.llm
         
+        # Compactação da memória de longo prazo (offline ou em segundo plano)
+        self.compactor = MemoryCompactor(
+            self.vectorstore,
+            llm=self.llm,
+            policy=CompactionPolicy.from_config(config),
+            logger=self.logger,
+            mirror=self._fts_backend() if self.vectorstore else None
+        )
+        compaction_interval = config.get("compaction_interval_seconds", 0)
+        if compaction_interval and self.vectorstore:
+            self.compactor.start_background(compaction_interval)
+        elif compaction_interval and self._fts_backend():
+            self.logger.warning("Compactação em segundo plano desativada: não suportada pelo backend fts5")
+        
+        # Garante o flush do log de conversas mesmo se o processo sair sem chamar close()
+        self._closed = False
+        atexit.register(self.close)
+        
         self.logger.info("Chatbot com memória de longo prazo inicializado")
     
+    def close(self):
+        """Grava os turnos pendentes e fecha log de conversas, perfil e backend de memória"""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self.compactor.stop_background()
+        for name, resource in (("conversation_log", self.conversation_log),
+                               ("fact_store", self.fact_store),
+                               ("memory_backend", self.memory_backend)):
+            if resource is None:
+                continue
+            try:
+                resource.close()
+            except Exception as e:
+                self.logger.error(f"Erro ao fechar {name}: {e}")
+    
     def _setup_vectorstore(self):
-        """Configura o vetorstore para memória de longo prazo"""
+        """Configura o vetorstore e o backend da memória de longo prazo (chroma, fts5 ou hybrid)"""
+        backend = self.config.get("memory_backend", "chroma")
+        self.vectorstore = None
+        self.memory_backend = None
         try:            
             # Verifica se está em modo de teste
             if self.config.get("test_mode", False):
                 self.logger.info("Modo de teste ativado - usando memória simulada")
-                self.vectorstore = None
-                self._test_memory = {}  # Memória simulada para testes
+                self._test_memory = InvertedMemoryIndex()  # Memória simulada para testes
+                self._test_hashes = SimHashIndex(self.dedup_max_hamming)
+                return
+            
+            # Busca apenas por palavras-chave: sem ChromaDB nem embeddings
+            if backend == "fts5":
+                self.memory_backend = create_memory_backend(backend, self.config, logger=self.logger)
+                self.logger.info("Memória de longo prazo configurada com SQLite FTS5")
                 return
             
             # Cria diretório para persistência se não existir
-            persist_directory = Path("data/chroma_db")
+            persist_directory = Path(self.config.get("memory_persistence_path", "data/chroma_db"))
             persist_directory.mkdir(parents=True, exist_ok=True)
             
             # Inicializa ChromaDB
@@ -94,13 +193,22 @@ class LongTermMemoryChatbot:
                 collection_name="conversation_memory"
             )
             
-            self.logger.info("Vetorstore configurado com sucesso")
+            self.memory_backend = create_memory_backend(
+                backend, self.config, self.vectorstore, self.embeddings, self.logger
+            )
+            self.logger.info(f"Vetorstore configurado com sucesso (backend: {backend})")
             
         except Exception as e:
             self.logger.error(f"Erro ao configurar vetorstore: {e}")
-            # Fallback para memória em memória
             self.vectorstore = None
-            self._test_memory = {}  # Memória simulada como fallback
+            if backend == "hybrid":
+                # Fallback para a busca por palavras-chave
+                self.memory_backend = create_memory_backend("fts5", self.config, logger=self.logger)
+                return
+            # Fallback para memória em memória
+            self.memory_backend = None
+            self._test_memory = InvertedMemoryIndex()  # Memória simulada como fallback
+            self._test_hashes = SimHashIndex(self.dedup_max_hamming)
     
     def _get_system_prompt(self, memory_context: str = "") -> str:
         """Retorna o prompt do sistema com contexto de memória melhorado"""
@@ -131,92 +239,182 @@ Responda de forma clara, concisa, contextualizada e personalizada."""
         
         return base_prompt
     
-    def _store_single_message(self, session_id: str, message: BaseMessage, message_index: int = 0):
-        """Armazena uma única mensagem no vetorstore"""
+    def _get_profile_prompt(self, profile_context: str, memory_context: str = "") -> str:
+        """
+        Prompt curto usado quando a pergunta é de perfil
+        
+        memory_context só vem preenchido quando o perfil não tem todos os fatos
+        pedidos (a memória vetorial completa o que falta).
+        """
+        prompt = (
+            "Você é um assistente útil com memória de longo prazo. "
+            "Responda usando os fatos do perfil abaixo, de forma breve e personalizada, "
+            "deixando claro que a informação foi mencionada anteriormente pelo usuário."
+        )
+        if memory_context:
+            prompt += " O que não estiver no perfil pode estar nas mensagens anteriores abaixo."
+        return f"{prompt}{profile_context}{memory_context}"
+    
+    def _store_single_message(self, session_id: str, message: MemoryMessage, message_index: int = 0):
+        """Armazena uma única mensagem na memória de longo prazo"""
+        if isinstance(message, BaseMessage):
+            message = MemoryMessage.from_message(message)
+        
+        # Política de escrita antes de qualquer embedding
+        decision = self.write_policy.evaluate(session_id, message)
+        if decision.action == SKIP:
+            self.logger.info(f"Mensagem não armazenada ({decision.reason}): {message.message_type} (sessão {session_id})")
+            return
+        message = decision.message
         
         # Se está em modo de teste, usa memória simulada
         if self.config.get("test_mode", False) and hasattr(self, '_test_memory'):
             return self._store_test_message(session_id, message, message_index)
         
-        if not self.vectorstore:
+        if not self.memory_backend:
             return
         
         try:
-            # Determina o tipo da mensagem
-            message_type = "Usuário" if isinstance(message, HumanMessage) else "Assistente"
+            metadata = message.metadata(session_id, message_index)
+            if decision.action == SUMMARY:
+                metadata["summarized"] = True
             
-            # Cria o texto da mensagem com contexto
-            message_text = f"{message_type}: {message.content}"
+            # Armazena apenas o conteúdo compacto (sem o repr completo do AIMessage)
+            if self._write_memory_entry(session_id, message, metadata):
+                self.logger.info(f"Mensagem armazenada: {message.message_type} (sessão {session_id})")
             
-            # Adiciona metadados detalhados
-            metadata = {
-                "session_id": session_id,
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "message_type": message_type,
-                "message_index": message_index,
-                "content_length": len(message.content)
-            }
-            
-            # Armazena a mensagem individual no vetorstore
-            self.vectorstore.add_texts(
-                texts=[message_text],
-                metadatas=[metadata]
+        except Exception as e:
+            self.logger.error(f"Erro ao armazenar mensagem: {e}")
+    
+    def _write_memory_entry(self, session_id: str, message: MemoryMessage, metadata: Dict[str, Any]) -> bool:
+        """
+        Grava a mensagem no backend de memória, a menos que já exista uma quase idêntica
+        
+        Para duplicatas (detectadas no ChromaDB), apenas o timestamp da entrada
+        existente é atualizado (sem novo embedding nem novo vetor).
+        
+        Returns:
+            True se uma nova entrada foi adicionada
+        """
+        if self.vectorstore is not None:
+            if self._refresh_if_duplicate(session_id, message, metadata):
+                return False
+        else:
+            metadata.update(simhash_metadata(simhash(message.content)))
+        
+        self.memory_backend.add([(message.to_text(), metadata)])
+        return True
+    
+    def _refresh_if_duplicate(self, session_id: str, message: MemoryMessage, metadata: Dict[str, Any]) -> bool:
+        """
+        Atualiza o timestamp de uma entrada quase idêntica, se existir
+        
+        Quando não há duplicata, os campos de SimHash são adicionados a
+        metadata para a gravação do novo vetor.
+        
+        Returns:
+            True se a mensagem era duplicata (nada deve ser gravado)
+        """
+        value = simhash(message.content)
+        duplicate = find_near_duplicate(
+            self.vectorstore._collection, value, message.message_type, self.dedup_max_hamming
+        )
+        
+        if duplicate:
+            doc_id, existing = duplicate
+            refreshed = dict(existing)
+            refreshed.update(
+                timestamp=metadata["timestamp"],
+                timestamp_epoch=metadata["timestamp_epoch"],
+                last_session_id=session_id,
+                repeat_count=existing.get("repeat_count", 1) + 1
             )
+            self.vectorstore._collection.update(ids=[doc_id], metadatas=[refreshed])
+            self.logger.info(f"Mensagem duplicada: timestamp atualizado em {doc_id} (sessão {session_id})")
+            return True
+        
+        metadata.update(simhash_metadata(value))
+        return False
+    
+    async def _astore_messages(self, session_id: str, records: List[MemoryMessage], first_index: int):
+        """
+        Armazena mensagens no backend de memória com embeddings assíncronos
+        
+        Duplicatas são resolvidas antes de embedar; as mensagens novas são
+        embedadas em uma única chamada e gravadas juntas.
+        """
+        if (self.config.get("test_mode", False) and hasattr(self, '_test_memory')) or not self.memory_backend:
+            for offset, record in enumerate(records):
+                await asyncio.to_thread(self._store_single_message, session_id, record, first_index + offset)
+            return
+        
+        try:
+            pending = []
+            for offset, record in enumerate(records):
+                decision = self.write_policy.evaluate(session_id, record)
+                if decision.action == SKIP:
+                    continue
+                record = decision.message
+                metadata = record.metadata(session_id, first_index + offset)
+                if decision.action == SUMMARY:
+                    metadata["summarized"] = True
+                if self.vectorstore is None:
+                    metadata.update(simhash_metadata(simhash(record.content)))
+                elif await asyncio.to_thread(self._refresh_if_duplicate, session_id, record, metadata):
+                    continue
+                pending.append((record.to_text(), metadata))
+            
+            if not pending:
+                return
             
-            self.logger.info(f"Mensagem armazenada: {message_type} (sessão {session_id})")
+            await self.memory_backend.aadd(pending)
+            self.logger.info(f"{len(pending)} mensagens armazenadas (sessão {session_id})")
             
         except Exception as e:
-            self.logger.error(f"Erro ao armazenar mensagem: {e}")
+            self.logger.error(f"Erro ao armazenar mensagens: {e}")
     
-    def _store_test_message(self, session_id: str, message: BaseMessage, message_index: int = 0):
+    def _store_test_message(self, session_id: str, message: MemoryMessage, message_index: int = 0):
         """Armazena mensagem na memória simulada para modo de teste"""
         if not hasattr(self, '_test_memory'):
-            self._test_memory = {}
+            self._test_memory = InvertedMemoryIndex()
+        if not hasattr(self, '_test_hashes'):
+            self._test_hashes = SimHashIndex(self.dedup_max_hamming)
+        if isinstance(message, BaseMessage):
+            message = MemoryMessage.from_message(message)
         
-        # Determina o tipo da mensagem
-        message_type = "Usuário" if isinstance(message, HumanMessage) else "Assistente"
-        message_text = f"{message_type}: {message.content}"
-        
-        # Inicializa sessão se não existir
-        if session_id not in self._test_memory:
-            self._test_memory[session_id] = []
+        # Mensagens quase idênticas já armazenadas não geram nova entrada
+        value = simhash(message.content)
+        with self._memory_lock:
+            duplicate = self._test_hashes.find(value) is not None
+            if not duplicate:
+                self._test_hashes.add(value, session_id)
+        if duplicate:
+            self.logger.info(f"Mensagem simulada duplicada ignorada: {message.message_type} (sessão {session_id})")
+            return
         
-        # Adiciona mensagem à sessão
-        self._test_memory[session_id].append(message_text)
+        # Adiciona mensagem à sessão e atualiza as posting lists do índice
+        self._test_memory.add(session_id, message.to_text())
         
-        self.logger.info(f"Mensagem simulada armazenada: {message_type} (sessão {session_id})")
+        self.logger.info(f"Mensagem simulada armazenada: {message.message_type} (sessão {session_id})")
     
     def _store_conversation_memory(self, session_id: str, messages: List[BaseMessage]):
-        """Armazena memória da conversa no vetorstore - mensagem por mensagem"""
-        if not self.vectorstore:
+        """Armazena memória da conversa no backend de memória - mensagem por mensagem"""
+        if not self.memory_backend:
             return
         
         try:
             # Armazena cada mensagem individualmente ao invés de concatenar tudo
             for i, msg in enumerate(messages):
-                # Determina o tipo da mensagem
-                message_type = "Usuário" if isinstance(msg, HumanMessage) else "Assistente"
-                
-                # Cria o texto da mensagem com contexto
-                message_text = f"{message_type}: {msg.content}"
+                record = MemoryMessage.from_message(msg)
                 
                 # Adiciona metadados detalhados
-                metadata = {
-                    "session_id": session_id,
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "message_type": message_type,
-                    "message_index": i,
-                    "total_messages": len(messages),
-                    "content_length": len(msg.content)
-                }
+                metadata = record.metadata(session_id, i)
+                metadata["total_messages"] = len(messages)
                 
-                # Armazena a mensagem individual no vetorstore
-                self.vectorstore.add_texts(
-                    texts=[message_text],
-                    metadatas=[metadata]
-                )
+                # Armazena a mensagem individual no vetorstore (duplicatas só atualizam o timestamp)
+                self._write_memory_entry(session_id, record, metadata)
                 
-                self.logger.info(f"Mensagem {i+1} armazenada para sessão {session_id}: {message_type}")
+                self.logger.info(f"Mensagem {i+1} armazenada para sessão {session_id}: {record.message_type}")
             
             self.logger.info(f"Total de {len(messages)} mensagens armazenadas para sessão {session_id}")
             
@@ -230,35 +428,62 @@ Responda de forma clara, concisa, contextualizada e personalizada."""
         if self.config.get("test_mode", False) and hasattr(self, '_test_memory'):
             return self._retrieve_test_memory(query, session_id)
         
-        if not self.vectorstore:
+        if not self.memory_backend:
             return ""
         
         try:
-            # Busca memória relevante com mais resultados e sem filtro de sessão
-            results = self.vectorstore.similarity_search_with_score(
-                query,
-                k=10,  # Aumentado para 10 para melhor cobertura
-                filter=None  # Remove filtro de sessão para buscar em todas as sessões
-            )
+            # Busca candidatos em todas as sessões (sem filtro de sessão)
+            results = self.memory_backend.search(query, k=self.config.get("memory_candidate_k", 20))
+            return self._format_memory_results(results)
             
+        except Exception as e:
+            self.logger.error(f"Erro ao recuperar memória: {e}")
+            return ""
+    
+    async def _aretrieve_relevant_memory(self, query: str, session_id: Optional[str] = None) -> str:
+        """Versão assíncrona da recuperação: embedding da query via API assíncrona"""
+        if self.config.get("test_mode", False) and hasattr(self, '_test_memory'):
+            return self._retrieve_test_memory(query, session_id)
+        
+        if not self.memory_backend:
+            return ""
+        
+        try:
+            results = await self.memory_backend.asearch(query, k=self.config.get("memory_candidate_k", 20))
+            return self._format_memory_results(results)
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao recuperar memória: {e}")
+            return ""
+    
+    def _format_memory_results(self, results: List[Any]) -> str:
+        """Deduplica, ranqueia e formata os candidatos do vetorstore como contexto"""
+        try:
             if results:
-                # Filtra resultados por score de similaridade (threshold mais permissivo)
+                # Mescla quase-duplicatas antes do ranking (mantém a mais próxima, com o timestamp mais recente)
+                results, merged = dedupe_candidates(results, self.dedup_max_hamming)
+                if merged:
+                    self.logger.info(f"{merged} memórias quase duplicadas mescladas")
+                
+                # Ranking em lote: distância + recência + tipo + importância, cortado por tokens
+                ranked, stats = rank_memories(results, self.ranking_weights)
+                
                 relevant_results = []
-                for doc, score in results:
-                    # Score mais baixo = mais similar (ChromaDB usa distância)
-                    # Threshold muito mais permissivo para garantir uso da memória
-                    if score < 2.5:  # Threshold muito mais permissivo
-                        # Adiciona metadados para contexto
-                        session_info = doc.metadata.get('session_id', 'N/A')
-                        timestamp = doc.metadata.get('timestamp', 'N/A')
-                        message_type = doc.metadata.get('message_type', 'N/A')
-                        
-                        context = f"[Sessão: {session_info} - {timestamp} - {message_type}]\n{doc.page_content}"
-                        relevant_results.append(context)
+                for doc, _ in ranked:
+                    # Adiciona metadados para contexto
+                    session_info = doc.metadata.get('session_id', 'N/A')
+                    timestamp = doc.metadata.get('timestamp', 'N/A')
+                    message_type = doc.metadata.get('message_type', 'N/A')
+                    
+                    context = f"[Sessão: {session_info} - {timestamp} - {message_type}]\n{doc.page_content}"
+                    relevant_results.append(context)
                 
                 if relevant_results:
                     memory_context = "\n\n".join(relevant_results)
-                    self.logger.info(f"Memória recuperada: {len(relevant_results)} mensagens (score < 2.5)")
+                    self.logger.info(
+                        f"Memória recuperada: {stats['selected']}/{stats['candidates']} mensagens "
+                        f"({stats['selected_tokens']} tokens, ranking em {stats['ranking_time_us']:.0f}µs)"
+                    )
                     return f"\n\n=== CONTEXTO DE MEMÓRIA ===\n{memory_context}\n=== FIM DO CONTEXTO ===\n"
                 else:
                     self.logger.info("Nenhuma memória relevante encontrada (score muito baixo)")
@@ -275,61 +500,160 @@ Responda de forma clara, concisa, contextualizada e personalizada."""
         if not hasattr(self, '_test_memory') or not self._test_memory:
             return ""
         
-        # Palavras-chave para buscar na memória simulada
-        query_lower = query.lower()
-        relevant_messages = []
-        
-        # Busca por palavras-chave na memória simulada
-        for session_data in self._test_memory.values():
-            for message in session_data:
-                message_lower = message.lower()
-                
-                # Verifica se há palavras em comum
-                query_words = set(query_lower.split())
-                message_words = set(message_lower.split())
-                common_words = query_words.intersection(message_words)
-                
-                # Se há pelo menos 2 palavras em comum, considera relevante
-                if len(common_words) >= 2 and len(common_words) > 0:
-                    relevant_messages.append(f"[Memória Simulada] {message}")
+        # Conta candidatos pelas posting lists; relevante com pelo menos 2 palavras em comum
+        total_relevant, top_messages = self._test_memory.search(query, min_overlap=2, limit=10)
+        top_messages = dedupe_texts(top_messages, self.dedup_max_hamming)[:5]
+        relevant_messages = [f"[Memória Simulada] {message}" for message in top_messages]
         
         if relevant_messages:
-            memory_context = "\n\n".join(relevant_messages[:5])  # Limita a 5 mensagens
-            self.logger.info(f"Memória simulada recuperada: {len(relevant_messages)} mensagens")
+            memory_context = "\n\n".join(relevant_messages)  # Top 5 por sobreposição
+            self.logger.info(f"Memória simulada recuperada: {total_relevant} mensagens")
             return f"\n\n=== CONTEXTO DE MEMÓRIA ===\n{memory_context}\n=== FIM DO CONTEXTO ===\n"
         
         return ""
     
-    def process_query(self, query: str, session_id: str = "default") -> Dict[str, Any]:
+    def _lookup_profile_facts(self, query: str, user_id: str) -> Tuple[Dict[str, str], bool]:
+        """
+        Responde perguntas de perfil a partir do key-value de fatos
+        
+        Returns:
+            (fatos que respondem a pergunta, se o perfil cobre todas as chaves
+            pedidas); fatos vazios se a query não for de perfil ou se o fato
+            ainda não for conhecido. Só quando o perfil cobre a pergunta a busca
+            vetorial é dispensada.
+        """
+        keys = self.fact_extractor.match_question(query)
+        if not keys:
+            return {}, False
+        
+        facts = self.fact_store.get_facts(user_id)
+        if keys == ["*"]:
+            covered = bool(facts)
+        else:
+            facts = {k: facts[k] for k in keys if k in facts}
+            covered = len(facts) == len(keys)
+        
+        if facts:
+            self.logger.info(f"Perfil do usuário usado: {', '.join(facts)} (usuário {user_id})")
+        return facts, covered
+    
+    def _update_user_facts(self, query: str, user_id: str, session_id: str) -> int:
+        """Extrai fatos estáveis da mensagem do usuário e atualiza o perfil"""
+        try:
+            facts = self.fact_extractor.extract(query)
+            return self.fact_store.upsert(user_id, facts, session_id)
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar fatos do usuário: {e}")
+            return 0
+    
+    def _token_usage(self, system_prompt: str, memory_context: str, profile_context: str,
+                     user_record: MemoryMessage, ai_record: MemoryMessage, response: Any = None,
+                     summary_usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """
+        Tokens da chamada ao LLM por segmento do prompt
+        
+        system: instruções fixas; context: perfil do usuário; memory: memórias
+        recuperadas; user: mensagem do usuário. Os totais vêm do uso informado
+        pelo provedor quando disponível (ver token_usage). O uso da chamada de
+        resumo da sessão fica em "summary" e "summary_tokens".
+        """
+        model_name = self.config["model_name"]
+        context_tokens = count_tokens(profile_context, model_name) if profile_context else 0
+        memory_tokens = count_tokens(memory_context, model_name) if memory_context else 0
+        system_tokens = (max(0, count_tokens(system_prompt, model_name) - context_tokens - memory_tokens)
+                         if system_prompt else 0)
+        usage = token_usage(
+            {"system": system_tokens, "context": context_tokens, "memory": memory_tokens,
+             "user": count_tokens(user_record.content, model_name)},
+            count_tokens(ai_record.content, model_name),
+            response
+        )
+        usage["summary"] = summary_usage or {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        usage["summary_tokens"] = usage["summary"]["total_tokens"]
+        return usage
+    
+    def _log_metrics(self, message: str, result: Dict[str, Any]):
+        """
+        Registra as métricas da query como evento estruturado (campos tipados no JSON)
+        
+        Args:
+            message: Mensagem legível do log
+            result: Resultado da query
+        """
+        usage = result["token_usage"]
+        self.logger.info(
+            message,
+            extra={
+                "event": METRICS_EVENT,
+                "success": True,
+                "session_id": result["session_id"],
+                "response_time": result["response_time"],
+                "tokens_used": result["tokens_used"],
+                "prompt_tokens": usage["prompt_tokens"],
+                "completion_tokens": usage["completion_tokens"],
+                "summary_tokens": usage["summary_tokens"],
+                "confidence": result["confidence"],
+                "memory_metrics": result["memory_metrics"]
+            },
+            stacklevel=2
+        )
+    
+    def process_query(self, query: str, session_id: str = "default", user_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Processa uma query com memória de longo prazo melhorada
         
         Args:
             query: Query do usuário
             session_id: ID da sessão para agrupar conversas
+            user_id: ID do usuário para o perfil de fatos (padrão: session_id)
             
         Returns:
-            Dicionário com resposta e métricas
+            Dicionário com resposta e métricas (com o request_id que
+            correlaciona os logs e os spans dos estágios da query)
         """
+        with RequestScope(self.logger, "process_query", session_id=session_id) as scope:
+            result = self._process_query(query, session_id, user_id)
+            if not result["success"]:
+                scope.status = "error"
+        result["request_id"] = scope.request_id
+        return result
+    
+    def _process_query(self, query: str, session_id: str, user_id: Optional[str]) -> Dict[str, Any]:
+        """Processa a query dentro do escopo da requisição (ver process_query)"""
         start_time = time.time()
+        user_id = user_id or session_id
         
         try:
             # Se está em modo de teste, usa processamento simplificado
             if self.config.get("test_mode", False):
-                return self._process_query_test_mode(query, session_id, start_time)
+                return self._process_query_test_mode(query, session_id, start_time, user_id)
             
-            # Recupera memória relevante ANTES de processar
-            memory_context = self._retrieve_relevant_memory(query, session_id)
+            # Perguntas de perfil consultam o key-value de fatos
+            with Span(self.logger, "profile_lookup"):
+                profile_facts, profile_covered = self._lookup_profile_facts(query, user_id)
+                profile_context = format_profile_context(profile_facts)
+            
+            # Recupera memória relevante ANTES de processar (dispensada quando o
+            # perfil já tem todos os fatos pedidos)
+            retrieval_start = time.time()
+            memory_context = ""
+            if not profile_covered:
+                with Span(self.logger, "memory_retrieval"):
+                    memory_context = self._retrieve_relevant_memory(query, session_id)
+            retrieval_time = time.time() - retrieval_start
             
             # Log detalhado para debug
-            if memory_context:
+            if memory_context or profile_context:
                 self.logger.info(f"Memória encontrada para query: '{query[:50]}...'")
-                self.logger.info(f"Comprimento do contexto: {len(memory_context)} caracteres")
+                self.logger.info(f"Comprimento do contexto: {len(profile_context) + len(memory_context)} caracteres")
             else:
                 self.logger.info(f"Nenhuma memória encontrada para query: '{query[:50]}...'")
             
-            # Cria prompt dinâmico com contexto de memória
-            system_prompt = self._get_system_prompt(memory_context)
+            # Cria prompt dinâmico com contexto de memória (curto para perguntas de perfil)
+            if profile_context:
+                system_prompt = self._get_profile_prompt(profile_context, memory_context)
+            else:
+                system_prompt = self._get_system_prompt(memory_context)
             
             # Cria mensagens para o LLM
             messages = [
@@ -338,71 +662,238 @@ Responda de forma clara, concisa, contextualizada e personalizada."""
             ]
             
             # Processa a query com contexto de memória
-            response = self.llm.invoke(messages)
+            with Span(self.logger, "llm"):
+                response = self.llm.invoke(messages)
+            
+            # Atualiza o perfil estruturado com fatos da mensagem
+            with Span(self.logger, "user_facts"):
+                self._update_user_facts(query, user_id, session_id)
+            
+            # Registros compactos: apenas conteúdo, papel, tokens e timestamp
+            user_record = MemoryMessage(query, "user")
+            ai_record = MemoryMessage.from_response(response)
+            
+            # Registra o turno no log durável (define o índice das mensagens na sessão)
+            with Span(self.logger, "conversation_log"):
+                first_index = self.conversation_log.append(session_id, [user_record, ai_record])
             
             # Atualiza memória de conversa
-            self.conversation_memory.chat_memory.add_user_message(query)
-            self.conversation_memory.chat_memory.add_ai_message(str(response))
+            with self._memory_lock:
+                self.conversation_memory.chat_memory.add_user_message(user_record.content)
+                self.conversation_memory.chat_memory.add_ai_message(ai_record.content)
+                conversation_length = len(self.conversation_memory.chat_memory.messages)
             
-            # Atualiza memória de resumo
-            self.summary_memory.save_context(
-                {"input": query},
-                {"output": str(response)}
-            )
+            # Atualiza o resumo da sessão (chamada ao LLM para resumir)
+            with Span(self.logger, "summary_memory"):
+                summary, summary_usage = self._update_session_summary(session_id, user_record, ai_record)
             
-            # Armazena mensagens individualmente na memória de longo prazo
-            current_messages = self.conversation_memory.chat_memory.messages
             
             # Armazena apenas as duas últimas mensagens (usuário + assistente)
-            if len(current_messages) >= 2:
-                user_message = current_messages[-2]  # Mensagem do usuário
-                ai_message = current_messages[-1]    # Resposta do assistente
-                
-                # Armazena mensagem do usuário
-                self._store_single_message(session_id, user_message, len(current_messages) - 2)
-                
-                # Armazena resposta do assistente
-                self._store_single_message(session_id, ai_message, len(current_messages) - 1)
+            storage_start = time.time()
+            with Span(self.logger, "memory_store"):
+                self._store_single_message(session_id, user_record, first_index)
+                self._store_single_message(session_id, ai_record, first_index + 1)
+            storage_time = time.time() - storage_start
             
             # Calcula métricas
             response_time = time.time() - start_time
             
-            # Contagem de tokens
-            response_text = str(response)
-            tokens_used = len(query.split()) + len(response_text.split())
+            # Contagem de tokens (uso informado pelo provedor ou tiktoken), incluindo o resumo
+            response_text = ai_record.content
+            with Span(self.logger, "token_count"):
+                usage = self._token_usage(system_prompt, memory_context, profile_context, user_record, ai_record,
+                                          response, summary_usage)
+            tokens_used = usage["total_tokens"] + usage["summary_tokens"]
             
             # Score de confiança
             confidence = min(1.0, max(0.0, 1.0 - (response_time / self.config["max_response_time"])))
             
             # Métricas de memória melhoradas
             memory_metrics = {
-                "memory_context_used": bool(memory_context),
-                "memory_context_length": len(memory_context),
-                "conversation_length": len(current_messages),
-                "summary_available": bool(self.summary_memory.buffer),
-                "memory_retrieved_count": len(memory_context.split('\n\n')) if memory_context else 0
+                "memory_context_used": bool(memory_context or profile_context),
+                "memory_context_length": len(profile_context) + len(memory_context),
+                "conversation_length": conversation_length,
+                "summary_available": bool(summary),
+                "memory_retrieved_count": len(memory_context.split('\n\n')) if memory_context else 0,
+                "memory_source": memory_source(profile_context, memory_context),
+                "profile_facts_used": len(profile_facts),
+                "retrieval_time": retrieval_time,
+                "storage_time": storage_time,
+                "prompt_tokens": usage["prompt_tokens"]
+            }
+            
+            result = {
+                "success": True,
+                "response": response_text,
+                "response_time": response_time,
+                "tokens_used": tokens_used,
+                "token_usage": usage,
+                "confidence": confidence,
+                "memory_metrics": memory_metrics,
+                "session_id": session_id,
+                "error_message": None
             }
             
-            # Log final
-            if memory_context:
-                self.logger.info(f"✅ Query processada com memória: {query[:50]}...")
+            # Log final (evento estruturado de métricas)
+            if memory_context or profile_context:
+                self._log_metrics(f"✅ Query processada com memória: {query[:50]}...", result)
             else:
-                self.logger.info(f"⚠️  Query processada sem memória: {query[:50]}...")
+                self._log_metrics(f"⚠️  Query processada sem memória: {query[:50]}...", result)
+            
+            return result
+            
+        except Exception as e:
+            response_time = time.time() - start_time
+            self.logger.error(
+                f"Erro ao processar query '{query}': {str(e)}",
+                extra={
+                    "event": METRICS_EVENT,
+                    "success": False,
+                    "session_id": session_id,
+                    "response_time": response_time,
+                    "tokens_used": 0,
+                    "confidence": 0.0
+                }
+            )
             
             return {
+                "success": False,
+                "response": "",
+                "response_time": response_time,
+                "tokens_used": 0,
+                "confidence": 0.0,
+                "memory_metrics": {},
+                "session_id": session_id,
+                "error_message": str(e)
+            }
+    
+    async def aprocess_query(self, query: str, session_id: str = "default",
+                             user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Versão assíncrona de process_query para servir várias sessões concorrentes
+        
+        Usa as APIs assíncronas do LLM e dos embeddings; SQLite e ChromaDB
+        (síncronos) rodam em threads para não bloquear o event loop. Executa as
+        mesmas etapas de process_query: o resumo da sessão é atualizado com a
+        mesma chamada ao LLM e gravado no log (save_summary), e a janela da
+        sessão é o próprio log. Só a janela e o resumo em memória do chatbot
+        (sessão corrente do CLI) não são alterados. A serialização por sessão
+        fica a cargo de quem chama (ver ChatServer).
+        
+        Args:
+            query: Query do usuário
+            session_id: ID da sessão para agrupar conversas
+            user_id: ID do usuário para o perfil de fatos (padrão: session_id)
+            
+        Returns:
+            Dicionário com resposta e métricas (mesmo formato de process_query)
+        """
+        # O contexto (request_id/span) é próprio de cada task asyncio
+        with RequestScope(self.logger, "aprocess_query", session_id=session_id) as scope:
+            result = await self._aprocess_query(query, session_id, user_id)
+            if not result["success"]:
+                scope.status = "error"
+        result["request_id"] = scope.request_id
+        return result
+    
+    async def _aprocess_query(self, query: str, session_id: str, user_id: Optional[str]) -> Dict[str, Any]:
+        """Processa a query dentro do escopo da requisição (ver aprocess_query)"""
+        start_time = time.time()
+        user_id = user_id or session_id
+        
+        try:
+            if self.config.get("test_mode", False):
+                return self._process_query_test_mode(query, session_id, start_time, user_id)
+            
+            with Span(self.logger, "profile_lookup"):
+                profile_facts, profile_covered = await asyncio.to_thread(self._lookup_profile_facts, query, user_id)
+                profile_context = format_profile_context(profile_facts)
+            
+            retrieval_start = time.time()
+            memory_context = ""
+            if not profile_covered:
+                with Span(self.logger, "memory_retrieval"):
+                    memory_context = await self._aretrieve_relevant_memory(query, session_id)
+            retrieval_time = time.time() - retrieval_start
+            if profile_context:
+                system_prompt = self._get_profile_prompt(profile_context, memory_context)
+            else:
+                system_prompt = self._get_system_prompt(memory_context)
+            
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": query}
+            ]
+            with Span(self.logger, "llm"):
+                response = await self.llm.ainvoke(messages)
+            
+            with Span(self.logger, "user_facts"):
+                await asyncio.to_thread(self._update_user_facts, query, user_id, session_id)
+            
+            user_record = MemoryMessage(query, "user")
+            ai_record = MemoryMessage.from_response(response)
+            
+            with Span(self.logger, "conversation_log"):
+                first_index = await asyncio.to_thread(
+                    self.conversation_log.append, session_id, [user_record, ai_record]
+                )
+            
+            # Resumo da sessão (mesma chamada ao LLM de process_query, por sessão)
+            with Span(self.logger, "summary_memory"):
+                summary, summary_usage = await self._aupdate_session_summary(session_id, user_record, ai_record)
+            
+            storage_start = time.time()
+            with Span(self.logger, "memory_store"):
+                await self._astore_messages(session_id, [user_record, ai_record], first_index)
+            storage_time = time.time() - storage_start
+            
+            response_time = time.time() - start_time
+            confidence = min(1.0, max(0.0, 1.0 - (response_time / self.config["max_response_time"])))
+            with Span(self.logger, "token_count"):
+                usage = self._token_usage(system_prompt, memory_context, profile_context, user_record, ai_record,
+                                          response, summary_usage)
+            
+            memory_metrics = {
+                "memory_context_used": bool(memory_context or profile_context),
+                "memory_context_length": len(profile_context) + len(memory_context),
+                "conversation_length": first_index + 2,
+                "summary_available": bool(summary),
+                "memory_retrieved_count": len(memory_context.split('\n\n')) if memory_context else 0,
+                "memory_source": memory_source(profile_context, memory_context),
+                "profile_facts_used": len(profile_facts),
+                "retrieval_time": retrieval_time,
+                "storage_time": storage_time,
+                "prompt_tokens": usage["prompt_tokens"]
+            }
+            
+            result = {
                 "success": True,
-                "response": response_text,
+                "response": ai_record.content,
                 "response_time": response_time,
-                "tokens_used": tokens_used,
+                "tokens_used": usage["total_tokens"] + usage["summary_tokens"],
+                "token_usage": usage,
                 "confidence": confidence,
                 "memory_metrics": memory_metrics,
                 "session_id": session_id,
                 "error_message": None
             }
             
+            self._log_metrics(f"Query assíncrona processada (sessão {session_id}): {query[:50]}...", result)
+            return result
+            
         except Exception as e:
             response_time = time.time() - start_time
-            self.logger.error(f"Erro ao processar query '{query}': {str(e)}")
+            self.logger.error(
+                f"Erro ao processar query '{query}': {str(e)}",
+                extra={
+                    "event": METRICS_EVENT,
+                    "success": False,
+                    "session_id": session_id,
+                    "response_time": response_time,
+                    "tokens_used": 0,
+                    "confidence": 0.0
+                }
+            )
             
             return {
                 "success": False,
@@ -415,46 +906,312 @@ Responda de forma clara, concisa, contextualizada e personalizada."""
                 "error_message": str(e)
             }
     
-    def _process_query_test_mode(self, query: str, session_id: str, start_time: float) -> Dict[str, Any]:
+    def _summary_prompt(self, previous: Optional[str], user_record: MemoryMessage,
+                        ai_record: MemoryMessage) -> str:
+        """Prompt de atualização do resumo (o mesmo de ConversationSummaryMemory.predict_new_summary)"""
+        new_lines = get_buffer_string(
+            [HumanMessage(content=user_record.content), AIMessage(content=ai_record.content)],
+            human_prefix=self.summary_memory.human_prefix,
+            ai_prefix=self.summary_memory.ai_prefix
+        )
+        return self.summary_memory.prompt.format(summary=previous or "", new_lines=new_lines)
+    
+    def _summary_usage(self, prompt: str, summary: str, response: Any) -> Dict[str, int]:
+        """Tokens da chamada de resumo (uso informado pelo provedor ou tiktoken)"""
+        model_name = self.config["model_name"]
+        return call_usage(count_tokens(prompt, model_name), count_tokens(summary, model_name), response)
+    
+    def _update_session_summary(self, session_id: str, user_record: MemoryMessage,
+                                ai_record: MemoryMessage) -> Tuple[str, Dict[str, int]]:
+        """
+        Incorpora o turno ao resumo da sessão guardado no log de conversas
+        
+        O resumo é por sessão (sessões em paralelo não se misturam);
+        summary_memory.buffer passa a ser o da sessão mais recente.
+        
+        Returns:
+            Tupla (resumo, tokens gastos na chamada de resumo)
+        """
+        previous = self.conversation_log.load_summary(session_id)
+        prompt = self._summary_prompt(previous, user_record, ai_record)
+        response = self.summary_memory.llm.invoke(prompt)
+        summary = str(getattr(response, "content", response))
+        self.conversation_log.save_summary(session_id, summary)
+        self.summary_memory.buffer = summary
+        return summary, self._summary_usage(prompt, summary, response)
+    
+    async def _aupdate_session_summary(self, session_id: str, user_record: MemoryMessage,
+                                       ai_record: MemoryMessage) -> Tuple[str, Dict[str, int]]:
+        """Versão assíncrona de _update_session_summary (sem alterar summary_memory.buffer)"""
+        previous = await asyncio.to_thread(self.conversation_log.load_summary, session_id)
+        prompt = self._summary_prompt(previous, user_record, ai_record)
+        response = await self.summary_memory.llm.ainvoke(prompt)
+        summary = str(getattr(response, "content", response))
+        await asyncio.to_thread(self.conversation_log.save_summary, session_id, summary)
+        return summary, self._summary_usage(prompt, summary, response)
+    
+    def _process_query_test_mode(self, query: str, session_id: str, start_time: float,
+                                 user_id: Optional[str] = None) -> Dict[str, Any]:
         """Processa query em modo de teste com respostas simuladas"""
+        user_id = user_id or session_id
         
-        # Recupera memória simulada
-        memory_context = self._retrieve_relevant_memory(query, session_id)
+        # Perfil estruturado; a memória simulada só completa os fatos que faltam
+        with Span(self.logger, "profile_lookup"):
+            profile_facts, profile_covered = self._lookup_profile_facts(query, user_id)
+            profile_context = format_profile_context(profile_facts)
+        retrieval_start = time.time()
+        memory_context = ""
+        if not profile_covered:
+            with Span(self.logger, "memory_retrieval"):
+                memory_context = self._retrieve_relevant_memory(query, session_id)
+        retrieval_time = time.time() - retrieval_start
+        with Span(self.logger, "user_facts"):
+            self._update_user_facts(query, user_id, session_id)
         
         # Gera resposta simulada baseada na memória
-        if memory_context:
+        if profile_facts:
+            facts = "; ".join(f"{FACT_LABELS.get(k, k)}: {v}" for k, v in profile_facts.items())
+            response_text = f"Baseado no que você me disse anteriormente: {facts}."
+        elif memory_context:
             response_text = f"Baseado no que você me disse anteriormente: {query}. Tenho memória disponível."
         else:
             response_text = f"Olá! Você disse: {query}. Não tenho memória específica sobre isso ainda."
         
         # Armazena na memória simulada
-        user_message = HumanMessage(content=query)
-        ai_message = AIMessage(content=response_text)
+        user_record = MemoryMessage(query, "user")
+        ai_record = MemoryMessage(response_text, "assistant")
         
-        self._store_test_message(session_id, user_message, 0)
-        self._store_test_message(session_id, ai_message, 1)
+        with Span(self.logger, "conversation_log"):
+            first_index = self.conversation_log.append(session_id, [user_record, ai_record])
+        storage_start = time.time()
+        with Span(self.logger, "memory_store"):
+            self._store_single_message(session_id, user_record, first_index)
+            self._store_single_message(session_id, ai_record, first_index + 1)
+        storage_time = time.time() - storage_start
         
-        # Calcula métricas
+        # Calcula métricas (sem LLM: tokens estimados pelo tiktoken)
         response_time = time.time() - start_time
+        with Span(self.logger, "token_count"):
+            usage = self._token_usage("", memory_context, profile_context, user_record, ai_record)
         
         memory_metrics = {
-            "memory_context_used": bool(memory_context),
-            "memory_context_length": len(memory_context),
+            "memory_context_used": bool(memory_context or profile_context),
+            "memory_context_length": len(profile_context) + len(memory_context),
             "conversation_length": 2,
             "summary_available": True,
-            "memory_retrieved_count": len(memory_context.split('\n\n')) if memory_context else 0
+            "memory_retrieved_count": len(memory_context.split('\n\n')) if memory_context else 0,
+            "memory_source": memory_source(profile_context, memory_context),
+            "profile_facts_used": len(profile_facts),
+            "retrieval_time": retrieval_time,
+            "storage_time": storage_time,
+            "prompt_tokens": usage["prompt_tokens"]
         }
         
-        return {
+        result = {
             "success": True,
             "response": response_text,
             "response_time": response_time,
-            "tokens_used": len(query.split()) + len(response_text.split()),
+            "tokens_used": usage["total_tokens"],
+            "token_usage": usage,
             "confidence": 0.8,
             "memory_metrics": memory_metrics,
             "session_id": session_id,
             "error_message": None
         }
+        
+        self._log_metrics(f"Query simulada processada: {query[:50]}...", result)
+        return result
+    
+    def compact_memory(self, policy: Optional[CompactionPolicy] = None) -> CompactionReport:
+        """
+        Consolida mensagens antigas da memória de longo prazo
+        
+        Args:
+            policy: Política de compactação (padrão: a da configuração)
+            
+        Returns:
+            Relatório com vetores e bytes recuperados
+            
+        Raises:
+            ValueError: Backend fts5 (a compactação consolida os vetores do ChromaDB)
+        """
+        self._require_vectorstore("Compactação")
+        return self.compactor.run(policy)
+    
+    def migrate_memory_entries(self) -> Dict[str, int]:
+        """
+        Reescreve entradas antigas que armazenaram o repr completo do AIMessage
+        
+        Returns:
+            Estatísticas da migração
+            
+        Raises:
+            ValueError: Backend fts5 (a migração reescreve as entradas do ChromaDB)
+        """
+        self._require_vectorstore("Migração")
+        return migrate_bloated_entries(
+            self.vectorstore, logger=self.logger,
+            mirror=self._fts_backend() if self.vectorstore else None
+        )
+    
+    def _require_vectorstore(self, operation: str):
+        """Recusa operações que só existem sobre o ChromaDB quando o backend é só FTS5"""
+        if self.vectorstore is None and self._fts_backend() is not None:
+            raise ValueError(
+                f"{operation} não suportada pelo backend fts5 "
+                f"(use MEMORY_BACKEND=chroma ou hybrid)"
+            )
+    
+    def export_sessions(self, path: str, session_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Exporta a memória de longo prazo (todas ou algumas sessões) para um snapshot binário
+        
+        O arquivo guarda textos, metadados e os embeddings já calculados
+        (float16), permitindo aquecer outro nó sem novas chamadas de embedding.
+        Com o backend fts5 o snapshot leva apenas textos e metadados.
+        
+        Args:
+            path: Arquivo de destino
+            session_ids: Sessões exportadas (None = todas)
+            
+        Returns:
+            Estatísticas da exportação
+        """
+        manifest = {"embedding_model": getattr(self.embeddings, "model", None)}
+        fts = self._fts_backend()
+        
+        if self.vectorstore is None and fts is not None:
+            # FTS5 não tem vetores: snapshot apenas com textos (importável em outro nó FTS5)
+            return write_snapshot(path, ((records, None) for records in fts.entries(session_ids)), 0, manifest)
+        
+        if self.vectorstore is None and hasattr(self, '_test_memory'):
+            # Memória simulada não tem vetores: snapshot apenas com textos
+            sessions = session_ids or self._test_memory.sessions()
+            records = [
+                (f"{session}:{i}", text, {"session_id": session})
+                for session in sessions
+                for i, text in enumerate(self._test_memory.get_session(session))
+            ]
+            return write_snapshot(path, iter([(records, None)]), 0, manifest)
+        
+        return export_collection(
+            self.vectorstore._collection, path, session_ids, manifest=manifest, logger=self.logger
+        )
+    
+    def import_sessions(self, path: str, session_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Importa um snapshot gerado por export_sessions sem re-embedar
+        
+        Args:
+            path: Snapshot de origem
+            session_ids: Sessões importadas (None = todas as do arquivo)
+            
+        Returns:
+            Estatísticas da importação
+        """
+        fts = self._fts_backend()
+        if self.vectorstore is None and fts is not None:
+            return self._import_into_fts(fts, path, session_ids)
+        
+        if self.vectorstore is None and hasattr(self, '_test_memory'):
+            wanted = set(session_ids) if session_ids else None
+            stats = {"records": 0, "imported": 0, "skipped": 0}
+            with SnapshotReader(path) as reader:
+                stats["records"] = len(reader)
+                for _, text, metadata in reader.records():
+                    session = metadata.get("session_id", "default")
+                    if wanted is None or session in wanted:
+                        self._test_memory.add(session, text)
+                        stats["imported"] += 1
+            return stats
+        
+        if self.vectorstore is None:
+            raise ValueError(f"Snapshot não suportado pelo backend {self.config.get('memory_backend', 'chroma')}")
+        
+        stats = import_collection(
+            self.vectorstore._collection, path, session_ids,
+            embedding_model=getattr(self.embeddings, "model", None), logger=self.logger
+        )
+        if fts is not None:
+            # Backend híbrido: o índice FTS5 também recebe as entradas importadas
+            self._import_into_fts(fts, path, session_ids)
+        return stats
+    
+    def _fts_backend(self) -> Optional[FTS5MemoryBackend]:
+        """Backend FTS5 em uso (sozinho ou dentro do híbrido)"""
+        if isinstance(self.memory_backend, FTS5MemoryBackend):
+            return self.memory_backend
+        if isinstance(self.memory_backend, HybridMemoryBackend):
+            for backend in self.memory_backend.backends:
+                if isinstance(backend, FTS5MemoryBackend):
+                    return backend
+        return None
+    
+    def _import_into_fts(self, fts: FTS5MemoryBackend, path: str,
+                         session_ids: Optional[List[str]] = None, batch_size: int = 1000) -> Dict[str, Any]:
+        """Importa os textos do snapshot no FTS5 (entradas já indexadas são ignoradas)"""
+        wanted = set(session_ids) if session_ids else None
+        stats = {"records": 0, "imported": 0, "skipped": 0}
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        
+        def flush():
+            imported = fts.add_missing(batch)
+            stats["imported"] += imported
+            stats["skipped"] += len(batch) - imported
+            batch.clear()
+        
+        with SnapshotReader(path) as reader:
+            stats["records"] = len(reader)
+            for _, text, metadata in reader.records():
+                if wanted is None or metadata.get("session_id") in wanted:
+                    batch.append((text, metadata))
+                    if len(batch) >= batch_size:
+                        flush()
+        if batch:
+            flush()
+        return stats
+    
+    def rehydrate_session(self, session_id: str, last_turns: Optional[int] = None) -> Optional[ConversationMemory]:
+        """
+        Recarrega a janela de conversa a partir do log durável
+        
+        Usado após reiniciar o processo: as últimas mensagens da sessão são
+        lidas pela chave primária do log, sem varrer o vetorstore.
+        
+        Args:
+            session_id: ID da sessão
+            last_turns: Turnos (usuário + assistente) a recarregar (padrão: memory_window)
+            
+        Returns:
+            ConversationMemory da sessão ou None se ela não existir no log
+        """
+        last_turns = last_turns or self.config.get("memory_window", 10)
+        session = self.conversation_log.load_session(session_id, last_turns * 2)
+        if session is None:
+            self.logger.info(f"Sessão {session_id} não encontrada no log de conversas")
+            return None
+        
+        self.conversation_memory.clear()
+        for message in session.messages:
+            if message["role"] == "user":
+                self.conversation_memory.chat_memory.add_user_message(message["content"])
+            else:
+                self.conversation_memory.chat_memory.add_ai_message(message["content"])
+        
+        if session.summary:
+            self.summary_memory.buffer = session.summary
+        
+        self.logger.info(f"Sessão {session_id} reidratada com {len(session.messages)} mensagens")
+        return session
+    
+    def save_session_summary(self, session_id: str):
+        """Persiste o resumo atual da conversa no log da sessão"""
+        if self.summary_memory.buffer:
+            self.conversation_log.save_summary(session_id, self.summary_memory.buffer)
+    
+    def get_write_stats(self) -> Dict[str, Any]:
+        """Estatísticas da política de escrita (escritas e tokens de embedding evitados)"""
+        return self.write_policy.stats.to_dict()
     
     def get_conversation_summary(self) -> str:
         """Retorna o resumo da conversa atual"""
@@ -465,13 +1222,21 @@ Responda de forma clara, concisa, contextualizada e personalizada."""
         self.conversation_memory.clear()
         self.summary_memory.clear()
         
-        if session_id and self.vectorstore:
-            # Remove memória específica da sessão do vetorstore
+        if session_id and self.memory_backend:
+            # Remove memória específica da sessão do backend
             try:
-                # Nota: ChromaDB não tem método direto para deletar por filtro
-                # Em produção, implementar lógica de limpeza mais robusta
-                self.logger.info(f"Memória da sessão {session_id} marcada para limpeza")
+                removed = self.memory_backend.delete_session(session_id)
+                self.logger.info(f"{removed} entradas removidas da memória da sessão {session_id}")
             except Exception as e:
                 self.logger.error(f"Erro ao limpar memória: {e}")
+        elif session_id and hasattr(self, '_test_memory'):
+            removed = self._test_memory.remove_session(session_id)
+            if hasattr(self, '_test_hashes'):
+                self._test_hashes.remove_session(session_id)
+            self.logger.info(f"{removed} mensagens simuladas removidas da sessão {session_id}")
+        
+        if session_id:
+            self.conversation_log.delete_session(session_id)
+            self.write_policy.forget_session(session_id)
         
         self.logger.info("Memória limpa com sucesso") 
\ No newline at end of file
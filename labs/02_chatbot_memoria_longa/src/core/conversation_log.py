@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Log durável de conversas em SQLite
+
+Registra cada mensagem indexada por (session_id, message_index) em um banco
+no modo WAL. As escritas são acumuladas e gravadas em lote; a leitura das
+últimas N mensagens usa a chave primária e permite reidratar uma sessão após
+reiniciar o processo, sem varrer o vetorstore.
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from src.core.memory_message import MemoryMessage, TIMESTAMP_FORMAT
+
+
+class ConversationMemory(BaseModel):
+    """Modelo para armazenar informações da conversa"""
+    session_id: str
+    messages: List[Dict[str, Any]]
+    summary: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+
+class ConversationLog:
+    """Log append-only de mensagens por sessão, com gravação em lote"""
+
+    def __init__(self, db_path: str = "data/conversation_log.db", batch_size: int = 32,
+                 flush_interval: float = 1.0, logger: Optional[logging.Logger] = None):
+        """
+        Inicializa o log de conversas
+
+        Args:
+            db_path: Caminho do banco SQLite (":memory:" para uso em memória)
+            batch_size: Mensagens pendentes que disparam a gravação do lote
+            flush_interval: Intervalo máximo (s) até gravar mensagens pendentes
+            logger: Logger opcional
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                message_index INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                token_count INTEGER NOT NULL,
+                timestamp TEXT NOT NULL,
+                PRIMARY KEY (session_id, message_index)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+        # Próximo índice por sessão (carregado do banco no primeiro uso)
+        self._next_index: Dict[str, int] = {}
+        self._pending: List[Tuple[str, int, str, str, int, str]] = []
+        self._last_flush = time.monotonic()
+
+        self._stop_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="conversation-log", daemon=True)
+            self._flusher.start()
+
+    def _reserve_indices(self, session_id: str, count: int) -> int:
+        """Reserva índices consecutivos para a sessão e retorna o primeiro"""
+        first = self._next_index.get(session_id)
+        if first is None:
+            row = self._conn.execute(
+                "SELECT MAX(message_index) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            first = 0 if row[0] is None else row[0] + 1
+        self._next_index[session_id] = first + count
+        return first
+
+    def append(self, session_id: str, messages: List[MemoryMessage]) -> int:
+        """
+        Acrescenta mensagens ao final da sessão
+
+        Args:
+            session_id: ID da sessão
+            messages: Mensagens na ordem da conversa
+
+        Returns:
+            Índice da primeira mensagem acrescentada
+        """
+        with self._lock:
+            first = self._reserve_indices(session_id, len(messages))
+            self._pending.extend(
+                (session_id, first + i, m.role, m.content, m.token_count, m.timestamp)
+                for i, m in enumerate(messages)
+            )
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+            return first
+
+    def flush(self):
+        """Grava as mensagens pendentes"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """Grava o lote pendente em uma única transação (lock já adquirido)"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        now = time.strftime(TIMESTAMP_FORMAT)
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO messages "
+                    "(session_id, message_index, role, content, token_count, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    batch
+                )
+                self._conn.executemany(
+                    "INSERT INTO sessions (session_id, created_at, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at",
+                    [(session_id, now, now) for session_id in {row[0] for row in batch}]
+                )
+        except sqlite3.Error as e:
+            # Mantém o lote para a próxima tentativa
+            self._pending = batch + self._pending
+            self.logger.error(f"Erro ao gravar log de conversas: {e}")
+
+    def _flush_loop(self):
+        """Grava periodicamente as mensagens pendentes"""
+        while not self._stop_event.wait(self.flush_interval):
+            with self._lock:
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush_locked()
+
+    def replay(self, session_id: str, last_n: Optional[int] = None) -> List[MemoryMessage]:
+        """
+        Retorna as últimas mensagens da sessão em ordem cronológica
+
+        Args:
+            session_id: ID da sessão
+            last_n: Número de mensagens (None = todas)
+        """
+        with self._lock:
+            self._flush_locked()
+            rows = self._conn.execute(
+                "SELECT role, content, token_count, timestamp FROM messages "
+                "WHERE session_id = ? ORDER BY message_index DESC LIMIT ?",
+                (session_id, -1 if last_n is None else last_n)
+            ).fetchall()
+        return [
+            MemoryMessage(content, role, token_count, timestamp)
+            for role, content, token_count, timestamp in reversed(rows)
+        ]
+
+    def message_count(self, session_id: str) -> int:
+        """Número de mensagens registradas na sessão"""
+        with self._lock:
+            if session_id in self._next_index:
+                return self._next_index[session_id]
+            return self._reserve_indices(session_id, 0)
+
+    def sessions(self) -> List[str]:
+        """IDs das sessões registradas"""
+        with self._lock:
+            self._flush_locked()
+            return [row[0] for row in self._conn.execute("SELECT session_id FROM sessions ORDER BY updated_at")]
+
+    def save_summary(self, session_id: str, summary: str):
+        """Grava o resumo da sessão"""
+        now = time.strftime(TIMESTAMP_FORMAT)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, summary, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET summary = excluded.summary, updated_at = excluded.updated_at",
+                (session_id, summary, now, now)
+            )
+
+    def load_summary(self, session_id: str) -> Optional[str]:
+        """Resumo gravado da sessão (None se não houver)"""
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def load_session(self, session_id: str, last_n: Optional[int] = None) -> Optional[ConversationMemory]:
+        """
+        Carrega a sessão como ConversationMemory
+
+        Args:
+            session_id: ID da sessão
+            last_n: Número de mensagens mais recentes (None = todas)
+
+        Returns:
+            ConversationMemory ou None se a sessão não existir
+        """
+        messages = self.replay(session_id, last_n)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, created_at, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        summary, created_at, updated_at = row
+        return ConversationMemory(
+            session_id=session_id,
+            messages=[
+                {"role": m.role, "content": m.content, "token_count": m.token_count, "timestamp": m.timestamp}
+                for m in messages
+            ],
+            summary=summary,
+            created_at=created_at,
+            updated_at=updated_at
+        )
+
+    def delete_session(self, session_id: str) -> int:
+        """
+        Remove todas as mensagens da sessão
+
+        Returns:
+            Número de mensagens removidas
+        """
+        with self._lock:
+            self._flush_locked()
+            with self._conn:
+                removed = self._conn.execute(
+                    "DELETE FROM messages WHERE session_id = ?", (session_id,)
+                ).rowcount
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._next_index.pop(session_id, None)
+            return removed
+
+    def close(self):
+        """Grava o que estiver pendente e fecha o banco"""
+        self._stop_event.set()
+        if self._flusher:
+            self._flusher.join(timeout=self.flush_interval + 1)
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
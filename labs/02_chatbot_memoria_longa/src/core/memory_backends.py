@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Backends da memória de longo prazo
+
+Todos os backends recebem entradas (texto, metadados) e devolvem pares
+(documento, distância), com distância menor = mais relevante, no formato
+esperado por dedupe_candidates e rank_memories:
+
+    - ChromaMemoryBackend: busca vetorial no ChromaDB (embeddings remotos)
+    - FTS5MemoryBackend: busca por palavras-chave com ranking BM25 no SQLite,
+      local e durável, sem nenhuma chamada de embedding
+    - HybridMemoryBackend: combina os candidatos de vários backends pela
+      posição em cada ranking (reciprocal rank fusion)
+"""
+
+import re
+import math
+import json
+import asyncio
+import uuid
+import sqlite3
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain.schema import Document
+
+# Entrada da memória: (texto armazenado, metadados)
+MemoryEntry = Tuple[str, Dict[str, Any]]
+
+# Palavras que não ajudam a recuperar memórias ("qual é o meu nome?" -> "nome")
+STOPWORDS = {
+    "que", "qual", "quais", "como", "onde", "quando", "quem", "quanto", "quantos", "quantas",
+    "meu", "minha", "meus", "minhas", "seu", "sua", "seus", "suas", "você", "voce", "eu",
+    "para", "por", "com", "sem", "uma", "uns", "umas", "dos", "das", "nos", "nas", "não", "nao",
+    "sim", "mas", "mais", "isso", "esse", "essa", "este", "esta", "aquilo", "ele", "ela",
+    "são", "sao", "foi", "ser", "tem", "ter", "sobre", "lembra", "disse", "usuário", "usuario",
+    "assistente", "então", "entao", "também", "tambem", "muito", "pode", "sabe",
+}
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Constante da reciprocal rank fusion (valor usual da literatura)
+RRF_K = 60
+
+
+class MemoryBackend(ABC):
+    """Interface dos backends da memória de longo prazo (subclasses incompletas não são instanciáveis)"""
+
+    name = "base"
+
+    @abstractmethod
+    def add(self, entries: List[MemoryEntry]) -> int:
+        """Grava as entradas e retorna quantas foram gravadas"""
+
+    async def aadd(self, entries: List[MemoryEntry]) -> int:
+        """Versão assíncrona de add (padrão: add em uma thread, sem bloquear o event loop)"""
+        return await asyncio.to_thread(self.add, entries)
+
+    @abstractmethod
+    def search(self, query: str, k: int, session_id: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """Busca as k entradas mais relevantes (opcionalmente de uma sessão)"""
+
+    async def asearch(self, query: str, k: int,
+                      session_id: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """Versão assíncrona de search (padrão: search em uma thread, sem bloquear o event loop)"""
+        return await asyncio.to_thread(self.search, query, k, session_id)
+
+    @abstractmethod
+    def count(self) -> int:
+        """Número de entradas armazenadas"""
+
+    @abstractmethod
+    def delete_session(self, session_id: str) -> int:
+        """Remove as entradas da sessão e retorna quantas foram removidas"""
+
+    def close(self):
+        """Libera os recursos do backend"""
+
+
+class ChromaMemoryBackend(MemoryBackend):
+    """Busca vetorial no ChromaDB"""
+
+    name = "chroma"
+
+    def __init__(self, vectorstore, embeddings):
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings
+
+    @staticmethod
+    def _filter(session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        return {"session_id": session_id} if session_id else None
+
+    def add(self, entries: List[MemoryEntry]) -> int:
+        if entries:
+            self.vectorstore.add_texts(
+                texts=[text for text, _ in entries],
+                metadatas=[metadata for _, metadata in entries]
+            )
+        return len(entries)
+
+    async def aadd(self, entries: List[MemoryEntry]) -> int:
+        """Embeda as entradas em uma única chamada assíncrona e grava juntas"""
+        if not entries:
+            return 0
+        texts = [text for text, _ in entries]
+        embeddings = await self.embeddings.aembed_documents(texts)
+        # A gravação no ChromaDB é síncrona (disco): roda fora do event loop
+        await asyncio.to_thread(
+            self.vectorstore._collection.add,
+            ids=[str(uuid.uuid4()) for _ in entries],
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=[metadata for _, metadata in entries]
+        )
+        return len(entries)
+
+    def search(self, query: str, k: int, session_id: Optional[str] = None) -> List[Tuple[Document, float]]:
+        return self.vectorstore.similarity_search_with_score(query, k=k, filter=self._filter(session_id))
+
+    async def asearch(self, query: str, k: int,
+                      session_id: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """Embedding da query via API assíncrona e busca local com o vetor já calculado"""
+        embedding = await self.embeddings.aembed_query(query)
+        return await asyncio.to_thread(
+            self.vectorstore.similarity_search_by_vector_with_relevance_scores,
+            embedding, k=k, filter=self._filter(session_id)
+        )
+
+    def count(self) -> int:
+        return int(self.vectorstore._collection.count())
+
+    def delete_session(self, session_id: str) -> int:
+        collection = self.vectorstore._collection
+        ids = collection.get(where={"session_id": session_id}, include=[])["ids"]
+        if ids:
+            collection.delete(ids=ids)
+        return len(ids)
+
+
+class FTS5MemoryBackend(MemoryBackend):
+    """
+    Busca por palavras-chave no SQLite FTS5 com ranking BM25
+
+    O texto é indexado com o tokenizador unicode61 sem acentos ("São Paulo"
+    casa com "sao paulo"); sessão, timestamp e tipo da mensagem ficam em
+    colunas não indexadas e os demais metadados em JSON. A tabela memory_keys
+    guarda o hash de (texto, sessão, timestamp) de cada linha, indexado, para
+    detectar entradas já gravadas sem varrer o índice.
+    """
+
+    name = "fts5"
+
+    def __init__(self, db_path: str = "data/memory_fts.db", max_distance: float = 2.5,
+                 bm25_scale: float = 5.0, min_score: float = 0.0,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Inicializa o índice
+
+        Args:
+            db_path: Caminho do banco SQLite (":memory:" para uso em memória)
+            max_distance: Distância máxima do ranking (relevância BM25 zero)
+            bm25_scale: Relevância BM25 em que a distância cai para max_distance / e
+            min_score: Relevância BM25 mínima (padrão 0: o corte fica com a distância
+                máxima do ranking; o bm25() bruto varia com o tamanho do corpus)
+            logger: Logger opcional
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_distance = max_distance
+        self.bm25_scale = bm25_scale
+        self.min_score = min_score
+
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5("
+            "content, session_id UNINDEXED, timestamp UNINDEXED, message_type UNINDEXED, metadata UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_keys (fts_rowid INTEGER PRIMARY KEY, entry_key TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_memory_keys_entry ON memory_keys (entry_key)")
+        self._conn.create_function("memory_key", 3, self.entry_key, deterministic=True)
+        self._backfill_keys()
+        self._conn.commit()
+
+    @staticmethod
+    def entry_key(text: str, session_id: Optional[str], timestamp: Optional[str]) -> str:
+        """Identidade de uma entrada: mesmo texto, sessão e timestamp"""
+        raw = "\x1f".join((text or "", session_id or "", timestamp or ""))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _backfill_keys(self):
+        """Cria as chaves das linhas gravadas antes de existir memory_keys"""
+        indexed = self._conn.execute("SELECT COUNT(*) FROM memory_keys").fetchone()[0]
+        total = self._conn.execute("SELECT COUNT(*) FROM memory_fts").fetchone()[0]
+        if indexed < total:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO memory_keys (fts_rowid, entry_key) "
+                "SELECT rowid, memory_key(content, session_id, timestamp) FROM memory_fts"
+            )
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        """Expressão MATCH com os termos relevantes da query unidos por OR"""
+        terms = []
+        for word in _WORD_RE.findall(query.lower()):
+            if len(word) >= 3 and word not in STOPWORDS and word not in terms:
+                terms.append(word)
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    def distance(self, score: float) -> float:
+        """
+        Converte o bm25() do SQLite em distância, sem depender dos outros resultados
+
+        bm25() é negativo (mais negativo = mais relevante); a relevância -score
+        decai exponencialmente de max_distance (relevância 0) em direção a 0.
+        """
+        return self.max_distance * math.exp(-max(0.0, -score) / self.bm25_scale)
+
+    def _insert_locked(self, text: str, metadata: Dict[str, Any], key: str):
+        """Grava uma entrada e a sua chave (com o lock e a transação já abertos)"""
+        cursor = self._conn.execute(
+            "INSERT INTO memory_fts (content, session_id, timestamp, message_type, metadata) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                text,
+                metadata.get("session_id"),
+                metadata.get("timestamp"),
+                metadata.get("message_type"),
+                json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
+            )
+        )
+        self._conn.execute("INSERT INTO memory_keys (fts_rowid, entry_key) VALUES (?, ?)", (cursor.lastrowid, key))
+
+    def add(self, entries: List[MemoryEntry]) -> int:
+        with self._lock, self._conn:
+            for text, metadata in entries:
+                self._insert_locked(
+                    text, metadata, self.entry_key(text, metadata.get("session_id"), metadata.get("timestamp"))
+                )
+        return len(entries)
+
+    def search(self, query: str, k: int, session_id: Optional[str] = None) -> List[Tuple[Document, float]]:
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+
+        sql = "SELECT content, metadata, bm25(memory_fts) AS score FROM memory_fts WHERE memory_fts MATCH ?"
+        params: List[Any] = [expression]
+        if session_id:
+            sql += " AND session_id = ?"
+            params.append(session_id)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(k)
+
+        try:
+            with self._lock:
+                rows = self._conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro na busca FTS5: {e}")
+            return []
+        # Escala fixa: uma palavra comum em comum não vira "resultado perfeito"
+        return [
+            (Document(page_content=content, metadata=json.loads(metadata)), self.distance(score))
+            for content, metadata, score in rows
+            if -score >= self.min_score
+        ]
+
+    def entries(self, session_ids: Optional[Iterable[str]] = None,
+                page_size: int = 1000) -> Iterator[List[Tuple[str, str, Dict[str, Any]]]]:
+        """
+        Páginas de (id, texto, metadados) em ordem de gravação (para snapshots)
+
+        Args:
+            session_ids: Sessões lidas (None = todas)
+            page_size: Entradas por página
+        """
+        wanted = list(session_ids) if session_ids else None
+        last_rowid = 0
+        while True:
+            sql = "SELECT rowid, content, metadata FROM memory_fts WHERE rowid > ?"
+            params: List[Any] = [last_rowid]
+            if wanted:
+                sql += f" AND session_id IN ({', '.join('?' * len(wanted))})"
+                params.extend(wanted)
+            sql += " ORDER BY rowid LIMIT ?"
+            params.append(page_size)
+            with self._lock:
+                rows = self._conn.execute(sql, params).fetchall()
+            if not rows:
+                return
+            yield [(f"fts5-{rowid}", content, json.loads(metadata)) for rowid, content, metadata in rows]
+            last_rowid = rows[-1][0]
+
+    def add_missing(self, entries: List[MemoryEntry]) -> int:
+        """Grava só as entradas ainda não indexadas (mesmo texto, sessão e timestamp)"""
+        added = 0
+        with self._lock, self._conn:
+            for text, metadata in entries:
+                key = self.entry_key(text, metadata.get("session_id"), metadata.get("timestamp"))
+                if self._conn.execute("SELECT 1 FROM memory_keys WHERE entry_key = ? LIMIT 1", (key,)).fetchone():
+                    continue
+                self._insert_locked(text, metadata, key)
+                added += 1
+        return added
+
+    def delete_entries(self, entries: Iterable[MemoryEntry]) -> int:
+        """Remove as entradas com o mesmo texto, sessão e timestamp e retorna quantas foram removidas"""
+        removed = 0
+        with self._lock, self._conn:
+            for text, metadata in entries:
+                key = self.entry_key(text, metadata.get("session_id"), metadata.get("timestamp"))
+                rowids = [row[0] for row in self._conn.execute(
+                    "SELECT fts_rowid FROM memory_keys WHERE entry_key = ?", (key,)
+                )]
+                if not rowids:
+                    continue
+                placeholders = ", ".join("?" * len(rowids))
+                removed += self._conn.execute(
+                    f"DELETE FROM memory_fts WHERE rowid IN ({placeholders})", rowids
+                ).rowcount
+                self._conn.execute(f"DELETE FROM memory_keys WHERE fts_rowid IN ({placeholders})", rowids)
+        return removed
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM memory_fts").fetchone()[0]
+
+    def delete_session(self, session_id: str) -> int:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM memory_keys WHERE fts_rowid IN (SELECT rowid FROM memory_fts WHERE session_id = ?)",
+                (session_id,)
+            )
+            return self._conn.execute("DELETE FROM memory_fts WHERE session_id = ?", (session_id,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class HybridMemoryBackend(MemoryBackend):
+    """
+    Grava em todos os backends e combina os candidatos de todos na busca
+
+    As distâncias de cada backend têm escalas diferentes (L2 do Chroma, BM25
+    do FTS5), então os candidatos são combinados pela posição em cada ranking
+    (reciprocal rank fusion) e não pelo valor da distância.
+    """
+
+    name = "hybrid"
+
+    def __init__(self, backends: List[MemoryBackend], max_distance: float = 2.5, rrf_k: int = RRF_K):
+        """
+        Args:
+            backends: Backends combinados
+            max_distance: Distância máxima do ranking (candidatos além dela são ignorados)
+            rrf_k: Constante da fusão (maior = posições pesam menos)
+        """
+        self.backends = backends
+        self.max_distance = max_distance
+        self.rrf_k = rrf_k
+
+    def _merge(self, result_lists: List[List[Tuple[Document, float]]]) -> List[Tuple[Document, float]]:
+        """
+        Soma 1 / (rrf_k + posição) de cada backend em que a entrada aparece
+
+        O resultado volta como distância em [0, max_distance): 0 para uma
+        entrada em primeiro lugar em todos os backends. Fica em ordem crescente
+        porque dedupe_candidates mantém o primeiro de cada grupo.
+        """
+        fused: Dict[Tuple[Any, ...], List[Any]] = {}
+        for results in result_lists:
+            ranked = [doc for doc, distance in sorted(results, key=lambda pair: pair[1])
+                      if distance < self.max_distance]
+            for rank, doc in enumerate(ranked, start=1):
+                key = (doc.page_content, doc.metadata.get("session_id"), doc.metadata.get("timestamp"))
+                entry = fused.setdefault(key, [doc, 0.0])
+                entry[1] += 1.0 / (self.rrf_k + rank)
+
+        best = len(result_lists) / (self.rrf_k + 1)
+        merged = [(doc, self.max_distance * (1.0 - score / best)) for doc, score in fused.values()]
+        return sorted(merged, key=lambda pair: pair[1])
+
+    def add(self, entries: List[MemoryEntry]) -> int:
+        return max((backend.add(entries) for backend in self.backends), default=0)
+
+    async def aadd(self, entries: List[MemoryEntry]) -> int:
+        written = await asyncio.gather(*(backend.aadd(entries) for backend in self.backends))
+        return max(written, default=0)
+
+    def search(self, query: str, k: int, session_id: Optional[str] = None) -> List[Tuple[Document, float]]:
+        return self._merge([backend.search(query, k, session_id) for backend in self.backends])
+
+    async def asearch(self, query: str, k: int,
+                      session_id: Optional[str] = None) -> List[Tuple[Document, float]]:
+        results = await asyncio.gather(*(backend.asearch(query, k, session_id) for backend in self.backends))
+        return self._merge(list(results))
+
+    def count(self) -> int:
+        return max((backend.count() for backend in self.backends), default=0)
+
+    def delete_session(self, session_id: str) -> int:
+        return max((backend.delete_session(session_id) for backend in self.backends), default=0)
+
+    def close(self):
+        for backend in self.backends:
+            backend.close()
+
+
+def create_memory_backend(kind: str, config: Dict[str, Any], vectorstore=None, embeddings=None,
+                          logger: Optional[logging.Logger] = None) -> Optional[MemoryBackend]:
+    """
+    Cria o backend configurado
+
+    Args:
+        kind: "chroma", "fts5" ou "hybrid" (ChromaDB + FTS5)
+        config: Configurações do chatbot
+        vectorstore: Vetorstore Chroma (obrigatório para "chroma"; opcional para "hybrid")
+        embeddings: Embeddings usados pelo vetorstore
+        logger: Logger opcional
+
+    Returns:
+        Backend ou None se nenhum estiver disponível
+    """
+    backends: List[MemoryBackend] = []
+    if kind in ("chroma", "hybrid") and vectorstore is not None:
+        backends.append(ChromaMemoryBackend(vectorstore, embeddings))
+    if kind in ("fts5", "hybrid"):
+        backends.append(FTS5MemoryBackend(
+            config.get("memory_fts_path", "data/memory_fts.db"),
+            max_distance=config.get("memory_max_distance", 2.5),
+            bm25_scale=config.get("memory_fts_bm25_scale", 5.0),
+            min_score=config.get("memory_fts_min_score", 0.0),
+            logger=logger
+        ))
+
+    if not backends:
+        return None
+    if kind == "hybrid" and len(backends) > 1:
+        return HybridMemoryBackend(backends, max_distance=config.get("memory_max_distance", 2.5))
+    return backends[0]
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Consolidação e compactação da memória de longo prazo
+
+Agrupa mensagens antigas de cada sessão, substitui os grupos por entradas de
+resumo/fato consolidadas e remove os vetores originais do ChromaDB. No backend
+hybrid as mesmas inserções e remoções são repetidas no índice FTS5 (mirror).
+"""
+
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.core.memory_scoring import estimate_importance, strip_message_prefix
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Bytes por dimensão do embedding (float32 no ChromaDB)
+EMBEDDING_BYTES_PER_DIM = 4
+
+
+@dataclass
+class CompactionPolicy:
+    """Política de compactação da memória"""
+    min_age_hours: float = 24.0  # Só compacta mensagens mais antigas que isso
+    min_session_messages: int = 20  # Sessões com menos mensagens antigas ficam intactas
+    keep_recent: int = 10  # Mensagens mais recentes de cada sessão nunca são compactadas
+    cluster_size: int = 10  # Máximo de mensagens por entrada consolidada
+    drop_importance: float = 0.2  # Abaixo disso a mensagem é descartada
+    fact_importance: float = 0.8  # A partir disso a mensagem vira uma entrada de fato
+    use_llm: bool = True  # Usa o LLM para resumir (fallback extrativo)
+    dry_run: bool = False  # Apenas calcula o relatório, sem alterar o vetorstore
+    batch_size: int = 1000  # Tamanho da página de leitura do ChromaDB
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "CompactionPolicy":
+        """Cria a política a partir do dicionário de configurações"""
+        return cls(
+            min_age_hours=config.get("compaction_min_age_hours", cls.min_age_hours),
+            min_session_messages=config.get("compaction_min_session_messages", cls.min_session_messages),
+            keep_recent=config.get("compaction_keep_recent", cls.keep_recent),
+            cluster_size=config.get("compaction_cluster_size", cls.cluster_size),
+            drop_importance=config.get("compaction_drop_importance", cls.drop_importance),
+            fact_importance=config.get("compaction_fact_importance", cls.fact_importance),
+            use_llm=config.get("compaction_use_llm", cls.use_llm),
+        )
+
+
+@dataclass
+class CompactionReport:
+    """Resultado de uma execução de compactação"""
+    sessions_scanned: int = 0
+    sessions_compacted: int = 0
+    vectors_before: int = 0
+    vectors_removed: int = 0
+    vectors_added: int = 0
+    vectors_reclaimed: int = 0
+    bytes_removed: int = 0
+    bytes_added: int = 0
+    bytes_reclaimed: int = 0
+    facts_kept: int = 0
+    summaries_created: int = 0
+    messages_dropped: int = 0
+    duration_seconds: float = 0.0
+    dry_run: bool = False
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte o relatório para dicionário"""
+        return asdict(self)
+
+
+class MemoryCompactor:
+    """Compactador da memória de longo prazo armazenada no ChromaDB"""
+
+    def __init__(self, vectorstore, llm=None, policy: Optional[CompactionPolicy] = None,
+                 logger: Optional[logging.Logger] = None, mirror=None):
+        """
+        Inicializa o compactador
+
+        Args:
+            vectorstore: Vetorstore Chroma com a memória de longo prazo
+            llm: LLM opcional para gerar os resumos consolidados
+            policy: Política de compactação
+            logger: Logger opcional
+            mirror: Backend com as mesmas entradas do Chroma (FTS5 no modo hybrid),
+                que recebe as entradas consolidadas e perde as originais
+        """
+        self.vectorstore = vectorstore
+        self.mirror = mirror
+        self.llm = llm
+        self.policy = policy or CompactionPolicy()
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_report: Optional[CompactionReport] = None
+
+    def run(self, policy: Optional[CompactionPolicy] = None) -> CompactionReport:
+        """
+        Executa uma passada completa de compactação
+
+        Args:
+            policy: Política a usar nesta execução (padrão: a do compactador)
+
+        Returns:
+            Relatório com vetores e bytes recuperados
+        """
+        policy = policy or self.policy
+        report = CompactionReport(dry_run=policy.dry_run)
+        start_time = time.time()
+
+        if not self.vectorstore or not hasattr(self.vectorstore, "_collection"):
+            self.logger.info("Compactação ignorada: vetorstore não disponível")
+            return report
+
+        with self._lock:
+            collection = self.vectorstore._collection
+            report.vectors_before = collection.count()
+            embedding_bytes = self._embedding_size_bytes(collection)
+            cutoff = datetime.now() - timedelta(hours=policy.min_age_hours)
+
+            sessions = self._group_ids_by_session(collection, policy.batch_size)
+            report.sessions_scanned = len(sessions)
+
+            for session_id, entries in sessions.items():
+                try:
+                    self._compact_session(session_id, entries, cutoff, embedding_bytes, policy, report)
+                except Exception as e:
+                    report.errors.append(f"{session_id}: {e}")
+                    self.logger.error(f"Erro ao compactar sessão {session_id}: {e}")
+
+        report.vectors_reclaimed = report.vectors_removed - report.vectors_added
+        report.bytes_reclaimed = report.bytes_removed - report.bytes_added
+        report.duration_seconds = time.time() - start_time
+        self.last_report = report
+
+        self.logger.info(
+            f"Compactação concluída: {report.vectors_reclaimed} vetores e "
+            f"{report.bytes_reclaimed} bytes recuperados em {report.sessions_compacted} sessões"
+        )
+        return report
+
+    def start_background(self, interval_seconds: float = 3600.0):
+        """Executa a compactação periodicamente em uma thread de fundo"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+
+        def _loop():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    self.run()
+                except Exception as e:
+                    self.logger.error(f"Erro na compactação em segundo plano: {e}")
+
+        self._thread = threading.Thread(target=_loop, name="memory-compactor", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Compactação em segundo plano iniciada (intervalo {interval_seconds:.0f}s)")
+
+    def stop_background(self):
+        """Interrompe a compactação em segundo plano"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+    def _group_ids_by_session(self, collection, batch_size: int) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+        """Lê os metadados paginados e agrupa os ids por sessão"""
+        sessions: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        offset = 0
+
+        while True:
+            page = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+            ids = page.get("ids") or []
+            if not ids:
+                break
+
+            for doc_id, metadata in zip(ids, page.get("metadatas") or []):
+                metadata = metadata or {}
+                sessions.setdefault(metadata.get("session_id", "N/A"), []).append((doc_id, metadata))
+
+            offset += len(ids)
+
+        return sessions
+
+    def _compact_session(self, session_id: str, entries: List[Tuple[str, Dict[str, Any]]],
+                         cutoff: datetime, embedding_bytes: int,
+                         policy: CompactionPolicy, report: CompactionReport):
+        """Consolida as mensagens antigas de uma sessão"""
+        # Entradas já consolidadas não são compactadas novamente
+        entries = [e for e in entries if not e[1].get("consolidated")]
+        entries.sort(key=lambda e: (e[1].get("timestamp", ""), e[1].get("message_index", 0)))
+
+        candidates = entries[:-policy.keep_recent] if policy.keep_recent > 0 else entries
+        old_entries = [e for e in candidates if self._parse_timestamp(e[1].get("timestamp")) <= cutoff]
+
+        if len(old_entries) < policy.min_session_messages:
+            return
+
+        ids = [doc_id for doc_id, _ in old_entries]
+        documents = self._fetch_documents(ids)
+
+        new_texts: List[str] = []
+        new_metadatas: List[Dict[str, Any]] = []
+        seen_facts: set = set()
+
+        for start in range(0, len(old_entries), policy.cluster_size):
+            cluster = old_entries[start:start + policy.cluster_size]
+            texts, metadatas = self._consolidate_cluster(
+                session_id, cluster, documents, policy, report, seen_facts
+            )
+            new_texts.extend(texts)
+            new_metadatas.extend(metadatas)
+
+        report.sessions_compacted += 1
+        report.vectors_removed += len(ids)
+        report.vectors_added += len(new_texts)
+        report.bytes_removed += sum(
+            self._entry_size(documents.get(doc_id, ""), metadata, embedding_bytes)
+            for doc_id, metadata in old_entries
+        )
+        report.bytes_added += sum(
+            self._entry_size(text, metadata, embedding_bytes)
+            for text, metadata in zip(new_texts, new_metadatas)
+        )
+
+        if policy.dry_run:
+            return
+
+        # Adiciona as entradas consolidadas antes de remover as originais
+        if new_texts:
+            self.vectorstore.add_texts(texts=new_texts, metadatas=new_metadatas)
+        self.vectorstore.delete(ids=ids)
+        if self.mirror is not None:
+            self.mirror.add(list(zip(new_texts, new_metadatas)))
+            self.mirror.delete_entries((documents.get(doc_id, ""), metadata) for doc_id, metadata in old_entries)
+
+        self.logger.info(
+            f"Sessão {session_id} compactada: {len(ids)} mensagens -> {len(new_texts)} entradas"
+        )
+
+    def _consolidate_cluster(self, session_id: str, cluster: List[Tuple[str, Dict[str, Any]]],
+                             documents: Dict[str, str], policy: CompactionPolicy,
+                             report: CompactionReport,
+                             seen_facts: set) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Transforma um grupo de mensagens em entradas de fato e um resumo"""
+        texts: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        to_summarize: List[str] = []
+        max_importance = 0.0
+
+        for doc_id, metadata in cluster:
+            text = documents.get(doc_id, "")
+            message_type = metadata.get("message_type", "Usuário")
+            importance = metadata.get("importance")
+            if importance is None:
+                importance = estimate_importance(text, message_type)
+
+            if importance < policy.drop_importance:
+                report.messages_dropped += 1
+                continue
+
+            if importance >= policy.fact_importance:
+                fact = strip_message_prefix(text).strip()
+                # Fatos repetidos na mesma sessão viram uma única entrada
+                if fact.lower() in seen_facts:
+                    report.messages_dropped += 1
+                    continue
+                seen_facts.add(fact.lower())
+                texts.append(f"Fato: {fact}")
+                metadatas.append(self._consolidated_metadata(
+                    session_id, [metadata], "Fato", importance
+                ))
+                report.facts_kept += 1
+            else:
+                to_summarize.append(text)
+                max_importance = max(max_importance, importance)
+
+        if to_summarize:
+            summary = self._summarize(to_summarize, policy)
+            texts.append(f"Resumo: {summary}")
+            metadatas.append(self._consolidated_metadata(
+                session_id, [m for _, m in cluster], "Resumo", max_importance
+            ))
+            report.summaries_created += 1
+
+        return texts, metadatas
+
+    def _summarize(self, messages: List[str], policy: CompactionPolicy) -> str:
+        """Resume um grupo de mensagens (LLM com fallback extrativo)"""
+        if policy.use_llm and self.llm is not None:
+            try:
+                prompt = (
+                    "Resuma a conversa a seguir em no máximo 3 frases curtas, "
+                    "preservando nomes, números e fatos sobre o usuário:\n\n"
+                    + "\n".join(messages)
+                )
+                response = self.llm.invoke(prompt)
+                content = getattr(response, "content", str(response))
+                if content:
+                    return content.strip()
+            except Exception as e:
+                self.logger.warning(f"Resumo via LLM falhou, usando resumo extrativo: {e}")
+
+        # Fallback: mantém as falas do usuário, que concentram a informação
+        user_lines = [strip_message_prefix(m) for m in messages if m.startswith("Usuário: ")]
+        lines = user_lines or [strip_message_prefix(m) for m in messages]
+        return " | ".join(line.strip() for line in lines if line.strip())
+
+    def _consolidated_metadata(self, session_id: str, sources: List[Dict[str, Any]],
+                               message_type: str, importance: float) -> Dict[str, Any]:
+        """Monta os metadados de uma entrada consolidada"""
+        timestamps = [m.get("timestamp", "") for m in sources if m.get("timestamp")]
+        indexes = [m.get("message_index", 0) for m in sources]
+        return {
+            "session_id": session_id,
+            "timestamp": max(timestamps) if timestamps else time.strftime(TIMESTAMP_FORMAT),
+            "message_type": message_type,
+            "message_index": min(indexes) if indexes else 0,
+            "consolidated": True,
+            "source_count": len(sources),
+            "importance": round(float(importance), 3),
+        }
+
+    def _fetch_documents(self, ids: List[str]) -> Dict[str, str]:
+        """Busca o texto das mensagens pelos ids"""
+        result = self.vectorstore._collection.get(ids=ids, include=["documents"])
+        return dict(zip(result.get("ids") or [], result.get("documents") or []))
+
+    def _embedding_size_bytes(self, collection) -> int:
+        """Estima o tamanho em bytes de um embedding armazenado"""
+        try:
+            sample = collection.get(limit=1, include=["embeddings"])
+            embeddings = sample.get("embeddings")
+            if embeddings is not None and len(embeddings) > 0:
+                return len(embeddings[0]) * EMBEDDING_BYTES_PER_DIM
+        except Exception as e:
+            self.logger.warning(f"Não foi possível medir o embedding: {e}")
+        return 0
+
+    @staticmethod
+    def _entry_size(text: str, metadata: Dict[str, Any], embedding_bytes: int) -> int:
+        """Tamanho aproximado de uma entrada (texto + metadados + embedding)"""
+        return (
+            len(text.encode("utf-8"))
+            + len(json.dumps(metadata, ensure_ascii=False).encode("utf-8"))
+            + embedding_bytes
+        )
+
+    @staticmethod
+    def _parse_timestamp(value: Optional[str]) -> datetime:
+        """Converte o timestamp dos metadados (datas inválidas contam como antigas)"""
+        try:
+            return datetime.strptime(value, TIMESTAMP_FORMAT)
+        except (TypeError, ValueError):
+            return datetime.min
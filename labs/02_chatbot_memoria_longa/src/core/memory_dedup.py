@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Detecção de quase-duplicatas na memória com SimHash
+
+Usada na leitura (mescla memórias recuperadas repetidas antes de montar o
+contexto) e na escrita (atualiza o timestamp de uma entrada existente em vez
+de adicionar um novo vetor).
+"""
+
+import re
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.memory_scoring import strip_message_prefix
+
+SIMHASH_BITS = 64
+# 4 bandas de 16 bits: duas entradas a distância <= 3 compartilham ao menos uma banda
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+DEFAULT_MAX_HAMMING = 3
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _features(text: str) -> List[str]:
+    """Palavras e bigramas normalizados do conteúdo (sem o prefixo de tipo)"""
+    words = _TOKEN_RE.findall(strip_message_prefix(text).lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def simhash(text: str) -> int:
+    """Calcula o SimHash de 64 bits do texto (soma de bits vetorizada com NumPy)"""
+    features = _features(text)
+    if not features:
+        return 0
+
+    digests = b"".join(
+        hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest() for feature in features
+    )
+    # Cada linha: 64 bits de um digest; o bit é 1 no hash se a maioria das features o tem
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(len(features), 8), axis=1)
+    majority = bits.sum(axis=0) * 2 > len(features)
+    return int.from_bytes(np.packbits(majority).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Número de bits diferentes entre dois hashes"""
+    return (a ^ b).bit_count()
+
+
+def band_keys(value: int) -> List[int]:
+    """Divide o hash em bandas usadas como chaves de busca exata"""
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (i * BAND_BITS)) & mask for i in range(SIMHASH_BANDS)]
+
+
+def simhash_metadata(value: int) -> Dict[str, Any]:
+    """Campos de metadados que permitem buscar quase-duplicatas no ChromaDB"""
+    metadata: Dict[str, Any] = {"simhash": f"{value:016x}"}
+    for i, band in enumerate(band_keys(value)):
+        metadata[f"simhash_b{i}"] = band
+    return metadata
+
+
+def _metadata_simhash(metadata: Dict[str, Any], text: str) -> int:
+    """SimHash gravado nos metadados ou calculado a partir do texto"""
+    stored = metadata.get("simhash") if metadata else None
+    if stored:
+        try:
+            return int(stored, 16)
+        except ValueError:
+            pass
+    return simhash(text)
+
+
+def dedupe_candidates(results: List[Tuple[Any, float]],
+                      max_hamming: int = DEFAULT_MAX_HAMMING) -> Tuple[List[Tuple[Any, float]], int]:
+    """
+    Mescla quase-duplicatas entre os resultados do vetorstore
+
+    Os resultados chegam ordenados por distância; o primeiro de cada grupo é
+    mantido e herda o timestamp mais recente do grupo.
+
+    Args:
+        results: Pares (documento, distância)
+        max_hamming: Distância de Hamming máxima para considerar duplicata
+
+    Returns:
+        Tupla (resultados sem duplicatas, número de duplicatas removidas)
+    """
+    kept: List[Tuple[Any, float]] = []
+    hashes: List[int] = []
+    removed = 0
+
+    for doc, score in results:
+        value = _metadata_simhash(doc.metadata, doc.page_content)
+        duplicate_of = next(
+            (i for i, h in enumerate(hashes) if hamming_distance(h, value) <= max_hamming), None
+        )
+        if duplicate_of is None:
+            kept.append((doc, score))
+            hashes.append(value)
+            continue
+
+        removed += 1
+        kept_doc = kept[duplicate_of][0]
+        kept_doc.metadata["duplicates"] = kept_doc.metadata.get("duplicates", 0) + 1
+        for key in ("timestamp_epoch", "timestamp"):
+            if key in doc.metadata and doc.metadata[key] > kept_doc.metadata.get(key, doc.metadata[key]):
+                kept_doc.metadata[key] = doc.metadata[key]
+
+    return kept, removed
+
+
+def dedupe_texts(texts: List[str], max_hamming: int = DEFAULT_MAX_HAMMING) -> List[str]:
+    """Remove quase-duplicatas de uma lista de textos, preservando a ordem"""
+    kept: List[str] = []
+    hashes: List[int] = []
+    for text in texts:
+        value = simhash(text)
+        if all(hamming_distance(h, value) > max_hamming for h in hashes):
+            kept.append(text)
+            hashes.append(value)
+    return kept
+
+
+def find_near_duplicate(collection, value: int, message_type: Optional[str] = None,
+                        max_hamming: int = DEFAULT_MAX_HAMMING) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Busca no ChromaDB uma entrada quase idêntica usando as bandas do SimHash
+
+    Args:
+        collection: Coleção do ChromaDB
+        value: SimHash da nova mensagem
+        message_type: Restringe a busca ao mesmo tipo de mensagem
+        max_hamming: Distância de Hamming máxima
+
+    Returns:
+        Tupla (id, metadados) da duplicata ou None
+    """
+    band_filter: Dict[str, Any] = {
+        "$or": [{f"simhash_b{i}": band} for i, band in enumerate(band_keys(value))]
+    }
+    where = {"$and": [band_filter, {"message_type": message_type}]} if message_type else band_filter
+
+    candidates = collection.get(where=where, include=["metadatas"])
+    for doc_id, metadata in zip(candidates.get("ids") or [], candidates.get("metadatas") or []):
+        stored = (metadata or {}).get("simhash")
+        if stored and hamming_distance(int(stored, 16), value) <= max_hamming:
+            return doc_id, metadata
+    return None
+
+
+class SimHashIndex:
+    """Índice em memória de SimHash por bandas, agrupado por sessão (usado no modo de teste)"""
+
+    def __init__(self, max_hamming: int = DEFAULT_MAX_HAMMING):
+        self.max_hamming = max_hamming
+        self._bands: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in range(SIMHASH_BANDS)]
+
+    def find(self, value: int) -> Optional[str]:
+        """Retorna a sessão de um hash indexado a distância <= max_hamming, se houver"""
+        for table, band in zip(self._bands, band_keys(value)):
+            for candidate, session_id in table.get(band, ()):
+                if hamming_distance(candidate, value) <= self.max_hamming:
+                    return session_id
+        return None
+
+    def add(self, value: int, session_id: str):
+        """Indexa o hash de uma mensagem da sessão"""
+        for table, band in zip(self._bands, band_keys(value)):
+            table.setdefault(band, []).append((value, session_id))
+
+    def remove_session(self, session_id: str):
+        """Remove os hashes de uma sessão"""
+        for table in self._bands:
+            for band in list(table):
+                entries = [entry for entry in table[band] if entry[1] != session_id]
+                if entries:
+                    table[band] = entries
+                else:
+                    del table[band]
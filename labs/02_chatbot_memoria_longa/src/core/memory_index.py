@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Índice invertido incremental para a memória simulada do modo de teste
+"""
+
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Chave de uma mensagem no índice: (sessão, id da mensagem)
+MessageKey = Tuple[str, int]
+
+
+class InvertedMemoryIndex:
+    """Memória simulada indexada por token -> posting list de (sessão, id da mensagem)"""
+
+    def __init__(self):
+        self._messages: Dict[MessageKey, str] = {}
+        self._sessions: Dict[str, List[int]] = {}
+        self._postings: Dict[str, List[MessageKey]] = {}
+        self._next_id = 0
+        self._total_postings = 0
+        self._stale_postings = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @staticmethod
+    def tokenize(text: str) -> set:
+        """Tokeniza o texto como a busca por palavras em comum"""
+        return set(text.lower().split())
+
+    def add(self, session_id: str, text: str) -> int:
+        """
+        Adiciona uma mensagem ao índice
+
+        Args:
+            session_id: ID da sessão
+            text: Texto da mensagem ("Usuário: ...")
+
+        Returns:
+            ID da mensagem no índice
+        """
+        with self._lock:
+            message_id = self._next_id
+            self._next_id += 1
+
+            key = (session_id, message_id)
+            self._messages[key] = text
+            self._sessions.setdefault(session_id, []).append(message_id)
+
+            tokens = self.tokenize(text)
+            for token in tokens:
+                self._postings.setdefault(token, []).append(key)
+            self._total_postings += len(tokens)
+
+            return message_id
+
+    def search(self, query: str, min_overlap: int = 2, limit: int = 5) -> Tuple[int, List[str]]:
+        """
+        Busca mensagens com palavras em comum com a query
+
+        Args:
+            query: Texto da query
+            min_overlap: Mínimo de palavras em comum para considerar relevante
+            limit: Número máximo de mensagens retornadas
+
+        Returns:
+            Tupla (total de mensagens relevantes, top mensagens por sobreposição)
+        """
+        counts: Counter = Counter()
+        with self._lock:
+            for token in self.tokenize(query):
+                posting = self._postings.get(token)
+                if posting:
+                    counts.update(posting)
+
+            relevant = [
+                (count, key) for key, count in counts.items()
+                if count >= min_overlap and key in self._messages
+            ]
+            # Maior sobreposição primeiro; empate resolvido pela mensagem mais antiga
+            top = heapq.nsmallest(limit, relevant, key=lambda item: (-item[0], item[1][1]))
+            return len(relevant), [self._messages[key] for _, key in top]
+
+    def get_session(self, session_id: str) -> List[str]:
+        """Retorna as mensagens de uma sessão em ordem de inserção"""
+        with self._lock:
+            return [
+                self._messages[(session_id, message_id)]
+                for message_id in self._sessions.get(session_id, [])
+            ]
+
+    def sessions(self) -> List[str]:
+        """Retorna os IDs das sessões indexadas"""
+        with self._lock:
+            return list(self._sessions)
+
+    def remove_session(self, session_id: str) -> int:
+        """
+        Remove as mensagens de uma sessão
+
+        As posting lists são limpas de forma preguiçosa e reconstruídas quando
+        a maior parte das entradas estiver obsoleta.
+
+        Returns:
+            Número de mensagens removidas
+        """
+        with self._lock:
+            message_ids = self._sessions.pop(session_id, [])
+            for message_id in message_ids:
+                text = self._messages.pop((session_id, message_id))
+                self._stale_postings += len(self.tokenize(text))
+
+            if self._stale_postings > self._total_postings // 2:
+                self._rebuild_postings()
+
+            return len(message_ids)
+
+    def clear(self):
+        """Remove todas as mensagens do índice"""
+        with self._lock:
+            self._messages.clear()
+            self._sessions.clear()
+            self._postings.clear()
+            self._total_postings = 0
+            self._stale_postings = 0
+
+    def _rebuild_postings(self):
+        """Reconstrói as posting lists sem as mensagens removidas"""
+        postings: Dict[str, List[MessageKey]] = {}
+        total = 0
+        for key in sorted(self._messages, key=lambda k: k[1]):
+            tokens = self.tokenize(self._messages[key])
+            for token in tokens:
+                postings.setdefault(token, []).append(key)
+            total += len(tokens)
+        self._postings = postings
+        self._total_postings = total
+        self._stale_postings = 0
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Registro compacto de mensagens da memória
+
+Guarda apenas o conteúdo, o papel, a contagem de tokens e o timestamp de cada
+mensagem, em vez do repr completo do AIMessage (response_metadata, uso de
+tokens, ids), e é usado de forma consistente na janela de conversa, nos
+resumos e no vetorstore.
+"""
+
+import re
+import ast
+import time
+import logging
+from typing import Any, Dict, Optional
+
+from langchain.schema import BaseMessage, HumanMessage, AIMessage, Document
+
+from src.utils.tokens import count_tokens
+from src.core.memory_scoring import estimate_importance
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+ROLE_LABELS = {"user": "Usuário", "assistant": "Assistente"}
+
+# Repr de um AIMessage armazenado por engano: "content='...' additional_kwargs={...} ..."
+_BLOATED_RE = re.compile(
+    r"""^content=('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")\s+(?:additional_kwargs|response_metadata)=""",
+    re.DOTALL
+)
+
+
+class MemoryMessage:
+    """Mensagem compacta da memória de conversa"""
+
+    __slots__ = ("content", "role", "token_count", "timestamp")
+
+    def __init__(self, content: str, role: str, token_count: Optional[int] = None,
+                 timestamp: Optional[str] = None):
+        """
+        Inicializa o registro
+
+        Args:
+            content: Texto da mensagem (apenas o conteúdo)
+            role: "user" ou "assistant"
+            token_count: Tokens do conteúdo (calculado se não informado)
+            timestamp: Momento da mensagem (padrão: agora)
+        """
+        self.content = content
+        self.role = role
+        self.token_count = count_tokens(content) if token_count is None else token_count
+        self.timestamp = timestamp or time.strftime(TIMESTAMP_FORMAT)
+
+    def __repr__(self) -> str:
+        return f"MemoryMessage(role={self.role!r}, tokens={self.token_count}, content={self.content[:40]!r})"
+
+    @classmethod
+    def from_response(cls, response: Any) -> "MemoryMessage":
+        """Cria o registro a partir da resposta do LLM (usa apenas o conteúdo)"""
+        content = getattr(response, "content", response)
+        if isinstance(content, list):
+            content = " ".join(
+                item.get("text", "") if isinstance(item, dict) else str(item) for item in content
+            )
+        return cls(str(content), "assistant")
+
+    @classmethod
+    def from_message(cls, message: BaseMessage) -> "MemoryMessage":
+        """Converte uma mensagem do LangChain para o registro compacto"""
+        role = "user" if isinstance(message, HumanMessage) else "assistant"
+        return cls(extract_content(str(message.content)), role)
+
+    @property
+    def message_type(self) -> str:
+        """Rótulo usado no texto e nos metadados ("Usuário"/"Assistente")"""
+        return ROLE_LABELS.get(self.role, "Assistente")
+
+    def to_text(self) -> str:
+        """Texto armazenado e embedado no vetorstore"""
+        return f"{self.message_type}: {self.content}"
+
+    def to_langchain(self) -> BaseMessage:
+        """Converte para mensagem do LangChain (janela de conversa)"""
+        if self.role == "user":
+            return HumanMessage(content=self.content)
+        return AIMessage(content=self.content)
+
+    def metadata(self, session_id: str, message_index: int) -> Dict[str, Any]:
+        """Metadados armazenados junto ao vetor (inclui a importância calculada na escrita)"""
+        return {
+            "session_id": session_id,
+            "timestamp": self.timestamp,
+            "timestamp_epoch": time.mktime(time.strptime(self.timestamp, TIMESTAMP_FORMAT)),
+            "message_type": self.message_type,
+            "message_index": message_index,
+            "content_length": len(self.content),
+            "token_count": self.token_count,
+            "importance": round(estimate_importance(self.content, self.message_type), 3),
+        }
+
+
+def is_bloated(text: str) -> bool:
+    """Indica se o texto contém o repr completo de uma mensagem do LangChain"""
+    for prefix in ("Usuário: ", "Assistente: "):
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+            break
+    return bool(_BLOATED_RE.match(text))
+
+
+def extract_content(text: str) -> str:
+    """
+    Recupera apenas o conteúdo de um repr de AIMessage
+
+    Textos que não são repr de mensagem são retornados sem alteração.
+    """
+    match = _BLOATED_RE.match(text)
+    if not match:
+        return text
+    try:
+        return ast.literal_eval(match.group(1))
+    except (ValueError, SyntaxError):
+        return match.group(1)[1:-1]
+
+
+def migrate_bloated_entries(vectorstore, batch_size: int = 500,
+                            logger: Optional[logging.Logger] = None, mirror=None) -> Dict[str, int]:
+    """
+    Reescreve no ChromaDB as entradas que guardaram o repr completo do AIMessage
+
+    O texto é substituído pelo conteúdo compacto e re-embedado; os metadados
+    de tamanho são atualizados e os demais preservados.
+
+    Args:
+        vectorstore: Vetorstore Chroma
+        batch_size: Tamanho da página de leitura
+        logger: Logger opcional
+        mirror: Backend com as mesmas entradas (FTS5 no modo hybrid), reescrito junto
+
+    Returns:
+        Estatísticas da migração (entradas lidas, reescritas e bytes economizados)
+    """
+    logger = logger or logging.getLogger(__name__)
+    stats = {"scanned": 0, "rewritten": 0, "bytes_saved": 0}
+
+    if not vectorstore or not hasattr(vectorstore, "_collection"):
+        return stats
+
+    collection = vectorstore._collection
+    offset = 0
+
+    while True:
+        page = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+        ids = page.get("ids") or []
+        if not ids:
+            break
+        offset += len(ids)
+
+        rewrite_ids, rewrite_docs, originals = [], [], []
+        for doc_id, text, metadata in zip(ids, page.get("documents") or [], page.get("metadatas") or []):
+            stats["scanned"] += 1
+            if not text or not is_bloated(text):
+                continue
+
+            originals.append((text, metadata or {}))
+            metadata = dict(metadata or {})
+            prefix, _, body = text.partition(": ")
+            content = extract_content(body)
+            new_text = f"{prefix}: {content}"
+
+            metadata["content_length"] = len(content)
+            metadata["token_count"] = count_tokens(content)
+
+            rewrite_ids.append(doc_id)
+            rewrite_docs.append(Document(page_content=new_text, metadata=metadata))
+            stats["bytes_saved"] += len(text.encode("utf-8")) - len(new_text.encode("utf-8"))
+
+        if rewrite_ids:
+            # update_documents re-embeda o texto compacto mantendo os mesmos ids
+            vectorstore.update_documents(ids=rewrite_ids, documents=rewrite_docs)
+            stats["rewritten"] += len(rewrite_ids)
+            if mirror is not None:
+                mirror.delete_entries(originals)
+                mirror.add([(doc.page_content, doc.metadata) for doc in rewrite_docs])
+
+    logger.info(
+        f"Migração concluída: {stats['rewritten']}/{stats['scanned']} entradas reescritas, "
+        f"{stats['bytes_saved']} bytes economizados"
+    )
+    return stats
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Ranking da memória recuperada ponderado por distância, recência e importância
+
+Os candidatos retornados pelo vetorstore são pontuados em lote com NumPy e
+cortados por um orçamento de tokens antes de entrarem no prompt.
+"""
+
+import time
+from datetime import datetime
+from dataclasses import dataclass
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from src.core.memory_scoring import estimate_importance
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Peso por tipo de mensagem: falas do usuário e fatos consolidados valem mais
+TYPE_WEIGHTS = {
+    "Fato": 1.0,
+    "Usuário": 0.9,
+    "Resumo": 0.7,
+    "Assistente": 0.4,
+}
+
+
+@dataclass
+class RankingWeights:
+    """Pesos e parâmetros do ranking de memória"""
+    distance: float = 0.55
+    recency: float = 0.15
+    importance: float = 0.2
+    message_type: float = 0.1
+    half_life_hours: float = 72.0  # Meia-vida do decaimento temporal
+    max_distance: float = 2.5  # Candidatos com distância maior são descartados
+    token_budget: int = 400  # Orçamento de tokens do contexto de memória
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RankingWeights":
+        """Cria os pesos a partir do dicionário de configurações"""
+        return cls(
+            half_life_hours=config.get("memory_half_life_hours", cls.half_life_hours),
+            max_distance=config.get("memory_max_distance", cls.max_distance),
+            token_budget=config.get("memory_token_budget", cls.token_budget),
+        )
+
+
+def _epoch(metadata: Dict[str, Any]) -> float:
+    """Timestamp em segundos (usa o valor numérico gravado na escrita, se houver)"""
+    value = metadata.get("timestamp_epoch")
+    if value is not None:
+        return float(value)
+    try:
+        return datetime.strptime(metadata.get("timestamp", ""), TIMESTAMP_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def score_candidates(distances: np.ndarray, timestamps: np.ndarray, importances: np.ndarray,
+                     type_weights: np.ndarray, now: float, weights: RankingWeights) -> np.ndarray:
+    """
+    Calcula o score combinado de cada candidato (vetorizado)
+
+    Args:
+        distances: Distâncias retornadas pelo vetorstore (menor = mais similar)
+        timestamps: Timestamps em segundos desde a época
+        importances: Importância gravada na escrita (0-1)
+        type_weights: Peso do tipo de mensagem (0-1)
+        now: Momento de referência em segundos
+        weights: Pesos do ranking
+
+    Returns:
+        Scores (maior = melhor); candidatos acima da distância máxima recebem -inf
+    """
+    similarity = np.clip(1.0 - distances / weights.max_distance, 0.0, 1.0)
+    age_hours = np.maximum(now - timestamps, 0.0) / 3600.0
+    recency = np.exp2(-age_hours / weights.half_life_hours)
+
+    scores = (
+        weights.distance * similarity
+        + weights.recency * recency
+        + weights.importance * importances
+        + weights.message_type * type_weights
+    )
+    return np.where(distances < weights.max_distance, scores, -np.inf)
+
+
+def select_within_budget(order: np.ndarray, token_counts: np.ndarray, budget: int) -> np.ndarray:
+    """Mantém o prefixo do ranking que cabe no orçamento (ao menos o melhor candidato)"""
+    if order.size == 0:
+        return order
+    cumulative = np.cumsum(token_counts[order])
+    keep = int(np.searchsorted(cumulative, budget, side="right"))
+    return order[:max(keep, 1)]
+
+
+def rank_memories(results: List[Tuple[Any, float]], weights: RankingWeights,
+                  now: float = None) -> Tuple[List[Tuple[Any, float]], Dict[str, Any]]:
+    """
+    Ordena e corta os resultados do vetorstore
+
+    Args:
+        results: Pares (documento, distância) retornados pelo vetorstore
+        weights: Pesos do ranking
+        now: Momento de referência (padrão: agora)
+
+    Returns:
+        Tupla (pares (documento, score) selecionados, estatísticas do ranking)
+    """
+    start = time.perf_counter()
+    now = time.time() if now is None else now
+
+    if not results:
+        return [], {"candidates": 0, "selected": 0, "selected_tokens": 0, "ranking_time_us": 0.0}
+
+    metadatas = [doc.metadata or {} for doc, _ in results]
+    distances = np.fromiter((score for _, score in results), dtype=np.float64, count=len(results))
+    timestamps = np.fromiter((_epoch(m) for m in metadatas), dtype=np.float64, count=len(results))
+    importances = np.fromiter(
+        (
+            m["importance"] if m.get("importance") is not None
+            else estimate_importance(doc.page_content, m.get("message_type", "Usuário"))
+            for (doc, _), m in zip(results, metadatas)
+        ),
+        dtype=np.float64, count=len(results)
+    )
+    type_weights = np.fromiter(
+        (TYPE_WEIGHTS.get(m.get("message_type"), 0.5) for m in metadatas),
+        dtype=np.float64, count=len(results)
+    )
+    token_counts = np.fromiter(
+        (m.get("token_count") or len(doc.page_content) // 4 + 1 for (doc, _), m in zip(results, metadatas)),
+        dtype=np.int64, count=len(results)
+    )
+
+    scores = score_candidates(distances, timestamps, importances, type_weights, now, weights)
+    valid = np.flatnonzero(np.isfinite(scores))
+    order = valid[np.argsort(-scores[valid], kind="stable")]
+    selected = select_within_budget(order, token_counts, weights.token_budget)
+
+    stats = {
+        "candidates": len(results),
+        "selected": int(selected.size),
+        "selected_tokens": int(token_counts[selected].sum()) if selected.size else 0,
+        "ranking_time_us": (time.perf_counter() - start) * 1e6,
+    }
+    return [(results[i][0], float(scores[i])) for i in selected], stats
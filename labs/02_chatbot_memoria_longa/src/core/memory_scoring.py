@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Heurísticas locais para pontuar a importância das mensagens da memória
+"""
+
+import re
+
+# Padrões em primeira pessoa que normalmente introduzem fatos estáveis sobre o usuário
+FACT_PATTERNS = [
+    r"\bmeu nome\b",
+    r"\bme chamo\b",
+    r"\bsou (?:o|a|um|uma)\b",
+    r"\beu sou\b",
+    r"\bmoro\b",
+    r"\btenho \d+",
+    r"\bminha idade\b",
+    r"\btrabalho\b",
+    r"\bminha (?:esposa|empresa|filha|m[ãa]e)\b",
+    r"\bmeu (?:marido|filho|pai|irm[ãa]o)\b",
+    r"\bgosto de\b",
+    r"\bprofiss[ãa]o\b",
+    r"\banos\b",
+]
+
+# Turnos triviais que não carregam informação útil para a memória
+TRIVIAL_PATTERNS = [
+    r"^teste\b",
+    r"^conversa intermedi[áa]ria\b",
+    r"^(?:ol[áa]|oi|bom dia|boa tarde|boa noite|obrigad[oa]|tchau)[!.,\s]*$",
+]
+
+_FACT_RE = re.compile("|".join(FACT_PATTERNS), re.IGNORECASE)
+_TRIVIAL_RE = re.compile("|".join(TRIVIAL_PATTERNS), re.IGNORECASE)
+
+
+def strip_message_prefix(text: str) -> str:
+    """Remove o prefixo 'Usuário: '/'Assistente: ' usado no texto armazenado"""
+    for prefix in ("Usuário: ", "Assistente: "):
+        if text.startswith(prefix):
+            return text[len(prefix):]
+    return text
+
+
+def estimate_importance(text: str, message_type: str = "Usuário") -> float:
+    """
+    Estima a importância de uma mensagem para a memória de longo prazo
+
+    Args:
+        text: Conteúdo da mensagem (com ou sem prefixo de tipo)
+        message_type: "Usuário" ou "Assistente"
+
+    Returns:
+        Score entre 0.0 (trivial) e 1.0 (fato relevante)
+    """
+    content = strip_message_prefix(text).strip()
+    if not content:
+        return 0.0
+
+    if _TRIVIAL_RE.search(content):
+        return 0.05
+
+    fact_hits = len(_FACT_RE.findall(content))
+
+    if message_type == "Usuário":
+        score = 0.3 + 0.25 * min(fact_hits, 2)
+        # Números e nomes próprios costumam indicar informação concreta
+        if re.search(r"\d", content):
+            score += 0.1
+        if re.search(r"\s[A-ZÁÉÍÓÚÂÊÔÃÕ][a-záéíóúâêôãõç]+", content):
+            score += 0.1
+    else:
+        # Respostas do assistente são derivadas; valem menos que a fala do usuário
+        score = 0.2 + 0.1 * min(fact_hits, 2)
+        if len(content) > 600:
+            score -= 0.1
+
+    return max(0.0, min(1.0, score))
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Snapshot binário da memória de longo prazo
+
+Exporta mensagens, metadados e embeddings já calculados para um arquivo
+compacto que pode ser importado em outro nó sem re-embedar.
+
+Layout do arquivo (little-endian):
+    [0:64)      cabeçalho: magic, versão, registros, dimensão e offsets
+    [64:...)    matriz de embeddings float16 (registros x dimensão)
+    [blob]      por registro: id, texto e metadados JSON, cada um com prefixo uint32 de tamanho
+    [manifest]  JSON com modelo de embeddings, sessões e data da exportação
+
+A leitura usa mmap: a matriz é exposta como um array NumPy sem cópia e os
+textos são decodificados sob demanda.
+"""
+
+import json
+import mmap
+import time
+import struct
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"LTMSNAP1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIQQQQ")
+HEADER_SIZE = 64
+_LENGTH = struct.Struct("<I")
+
+# Registro do snapshot: (id, texto, metadados)
+SnapshotRecord = Tuple[str, str, Dict[str, Any]]
+
+
+def _write_prefixed(buffer, data: bytes):
+    """Escreve um campo com prefixo de tamanho"""
+    buffer.write(_LENGTH.pack(len(data)))
+    buffer.write(data)
+
+
+def write_snapshot(path: str, pages: Iterator[Tuple[List[SnapshotRecord], Optional[np.ndarray]]],
+                   dim: int, manifest: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Grava um snapshot a partir de páginas de registros
+
+    A matriz é escrita página a página; o blob de textos vai para um arquivo
+    temporário e é concatenado no final, então a exportação não precisa
+    manter a coleção inteira em memória.
+
+    Args:
+        path: Arquivo de destino
+        pages: Iterador de (registros, embeddings da página)
+        dim: Dimensão dos embeddings (0 para snapshot sem vetores)
+        manifest: Informações extras gravadas no arquivo
+
+    Returns:
+        Estatísticas da exportação
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    sessions = set()
+
+    with open(path, "wb") as output, tempfile.TemporaryFile() as blob:
+        output.write(b"\0" * HEADER_SIZE)
+
+        for records, embeddings in pages:
+            if dim:
+                matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(records), dim)
+                output.write(matrix.astype("<f2").tobytes())
+            for doc_id, text, metadata in records:
+                _write_prefixed(blob, doc_id.encode("utf-8"))
+                _write_prefixed(blob, text.encode("utf-8"))
+                metadata_json = json.dumps(metadata, ensure_ascii=False, separators=(",", ":"))
+                _write_prefixed(blob, metadata_json.encode("utf-8"))
+                sessions.add(metadata.get("session_id"))
+            count += len(records)
+
+        blob_offset = output.tell()
+        blob.seek(0)
+        while True:
+            chunk = blob.read(1 << 20)
+            if not chunk:
+                break
+            output.write(chunk)
+        blob_size = output.tell() - blob_offset
+
+        manifest = dict(manifest or {})
+        manifest.update(
+            created_at=time.strftime("%Y-%m-%d %H:%M:%S"),
+            sessions=sorted(s for s in sessions if s is not None)
+        )
+        manifest_bytes = json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+        manifest_offset = output.tell()
+        output.write(manifest_bytes)
+
+        output.seek(0)
+        output.write(HEADER.pack(MAGIC, VERSION, count, dim, blob_offset, blob_size,
+                                 manifest_offset, len(manifest_bytes)))
+        size = manifest_offset + len(manifest_bytes)
+
+    return {"records": count, "dim": dim, "sessions": len(manifest["sessions"]), "bytes": size}
+
+
+class SnapshotReader:
+    """Leitura de snapshot via mmap (matriz sem cópia, textos sob demanda)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Arquivo vazio não pode ser mapeado
+            self._file.close()
+            raise ValueError(f"Snapshot inválido: {path}")
+
+        (magic, version, self.count, self.dim, self._blob_offset, self._blob_size,
+         manifest_offset, manifest_size) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Snapshot inválido: {path}")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Versão de snapshot não suportada: {version}")
+
+        self.manifest = json.loads(bytes(self._mm[manifest_offset:manifest_offset + manifest_size]))
+        self.embeddings = (
+            np.frombuffer(self._mm, dtype="<f2", count=self.count * self.dim, offset=HEADER_SIZE)
+            .reshape(self.count, self.dim)
+        )
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def records(self) -> Iterator[SnapshotRecord]:
+        """Itera os registros na mesma ordem das linhas da matriz"""
+        view = memoryview(self._mm)
+        position = self._blob_offset
+        try:
+            for _ in range(self.count):
+                fields = []
+                for _ in range(3):
+                    (length,) = _LENGTH.unpack_from(view, position)
+                    position += _LENGTH.size
+                    fields.append(str(view[position:position + length], "utf-8"))
+                    position += length
+                yield fields[0], fields[1], json.loads(fields[2])
+        finally:
+            view.release()
+
+    def close(self):
+        """Libera o mmap e o arquivo"""
+        # A matriz referencia o mmap; precisa ser descartada antes do close
+        self.embeddings = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+
+def export_collection(collection, path: str, session_ids: Optional[Iterable[str]] = None,
+                      batch_size: int = 1000, manifest: Optional[Dict[str, Any]] = None,
+                      logger: Optional[logging.Logger] = None) -> Dict[str, Any]:
+    """
+    Exporta uma coleção do ChromaDB (ou apenas algumas sessões) para um snapshot
+
+    Args:
+        collection: Coleção do ChromaDB
+        path: Arquivo de destino
+        session_ids: Sessões exportadas (None = todas)
+        batch_size: Tamanho da página de leitura
+        manifest: Informações extras gravadas no arquivo
+        logger: Logger opcional
+
+    Returns:
+        Estatísticas da exportação
+    """
+    logger = logger or logging.getLogger(__name__)
+    start = time.time()
+    where = {"session_id": {"$in": sorted(set(session_ids))}} if session_ids else None
+
+    probe = collection.get(where=where, include=["embeddings"], limit=1)
+    dim = len(probe["embeddings"][0]) if probe.get("ids") else 0
+
+    def pages():
+        offset = 0
+        while True:
+            page = collection.get(
+                where=where, include=["embeddings", "documents", "metadatas"],
+                limit=batch_size, offset=offset
+            )
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            offset += len(ids)
+            records = [
+                (doc_id, text or "", dict(metadata or {}))
+                for doc_id, text, metadata in zip(ids, page["documents"], page["metadatas"])
+            ]
+            yield records, page["embeddings"]
+
+    stats = write_snapshot(path, pages(), dim, manifest)
+    stats["duration_seconds"] = time.time() - start
+    logger.info(
+        f"Snapshot exportado: {stats['records']} registros de {stats['sessions']} sessões "
+        f"({stats['bytes']} bytes) em {stats['duration_seconds']:.2f}s"
+    )
+    return stats
+
+
+def import_collection(collection, path: str, session_ids: Optional[Iterable[str]] = None,
+                      batch_size: int = 1000, embedding_model: Optional[str] = None,
+                      logger: Optional[logging.Logger] = None) -> Dict[str, Any]:
+    """
+    Importa um snapshot para a coleção usando os embeddings gravados (sem re-embedar)
+
+    Registros cujo id já existe na coleção são ignorados, então a
+    importação pode ser repetida.
+
+    Args:
+        collection: Coleção do ChromaDB
+        path: Snapshot de origem
+        session_ids: Sessões importadas (None = todas)
+        batch_size: Registros por chamada ao ChromaDB
+        embedding_model: Modelo de embeddings do destino (para aviso de incompatibilidade)
+        logger: Logger opcional
+
+    Returns:
+        Estatísticas da importação
+    """
+    logger = logger or logging.getLogger(__name__)
+    start = time.time()
+    wanted = set(session_ids) if session_ids else None
+    stats = {"records": 0, "imported": 0, "skipped": 0}
+
+    with SnapshotReader(path) as reader:
+        stats["records"] = len(reader)
+        source_model = reader.manifest.get("embedding_model")
+        if embedding_model and source_model and source_model != embedding_model:
+            logger.warning(
+                f"Snapshot gerado com '{source_model}', destino usa '{embedding_model}': "
+                f"as distâncias não serão comparáveis"
+            )
+        if not reader.dim:
+            raise ValueError("Snapshot sem embeddings não pode ser importado no ChromaDB")
+
+        def flush(batch: List[Tuple[int, str, str, Dict[str, Any]]]):
+            ids = [doc_id for _, doc_id, _, _ in batch]
+            existing = set(collection.get(ids=ids, include=[])["ids"])
+            batch = [item for item in batch if item[1] not in existing]
+            stats["skipped"] += len(ids) - len(batch)
+            if not batch:
+                return
+            rows = np.fromiter((row for row, _, _, _ in batch), dtype=np.int64, count=len(batch))
+            collection.add(
+                ids=[doc_id for _, doc_id, _, _ in batch],
+                embeddings=reader.embeddings[rows].astype(np.float32).tolist(),
+                documents=[text for _, _, text, _ in batch],
+                metadatas=[metadata for _, _, _, metadata in batch]
+            )
+            stats["imported"] += len(batch)
+
+        batch = []
+        for row, (doc_id, text, metadata) in enumerate(reader.records()):
+            if wanted is not None and metadata.get("session_id") not in wanted:
+                continue
+            batch.append((row, doc_id, text, metadata))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+    stats["duration_seconds"] = time.time() - start
+    logger.info(
+        f"Snapshot importado: {stats['imported']} registros ({stats['skipped']} já existentes) "
+        f"em {stats['duration_seconds']:.2f}s"
+    )
+    return stats
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Armazenamento estruturado de fatos do usuário
+
+Extrai fatos estáveis (nome, profissão, cidade, idade, familiares) das
+mensagens do usuário e os guarda em um key-value por usuário no SQLite,
+permitindo responder perguntas de perfil sem busca vetorial.
+"""
+
+import re
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Palavra capitalizada (nomes próprios), incluindo acentuação
+_NAME = r"[A-ZÀ-Ý][\wÀ-ÿ]*"
+# Sequência de nomes próprios ("Belo Horizonte", "Hospital São Lucas", "Porto Alegre")
+_PROPER = rf"{_NAME}(?: (?:de |do |da |dos |das )?{_NAME})*"
+# Trecho em minúsculas até pontuação ("professor de matemática", "engenheira civil")
+_PHRASE = r"[a-zà-ÿ][\wà-ÿ]*(?: [\wà-ÿ]+)*?"
+_END = r"(?=\s+de \d+ anos|\s+e\s|[,.!?;]|$)"
+# Negação na mesma oração anula o fato ("Eu não moro em Curitiba")
+_NEGATION = re.compile(r"(?i)\b(?:não|nunca|jamais)\b")
+_CLAUSE_BREAK = re.compile(r"[,.!?;]|\b(?:mas|porém)\b", re.IGNORECASE)
+
+# Profissões reconhecidas nas frases genéricas ("eu sou ...", "ela é ..."); a
+# primeira palavra do valor precisa estar aqui ("professor de matemática")
+PROFESSIONS = {
+    "administrador", "administradora", "advogado", "advogada", "analista", "arquiteto", "arquiteta",
+    "artista", "assistente", "ator", "atriz", "auxiliar", "bombeiro", "bombeira", "cantor", "cantora",
+    "chef", "cientista", "consultor", "consultora", "contador", "contadora", "coordenador",
+    "coordenadora", "cozinheiro", "cozinheira", "dentista", "designer", "desenvolvedor",
+    "desenvolvedora", "diretor", "diretora", "economista", "eletricista", "empresário", "empresária",
+    "enfermeiro", "enfermeira", "engenheiro", "engenheira", "escritor", "escritora", "estagiário",
+    "estagiária", "estudante", "farmacêutico", "farmacêutica", "fisioterapeuta", "fotógrafo",
+    "fotógrafa", "gerente", "jornalista", "mecânico", "mecânica", "médico", "médica", "motorista",
+    "músico", "musicista", "nutricionista", "pedreiro", "pesquisador", "pesquisadora", "piloto",
+    "policial", "professor", "professora", "programador", "programadora", "psicólogo", "psicóloga",
+    "recepcionista", "secretário", "secretária", "supervisor", "supervisora", "técnico", "técnica",
+    "tradutor", "tradutora", "vendedor", "vendedora", "veterinário", "veterinária",
+}
+
+# Palavras capitalizadas que seguem "sou" sem ser nomes ("Sou Brasileiro")
+NOT_NAMES = PROFESSIONS | {
+    "brasileiro", "brasileira", "português", "portuguesa", "argentino", "argentina", "americano",
+    "americana", "casado", "casada", "solteiro", "solteira", "divorciado", "divorciada", "feliz",
+    "novo", "nova", "aposentado", "aposentada", "eu", "muito", "bem",
+}
+
+
+def _is_profession(value: str) -> bool:
+    return value.split()[0].lower() in PROFESSIONS
+
+
+def _is_negated(text: str, match: "re.Match") -> bool:
+    """Há negação entre o início da oração e o valor capturado"""
+    clause_start = 0
+    for brk in _CLAUSE_BREAK.finditer(text, 0, match.start()):
+        clause_start = brk.end()
+    return bool(_NEGATION.search(text, clause_start, match.start(1)))
+
+
+def _is_name(value: str) -> bool:
+    return value.lower() not in NOT_NAMES
+
+
+# (chave do fato, regex, validação do valor); o primeiro grupo captura o valor.
+# Frases explícitas ("meu nome é", "minha profissão é") não precisam de validação;
+# as genéricas ("sou ...") só valem com um valor reconhecível.
+FACT_PATTERNS: List[Tuple[str, "re.Pattern", Optional[Callable[[str], bool]]]] = [
+    ("nome", re.compile(rf"(?i:\bmeu nome é) ({_NAME})"), None),
+    ("nome", re.compile(rf"(?i:\bme chamo) ({_NAME})"), None),
+    ("nome", re.compile(rf"(?:^|[.!?]\s+|(?i:olá|oi),?\s+)(?i:(?:eu )?sou) (?:(?i:o|a) )?({_NAME})"
+                        rf"(?=\s*(?:[,.!;]|$|\s+e\s|\s+de \d+ anos))"), _is_name),
+    ("profissao", re.compile(rf"(?i:\bsou) (?:(?i:o|a) )?{_NAME}, (?:(?i:um|uma) )?({_PHRASE}){_END}"),
+     _is_profession),
+    ("profissao", re.compile(rf"(?i:\beu sou) (?:um |uma )?(?!(?:o|a|de|do|da|em) )({_PHRASE}){_END}"),
+     _is_profession),
+    ("profissao", re.compile(rf"(?i:\btrabalho como) (?:(?i:um|uma) )?({_PHRASE}){_END}"), _is_profession),
+    ("profissao", re.compile(rf"(?i:\bminha profiss[ãa]o é) ({_PHRASE}){_END}"), None),
+    ("idade", re.compile(r"(?i)\b(?:tenho|de|idade é) (\d{1,3}) anos\b"), None),
+    ("cidade", re.compile(rf"(?i:\bmoro em) ({_PROPER})"), None),
+    ("filhos", re.compile(r"(?i)\btenho (\d+|um|uma|dois|duas|três|quatro|cinco) filh[oa]s?\b"), None),
+    ("esposa_nome", re.compile(rf"(?i:\bminha esposa se chama) ({_NAME})"), None),
+    ("esposa_profissao", re.compile(rf"(?i:\bminha esposa\b[^.!?]*?\bela é) (?:(?i:um|uma) )?({_PHRASE}){_END}"),
+     _is_profession),
+    ("marido_nome", re.compile(rf"(?i:\bmeu marido se chama) ({_NAME})"), None),
+    ("marido_profissao", re.compile(rf"(?i:\bmeu marido\b[^.!?]*?\bele é) (?:(?i:um|uma) )?({_PHRASE}){_END}"),
+     _is_profession),
+    ("empresa", re.compile(rf"(?i:\bminha empresa se chama) ({_PROPER})"), None),
+    ("empresa", re.compile(rf"(?i:\btrabalho na empresa) ({_PROPER})"), None),
+    ("local_trabalho", re.compile(rf"(?i:\btrabalho (?:no|na|em)) ({_PROPER})"), None),
+    ("tecnologias", re.compile(r"(?i)\btrabalho com ([^.!?]+)"), None),
+    ("gostos", re.compile(rf"(?i:\bgosto de) ({_PHRASE}){_END}"), None),
+]
+
+# Perguntas de perfil -> chaves que as respondem (ordem importa: mais específicas primeiro)
+QUESTION_PATTERNS: List[Tuple["re.Pattern", List[str]]] = [
+    (re.compile(r"(?i)profiss[ãa]o da minha esposa"), ["esposa_profissao"]),
+    (re.compile(r"(?i)profiss[ãa]o do meu marido"), ["marido_profissao"]),
+    (re.compile(r"(?i)nome da minha esposa|como se chama minha esposa"), ["esposa_nome"]),
+    (re.compile(r"(?i)nome do meu marido|como se chama meu marido"), ["marido_nome"]),
+    (re.compile(r"(?i)nome da minha empresa"), ["empresa"]),
+    (re.compile(r"(?i)qual (?:é )?(?:o )?meu nome|como (?:eu )?me chamo|quem sou eu"), ["nome"]),
+    (re.compile(r"(?i)minha idade|quantos anos eu tenho"), ["idade"]),
+    (re.compile(r"(?i)onde (?:eu )?moro|em que cidade (?:eu )?moro"), ["cidade"]),
+    (re.compile(r"(?i)quantos filhos"), ["filhos"]),
+    (re.compile(r"(?i)onde (?:eu )?trabalho"), ["local_trabalho", "empresa"]),
+    (re.compile(r"(?i)minha profiss[ãa]o|com o que (?:eu )?trabalho"), ["profissao"]),
+    (re.compile(r"(?i)resumo (?:completo )?sobre mim|o que (?:você )?sabe sobre mim"), ["*"]),
+]
+
+FACT_LABELS = {
+    "nome": "Nome",
+    "profissao": "Profissão",
+    "idade": "Idade",
+    "cidade": "Cidade",
+    "filhos": "Filhos",
+    "esposa_nome": "Nome da esposa",
+    "esposa_profissao": "Profissão da esposa",
+    "marido_nome": "Nome do marido",
+    "marido_profissao": "Profissão do marido",
+    "empresa": "Empresa",
+    "local_trabalho": "Local de trabalho",
+    "tecnologias": "Tecnologias",
+    "gostos": "Gosta de",
+}
+
+
+class FactExtractor:
+    """Extrator de fatos estáveis baseado em padrões (sem chamadas ao LLM)"""
+
+    def extract(self, text: str) -> Dict[str, str]:
+        """
+        Extrai fatos de uma mensagem do usuário
+
+        Args:
+            text: Mensagem do usuário
+
+        Returns:
+            Dicionário chave -> valor com os fatos encontrados
+        """
+        facts: Dict[str, str] = {}
+        if not text or not text.strip():
+            return facts
+
+        # Perguntas não introduzem fatos ("Qual é o meu nome?")
+        if text.strip().endswith("?") and not re.search(r"[.!]", text):
+            return facts
+
+        for key, pattern, is_valid in FACT_PATTERNS:
+            if key in facts:
+                continue
+            for match in pattern.finditer(text):
+                if _is_negated(text, match):
+                    continue
+                value = match.group(1).strip(" ,.;")
+                if value and (is_valid is None or is_valid(value)):
+                    facts[key] = value
+                    break
+
+        return facts
+
+    def match_question(self, query: str) -> Optional[List[str]]:
+        """
+        Identifica se a query é uma pergunta de perfil
+
+        Returns:
+            Lista de chaves que respondem a pergunta, ["*"] para o perfil
+            completo, ou None se não for uma pergunta de perfil
+        """
+        for pattern, keys in QUESTION_PATTERNS:
+            if pattern.search(query):
+                return keys
+        return None
+
+
+class UserFactStore:
+    """Key-value de fatos por usuário persistido em SQLite"""
+
+    def __init__(self, db_path: str = "data/user_facts.db", logger: Optional[logging.Logger] = None):
+        """
+        Inicializa o armazenamento de fatos
+
+        Args:
+            db_path: Caminho do banco SQLite (":memory:" para uso em memória)
+            logger: Logger opcional
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_facts (
+                user_id TEXT NOT NULL,
+                fact_key TEXT NOT NULL,
+                fact_value TEXT NOT NULL,
+                source_session TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (user_id, fact_key)
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.commit()
+
+        # Cache write-through por usuário: leituras O(1) após o primeiro acesso
+        self._cache: Dict[str, Dict[str, str]] = {}
+
+    def get_facts(self, user_id: str) -> Dict[str, str]:
+        """Retorna todos os fatos conhecidos do usuário"""
+        with self._lock:
+            facts = self._cache.get(user_id)
+            if facts is None:
+                rows = self._conn.execute(
+                    "SELECT fact_key, fact_value FROM user_facts WHERE user_id = ?",
+                    (user_id,)
+                ).fetchall()
+                facts = dict(rows)
+                self._cache[user_id] = facts
+            return dict(facts)
+
+    def get(self, user_id: str, key: str) -> Optional[str]:
+        """Retorna um fato específico do usuário"""
+        return self.get_facts(user_id).get(key)
+
+    def upsert(self, user_id: str, facts: Dict[str, str], session_id: Optional[str] = None) -> int:
+        """
+        Insere ou atualiza fatos do usuário
+
+        Returns:
+            Número de fatos novos ou alterados
+        """
+        if not facts:
+            return 0
+
+        current = self.get_facts(user_id)
+        changed = {k: v for k, v in facts.items() if current.get(k) != v}
+        if not changed:
+            return 0
+
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT INTO user_facts (user_id, fact_key, fact_value, source_session, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, fact_key) DO UPDATE SET
+                    fact_value = excluded.fact_value,
+                    source_session = excluded.source_session,
+                    updated_at = excluded.updated_at
+                """,
+                [(user_id, k, v, session_id, timestamp) for k, v in changed.items()]
+            )
+            self._conn.commit()
+            self._cache.setdefault(user_id, {}).update(changed)
+
+        self.logger.info(f"Fatos atualizados para usuário {user_id}: {', '.join(changed)}")
+        return len(changed)
+
+    def delete_user(self, user_id: str):
+        """Remove todos os fatos do usuário"""
+        with self._lock:
+            self._conn.execute("DELETE FROM user_facts WHERE user_id = ?", (user_id,))
+            self._conn.commit()
+            self._cache.pop(user_id, None)
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()
+
+
+def memory_source(profile_context: str, memory_context: str) -> str:
+    """Origem do contexto usado na resposta: profile, vector, profile+vector ou none"""
+    sources = [name for name, context in (("profile", profile_context), ("vector", memory_context)) if context]
+    return "+".join(sources) or "none"
+
+
+def format_profile_context(facts: Dict[str, str]) -> str:
+    """Formata os fatos como um contexto curto para o prompt"""
+    if not facts:
+        return ""
+    lines = [f"- {FACT_LABELS.get(k, k)}: {v}" for k, v in facts.items()]
+    return "\n\n=== PERFIL DO USUÁRIO ===\n" + "\n".join(lines) + "\n=== FIM DO PERFIL ===\n"
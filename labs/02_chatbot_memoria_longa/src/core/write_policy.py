@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Política de escrita da memória de longo prazo
+
+Decide, antes de qualquer chamada de embedding, se uma mensagem deve ser
+descartada, armazenada resumida ou armazenada completa, usando apenas
+heurísticas locais (importância, novidade por SimHash, tamanho e fatos
+extraídos).
+"""
+
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, Optional
+
+from src.core.memory_dedup import simhash, hamming_distance
+from src.core.memory_message import MemoryMessage
+from src.core.memory_scoring import estimate_importance
+from src.core.user_facts import FactExtractor
+
+SKIP = "skip"
+SUMMARY = "summary"
+FULL = "full"
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class WritePolicyConfig:
+    """Limiares da política de escrita"""
+    enabled: bool = True
+    skip_below: float = 0.25  # Score abaixo do qual a mensagem é descartada
+    trivial_importance: float = 0.05  # Importância de turnos triviais (saudações, testes)
+    novelty_weight: float = 0.3  # Peso da novidade no score (o restante é a importância)
+    novelty_window: int = 50  # Mensagens recentes da sessão usadas na novidade
+    summary_min_tokens: int = 150  # Respostas maiores que isso são resumidas
+    summary_max_chars: int = 280  # Tamanho máximo do resumo extrativo
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "WritePolicyConfig":
+        """Cria a política a partir do dicionário de configurações"""
+        return cls(
+            enabled=config.get("write_policy_enabled", cls.enabled),
+            skip_below=config.get("write_skip_below", cls.skip_below),
+            summary_min_tokens=config.get("write_summary_min_tokens", cls.summary_min_tokens),
+            summary_max_chars=config.get("write_summary_max_chars", cls.summary_max_chars),
+        )
+
+
+@dataclass
+class WriteDecision:
+    """Resultado da avaliação de uma mensagem"""
+    action: str  # SKIP, SUMMARY ou FULL
+    reason: str
+    score: float
+    message: Optional[MemoryMessage] = None  # Mensagem a armazenar (resumida, se for o caso)
+
+
+@dataclass
+class WritePolicyStats:
+    """Contadores de escritas e tokens de embedding evitados"""
+    evaluated: int = 0
+    stored_full: int = 0
+    stored_summary: int = 0
+    skipped: int = 0
+    embedding_tokens_total: int = 0
+    embedding_tokens_avoided: int = 0
+
+    @property
+    def writes_avoided_rate(self) -> float:
+        """Percentual de mensagens que não geraram escrita"""
+        return (self.skipped / self.evaluated * 100) if self.evaluated else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte as estatísticas para dicionário"""
+        data = asdict(self)
+        data["writes_avoided_rate"] = self.writes_avoided_rate
+        return data
+
+
+def summarize_extractive(content: str, max_chars: int) -> str:
+    """Mantém as primeiras frases da mensagem até max_chars"""
+    summary = ""
+    for sentence in _SENTENCE_RE.split(content.strip()):
+        if summary and len(summary) + len(sentence) + 1 > max_chars:
+            break
+        summary = f"{summary} {sentence}".strip()
+    if len(summary) > max_chars:
+        summary = summary[:max_chars].rsplit(" ", 1)[0]
+    return summary if len(summary) >= len(content) else f"{summary} …"
+
+
+class WritePolicy:
+    """Avalia cada mensagem antes de embedar e acumula as estatísticas"""
+
+    def __init__(self, config: Optional[WritePolicyConfig] = None,
+                 fact_extractor: Optional[FactExtractor] = None):
+        self.config = config or WritePolicyConfig()
+        self.fact_extractor = fact_extractor or FactExtractor()
+        self.stats = WritePolicyStats()
+        self._recent: Dict[str, Deque[int]] = {}
+        self._lock = threading.Lock()
+
+    def _novelty(self, session_id: str, value: int) -> float:
+        """Novidade em relação às mensagens recentes da sessão (0 = repetida, 1 = nova)"""
+        recent = self._recent.setdefault(session_id, deque(maxlen=self.config.novelty_window))
+        # Textos sem relação diferem em ~32 dos 64 bits
+        distance = min((hamming_distance(value, h) for h in recent), default=32)
+        recent.append(value)
+        return min(distance / 32.0, 1.0)
+
+    def evaluate(self, session_id: str, message: MemoryMessage) -> WriteDecision:
+        """
+        Decide como armazenar a mensagem
+
+        Args:
+            session_id: ID da sessão
+            message: Mensagem candidata
+
+        Returns:
+            Decisão com a mensagem a armazenar (None quando descartada)
+        """
+        if not self.config.enabled:
+            return self._record(WriteDecision(FULL, "política desativada", 1.0, message), message)
+
+        importance = estimate_importance(message.content, message.message_type)
+        with self._lock:
+            novelty = self._novelty(session_id, simhash(message.content))
+
+        if message.role == "user" and self.fact_extractor.extract(message.content):
+            return self._record(WriteDecision(FULL, "fato do usuário", 1.0, message), message)
+
+        if importance <= self.config.trivial_importance:
+            return self._record(WriteDecision(SKIP, "turno trivial", importance), message)
+
+        score = (1 - self.config.novelty_weight) * importance + self.config.novelty_weight * novelty
+        if score < self.config.skip_below:
+            return self._record(WriteDecision(SKIP, "pouco informativa ou repetida", score), message)
+
+        if message.role == "assistant" and message.token_count > self.config.summary_min_tokens:
+            summary = MemoryMessage(
+                summarize_extractive(message.content, self.config.summary_max_chars),
+                message.role,
+                timestamp=message.timestamp
+            )
+            return self._record(WriteDecision(SUMMARY, "resposta longa", score, summary), message)
+
+        return self._record(WriteDecision(FULL, "informativa", score, message), message)
+
+    def _record(self, decision: WriteDecision, original: MemoryMessage) -> WriteDecision:
+        """Atualiza os contadores com a decisão"""
+        with self._lock:
+            stats = self.stats
+            stats.evaluated += 1
+            stats.embedding_tokens_total += original.token_count
+            if decision.action == SKIP:
+                stats.skipped += 1
+                stats.embedding_tokens_avoided += original.token_count
+            elif decision.action == SUMMARY:
+                stats.stored_summary += 1
+                stats.embedding_tokens_avoided += max(0, original.token_count - decision.message.token_count)
+            else:
+                stats.stored_full += 1
+        return decision
+
+    def forget_session(self, session_id: str):
+        """Descarta o histórico de novidade da sessão"""
+        with self._lock:
+            self._recent.pop(session_id, None)
@@ -29,9 +29,46 @@ def load_config() -> Dict[str, Any]:
         "memory_window": int(os.getenv("MEMORY_WINDOW", "10")),
         "max_summary_tokens": int(os.getenv("MAX_SUMMARY_TOKENS", "2000")),
         "memory_persistence_path": os.getenv("MEMORY_PERSISTENCE_PATH", "data/chroma_db"),
+        "memory_backend": os.getenv("MEMORY_BACKEND", "chroma"),  # chroma, fts5 ou hybrid
+        "memory_fts_path": os.getenv("MEMORY_FTS_PATH", "data/memory_fts.db"),
+        "memory_fts_min_score": float(os.getenv("MEMORY_FTS_MIN_SCORE", "0")),  # Relevância BM25 mínima (0 = sem corte)
+        "memory_fts_bm25_scale": float(os.getenv("MEMORY_FTS_BM25_SCALE", "5.0")),
         "memory_search_k": int(os.getenv("MEMORY_SEARCH_K", "3")),
+        "memory_candidate_k": int(os.getenv("MEMORY_CANDIDATE_K", "20")),
+        "memory_token_budget": int(os.getenv("MEMORY_TOKEN_BUDGET", "400")),
+        "memory_half_life_hours": float(os.getenv("MEMORY_HALF_LIFE_HOURS", "72")),
+        "memory_max_distance": float(os.getenv("MEMORY_MAX_DISTANCE", "2.5")),
+        "memory_dedup_max_hamming": int(os.getenv("MEMORY_DEDUP_MAX_HAMMING", "3")),
+        "write_policy_enabled": os.getenv("WRITE_POLICY_ENABLED", "true").lower() == "true",
+        "write_skip_below": float(os.getenv("WRITE_SKIP_BELOW", "0.25")),
+        "write_summary_min_tokens": int(os.getenv("WRITE_SUMMARY_MIN_TOKENS", "150")),
+        "write_summary_max_chars": int(os.getenv("WRITE_SUMMARY_MAX_CHARS", "280")),
         "memory_chunk_size": int(os.getenv("MEMORY_CHUNK_SIZE", "1000")),
         "memory_chunk_overlap": int(os.getenv("MEMORY_CHUNK_OVERLAP", "200")),
+        "user_facts_db_path": os.getenv("USER_FACTS_DB_PATH", "data/user_facts.db"),
+        "conversation_log_path": os.getenv("CONVERSATION_LOG_PATH", "data/conversation_log.db"),
+        "conversation_log_batch_size": int(os.getenv("CONVERSATION_LOG_BATCH_SIZE", "32")),
+        "conversation_log_flush_interval": float(os.getenv("CONVERSATION_LOG_FLUSH_INTERVAL", "1.0")),
+        
+        # Configurações de compactação da memória de longo prazo
+        "compaction_min_age_hours": float(os.getenv("COMPACTION_MIN_AGE_HOURS", "24")),
+        "compaction_min_session_messages": int(os.getenv("COMPACTION_MIN_SESSION_MESSAGES", "20")),
+        "compaction_keep_recent": int(os.getenv("COMPACTION_KEEP_RECENT", "10")),
+        "compaction_cluster_size": int(os.getenv("COMPACTION_CLUSTER_SIZE", "10")),
+        "compaction_drop_importance": float(os.getenv("COMPACTION_DROP_IMPORTANCE", "0.2")),
+        "compaction_fact_importance": float(os.getenv("COMPACTION_FACT_IMPORTANCE", "0.8")),
+        "compaction_use_llm": os.getenv("COMPACTION_USE_LLM", "true").lower() == "true",
+        "compaction_interval_seconds": float(os.getenv("COMPACTION_INTERVAL_SECONDS", "0")),
+        
+        # Servidor assíncrono (scripts/serve.py)
+        "server_host": os.getenv("SERVER_HOST", "127.0.0.1"),
+        "server_port": int(os.getenv("SERVER_PORT", "8080")),
+        "server_max_concurrency": int(os.getenv("SERVER_MAX_CONCURRENCY", "64")),
+        
+        # Cassete de gravação/reprodução do LLM e dos embeddings (off, record ou replay)
+        "cassette_mode": os.getenv("CASSETTE_MODE", "off").lower(),
+        "cassette_path": os.getenv("CASSETTE_PATH", "cassettes/chatbot_memoria.jsonl.gz"),
+        "cassette_latency_scale": float(os.getenv("CASSETTE_LATENCY_SCALE", "0")),
         
         # Configurações de teste
         "test_queries_file": "input/inputs.txt",
@@ -45,8 +82,8 @@ def load_config() -> Dict[str, Any]:
         "test_mode": os.getenv("TEST_MODE", "false").lower() == "true"
     }
     
-    # Se estiver em modo de teste, não requer API key
-    if not config["test_mode"] and not config["openai_api_key"]:
+    # Em modo de teste ou no replay do cassete, não requer API key
+    if not config["test_mode"] and config["cassette_mode"] != "replay" and not config["openai_api_key"]:
         raise ValueError("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
     
     return config 
\ No newline at end of file
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga sintética para o chatbot com memória de longo prazo
+
+Sintetiza usuários com perfis (nome, profissão, cidade, idade, família,
+empresa, interesses) e conversas com turnos de apresentação de fatos,
+perguntas de recordação e conversa livre. Tudo é derivado de uma seed:
+o mesmo (seed, índice do usuário) sempre gera o mesmo usuário e a mesma
+conversa, então é possível gerar milhões de mensagens sem guardá-las.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+FIRST_NAMES = [
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+    "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago", "Vanessa", "Wagner",
+]
+PROFESSIONS = [
+    "professor de matemática", "engenheira civil", "desenvolvedor de software", "médica cardiologista",
+    "arquiteto", "advogada", "enfermeiro", "designer gráfico", "analista de dados", "jornalista",
+    "dentista", "engenheiro elétrico", "contadora", "farmacêutico", "veterinária", "chef de cozinha",
+]
+CITIES = [
+    "Belo Horizonte", "São Paulo", "Porto Alegre", "Curitiba", "Recife", "Salvador", "Fortaleza",
+    "Florianópolis", "Manaus", "Goiânia", "Campinas", "Vitória", "Natal", "Belém",
+]
+COMPANIES = ["ElectroTech", "DataVale", "Construtora Horizonte", "Clínica Vida", "SoftNorte", "AgroSul"]
+HOBBIES = ["correr", "ler romances", "cozinhar", "jogar xadrez", "pedalar", "tocar violão", "viajar"]
+TOPICS = [
+    "organizar minha rotina", "aprender inglês", "investir melhor", "melhorar meu sono",
+    "planejar as férias", "estudar para uma certificação", "montar um projeto pessoal",
+]
+
+# Tipos de turno
+FACT = "fact"  # Apresenta um fato do usuário
+RECALL = "recall"  # Pergunta de perfil (respondida pelo key-value de fatos)
+RECALL_OPEN = "recall_open"  # Recordação aberta (depende da busca vetorial)
+FILLER = "filler"  # Conversa livre
+
+
+@dataclass
+class SyntheticUser:
+    """Perfil de um usuário sintético"""
+    index: int
+    name: str
+    profession: str
+    city: str
+    age: int
+    children: int
+    company: str
+    hobby: str
+    topic: str
+
+    @property
+    def user_id(self) -> str:
+        return f"user_{self.index:07d}"
+
+    @property
+    def session_id(self) -> str:
+        return f"load_{self.index:07d}"
+
+
+@dataclass
+class SyntheticTurn:
+    """Um turno da conversa sintética"""
+    session_id: str
+    user_id: str
+    kind: str  # FACT, RECALL, RECALL_OPEN ou FILLER
+    query: str
+    expected: Optional[str] = None  # Valor esperado na resposta de recordação
+    reply: str = field(default="", repr=False)  # Resposta plausível do assistente (pré-carga)
+
+
+class SyntheticWorkload:
+    """Gera usuários e conversas determinísticos a partir de uma seed"""
+
+    def __init__(self, seed: int = 42, recall_turns: int = 3, filler_turns: int = 2):
+        """
+        Inicializa o gerador
+
+        Args:
+            seed: Seed da geração
+            recall_turns: Perguntas de recordação por conversa
+            filler_turns: Turnos de conversa livre por conversa
+        """
+        self.seed = seed
+        self.recall_turns = recall_turns
+        self.filler_turns = filler_turns
+
+    def _rng(self, index: int) -> random.Random:
+        """Gerador aleatório próprio do usuário (independe da ordem de geração)"""
+        return random.Random(self.seed * 1_000_003 + index)
+
+    def user(self, index: int) -> SyntheticUser:
+        """Usuário sintético de índice index"""
+        rng = self._rng(index)
+        return SyntheticUser(
+            index=index,
+            name=rng.choice(FIRST_NAMES),
+            profession=rng.choice(PROFESSIONS),
+            city=rng.choice(CITIES),
+            age=rng.randint(18, 75),
+            children=rng.randint(0, 4),
+            company=rng.choice(COMPANIES),
+            hobby=rng.choice(HOBBIES),
+            topic=rng.choice(TOPICS),
+        )
+
+    def conversation(self, index: int) -> List[SyntheticTurn]:
+        """
+        Conversa do usuário: fatos (em ordem aleatória), depois recordações
+        intercaladas com conversa livre
+
+        Args:
+            index: Índice do usuário
+
+        Returns:
+            Turnos na ordem em que devem ser enviados
+        """
+        user = self.user(index)
+        rng = self._rng(index)
+        session, uid = user.session_id, user.user_id
+
+        facts = [
+            (f"Meu nome é {user.name} e eu sou {user.profession}.", user.name,
+             f"Prazer, {user.name}! Vou lembrar que você é {user.profession}."),
+            (f"Eu tenho {user.age} anos e moro em {user.city}.", user.city,
+             f"Anotado: {user.age} anos, morando em {user.city}."),
+            (f"Minha empresa se chama {user.company}.", user.company,
+             f"Certo, você trabalha na {user.company}."),
+            (f"Eu gosto de {user.hobby} nos fins de semana.", user.hobby,
+             f"Que legal que você gosta de {user.hobby}!"),
+        ]
+        if user.children:
+            facts.append((f"Tenho {user.children} filhos.", str(user.children),
+                          f"Entendi, você tem {user.children} filhos."))
+        rng.shuffle(facts)
+
+        recalls = [
+            (RECALL, "Qual é minha profissão?", user.profession),
+            (RECALL, "Onde eu moro?", user.city),
+            (RECALL, "Qual é o nome da minha empresa?", user.company),
+            (RECALL, "Quantos anos eu tenho?", str(user.age)),
+            (RECALL_OPEN, "Você lembra do que eu gosto de fazer nos fins de semana?", user.hobby),
+            (RECALL_OPEN, "O que eu te contei sobre o meu trabalho?", user.profession),
+        ]
+        fillers = [
+            f"Você pode me ajudar a {user.topic}?",
+            f"Que dicas você daria para alguém que quer {user.topic}?",
+            "Obrigado pela ajuda de hoje!",
+            f"Pensei mais sobre {user.topic}, por onde eu começo?",
+        ]
+
+        turns = [SyntheticTurn(session, uid, FACT, query, expected, reply) for query, expected, reply in facts]
+        tail = [
+            SyntheticTurn(session, uid, kind, query, expected, f"Pelo que você me contou: {expected}.")
+            for kind, query, expected in rng.sample(recalls, min(self.recall_turns, len(recalls)))
+        ]
+        tail += [
+            SyntheticTurn(session, uid, FILLER, query, reply="Claro! Vamos por partes.")
+            for query in rng.sample(fillers, min(self.filler_turns, len(fillers)))
+        ]
+        rng.shuffle(tail)
+        return turns + tail
+
+    def turns(self, users: int, start: int = 0) -> Iterator[SyntheticTurn]:
+        """Turnos de users usuários consecutivos a partir de start"""
+        for index in range(start, start + users):
+            yield from self.conversation(index)
+
+    def messages(self, start_user: int = 0) -> Iterator[Tuple[str, str, str]]:
+        """
+        Fluxo infinito de mensagens (sessão, papel, conteúdo) para pré-carregar a memória
+
+        Cada turno gera a mensagem do usuário e uma resposta plausível do assistente.
+        """
+        index = start_user
+        while True:
+            for turn in self.conversation(index):
+                yield turn.session_id, "user", turn.query
+                yield turn.session_id, "assistant", turn.reply
+            index += 1
+
+    def describe(self) -> Dict[str, int]:
+        """Parâmetros da geração (para o relatório)"""
+        return {"seed": self.seed, "recall_turns": self.recall_turns, "filler_turns": self.filler_turns}
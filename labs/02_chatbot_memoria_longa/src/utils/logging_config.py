@@ -10,13 +10,26 @@ from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any
 
+from src.utils.log_queue import (
+    BatchingRotatingFileHandler, attach_queue_handlers,
+    LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE
+)
+from src.utils.tracing import RequestContextFilter, ExcludeSpanEvents
+
+# Tipos de evento dos registros estruturados (campo "event" do JSON)
+METRICS_EVENT = "metrics"
+MEMORY_METRICS_EVENT = "memory_metrics"
+
+# Atributos padrão do LogRecord; os demais vieram de extra={...}
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "taskName"}
+
 class JSONFormatter(logging.Formatter):
-    """Formatter para logs em formato JSON"""
+    """Formatter para logs em formato JSON (campos de extra={...} viram campos tipados)"""
     
     def format(self, record: logging.LogRecord) -> str:
         """Formata o log record como JSON"""
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -25,26 +38,28 @@ class JSONFormatter(logging.Formatter):
             "line": record.lineno
         }
         
-        # Adiciona campos extras se existirem
-        if hasattr(record, 'memory_metrics'):
-            log_entry['memory_metrics'] = getattr(record, 'memory_metrics')
-        if hasattr(record, 'session_id'):
-            log_entry['session_id'] = getattr(record, 'session_id')
-        if hasattr(record, 'response_time'):
-            log_entry['response_time'] = getattr(record, 'response_time')
-        if hasattr(record, 'tokens_used'):
-            log_entry['tokens_used'] = getattr(record, 'tokens_used')
-        if hasattr(record, 'confidence'):
-            log_entry['confidence'] = getattr(record, 'confidence')
+        # Adiciona campos extras (event, session_id, response_time, memory_metrics...)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in log_entry:
+                log_entry[key] = value
         
-        return json.dumps(log_entry, ensure_ascii=False)
+        return json.dumps(log_entry, ensure_ascii=False, default=str)
 
-def setup_logging(log_file: str = "logs/app.log") -> logging.Logger:
+def setup_logging(log_file: str = "logs/app.log", max_bytes: int = LOG_MAX_BYTES,
+                  backup_count: int = LOG_BACKUP_COUNT, queue_size: int = LOG_QUEUE_SIZE) -> logging.Logger:
     """
     Configura o sistema de logging
     
+    O logger só enfileira os registros; formatação e escrita (arquivo e
+    console) rodam na thread do QueueListener, em lotes (ver log_queue).
+    Cada registro recebe o request_id e o span_id do contexto (ver tracing);
+    os eventos de span vão só para o arquivo.
+    
     Args:
         log_file: Caminho para o arquivo de log
+        max_bytes: Tamanho máximo do arquivo antes da rotação (0 = sem rotação)
+        backup_count: Arquivos rotacionados mantidos
+        queue_size: Capacidade da fila; com a fila cheia os registros são descartados
         
     Returns:
         Logger configurado
@@ -57,12 +72,8 @@ def setup_logging(log_file: str = "logs/app.log") -> logging.Logger:
     logger = logging.getLogger("chatbot_memory")
     logger.setLevel(logging.INFO)
     
-    # Remove handlers existentes para evitar duplicação
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Handler para arquivo (JSON)
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    # Handler para arquivo (JSON, rotação por tamanho, escrita em lotes)
+    file_handler = BatchingRotatingFileHandler(log_file, max_bytes=max_bytes, backup_count=backup_count)
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(JSONFormatter())
     
@@ -73,10 +84,13 @@ def setup_logging(log_file: str = "logs/app.log") -> logging.Logger:
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     console_handler.setFormatter(console_formatter)
+    console_handler.addFilter(ExcludeSpanEvents())
+    
+    # Fila entre o logger e os handlers (remove handlers existentes para evitar duplicação)
+    queue_handler = attach_queue_handlers(logger, [file_handler, console_handler], queue_size=queue_size)
     
-    # Adiciona handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # request_id/span_id lidos na thread (ou task) da requisição, antes de enfileirar
+    queue_handler.addFilter(RequestContextFilter())
     
     return logger
 
@@ -92,6 +106,7 @@ def log_memory_metrics(logger: logging.Logger, metrics: Dict[str, Any], session_
     logger.info(
         f"Métricas de memória para sessão {session_id}",
         extra={
+            'event': MEMORY_METRICS_EVENT,
             'memory_metrics': metrics,
             'session_id': session_id
         }
@@ -5,18 +5,282 @@ Sistema de métricas para validação da solução de memória de longo prazo
 
 import json
 import time
+import threading
+from collections import deque
 from datetime import datetime
+from dataclasses import dataclass
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 import logging
 
+import numpy as np
+
+# Palavras-chave que indicam continuidade entre queries
+CONTINUITY_KEYWORDS = ["isso", "aquilo", "você disse", "mencionou", "falou"]
+
+# Palavras-chave que indicam personalização
+PERSONALIZATION_KEYWORDS = [
+    "você", "seu", "sua", "você tem", "você é", "você trabalha",
+    "você mora", "você gosta", "você disse", "você mencionou"
+]
+
+@dataclass
+class SessionMetrics:
+    """Métricas agregadas de uma sessão (taxas entre 0 e 1)"""
+    session_id: str
+    total_queries: int
+    total_memory_contexts_used: int
+    memory_retention_rate: float
+    context_coherence_score: float
+    avg_response_time: float
+    avg_tokens_used: float
+    avg_confidence: float
+    summary_generated: bool
+
+
+@dataclass
+class OverallMetrics:
+    """Métricas agregadas de todas as sessões (taxas entre 0 e 1)"""
+    total_sessions: int
+    total_queries: int
+    overall_memory_retention: float
+    overall_context_coherence: float
+    memory_utilization_rate: float
+    avg_response_time: float
+    avg_tokens_used: float
+    avg_confidence: float
+
+
+class MemoryMetricsCollector:
+    """
+    Histórico de queries armazenado por colunas (arrays NumPy)
+    
+    As colunas crescem por duplicação de capacidade (append O(1) amortizado) e
+    as agregações por sessão são feitas com np.bincount sobre o código
+    inteiro de cada sessão, sem laços Python por query.
+    
+    Definições:
+        - retenção: fração das queries após a primeira de cada sessão que usaram memória
+        - utilização: fração de todas as queries que usaram memória
+        - coerência: confiança média das queries bem-sucedidas que usaram memória
+    """
+    
+    COLUMNS = {
+        "session": np.int32,
+        "timestamp": np.float64,
+        "response_time": np.float64,
+        "tokens_used": np.int64,
+        "prompt_tokens": np.int64,
+        "completion_tokens": np.int64,
+        "system_tokens": np.int64,
+        "context_tokens": np.int64,
+        "memory_tokens": np.int64,
+        "user_tokens": np.int64,
+        "overhead_tokens": np.int64,
+        "confidence": np.float64,
+        "memory_context_used": np.bool_,
+        "memory_context_length": np.int64,
+        "summary_available": np.bool_,
+        "success": np.bool_,
+    }
+    
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._capacity = capacity
+        self._data = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self._session_codes: Dict[str, int] = {}
+        self.session_ids: List[str] = []
+        self._cache: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def _session_code(self, session_id: str) -> int:
+        code = self._session_codes.get(session_id)
+        if code is None:
+            code = self._session_codes[session_id] = len(self.session_ids)
+            self.session_ids.append(session_id)
+        return code
+    
+    def _reserve(self, count: int) -> int:
+        """Garante capacidade para mais count linhas e retorna o início"""
+        needed = self._size + count
+        if needed > self._capacity:
+            capacity = max(needed, self._capacity * 2)
+            for name, column in self._data.items():
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._data[name] = grown
+            self._capacity = capacity
+        start = self._size
+        self._size = needed
+        self._cache.clear()
+        return start
+    
+    def record_query(self, query_data: Dict[str, Any]):
+        """Registra uma query (mesmo formato aceito por MemoryMetrics.record_query)"""
+        memory_metrics = query_data.get("memory_metrics", {}) or {}
+        with self._lock:
+            row = self._reserve(1)
+            data = self._data
+            data["session"][row] = self._session_code(query_data.get("session_id", "unknown"))
+            data["timestamp"][row] = query_data.get("timestamp", time.time())
+            data["response_time"][row] = query_data.get("response_time", 0.0)
+            data["tokens_used"][row] = query_data.get("tokens_used", 0)
+            usage = query_data.get("token_usage") or {}
+            data["prompt_tokens"][row] = usage.get("prompt_tokens", 0)
+            data["completion_tokens"][row] = usage.get("completion_tokens", 0)
+            for segment, tokens in (usage.get("segments") or {}).items():
+                column = data.get(f"{segment}_tokens")
+                if column is not None:
+                    column[row] = tokens
+            data["confidence"][row] = query_data.get("confidence", 0.0)
+            data["memory_context_used"][row] = memory_metrics.get("memory_context_used", False)
+            data["memory_context_length"][row] = memory_metrics.get("memory_context_length", 0)
+            data["summary_available"][row] = memory_metrics.get("summary_available", False)
+            data["success"][row] = query_data.get("success", False)
+    
+    def add_columns(self, session_ids: List[str], **columns: np.ndarray):
+        """
+        Adiciona um lote de queries já em formato de colunas
+        
+        Args:
+            session_ids: ID da sessão de cada query
+            **columns: Arrays com os nomes de COLUMNS (exceto "session"); colunas
+                ausentes ficam com zero/False
+        """
+        count = len(session_ids)
+        with self._lock:
+            codes = np.fromiter((self._session_code(s) for s in session_ids), dtype=np.int32, count=count)
+            start = self._reserve(count)
+            self._data["session"][start:start + count] = codes
+            for name, values in columns.items():
+                self._data[name][start:start + count] = values
+    
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Views das colunas preenchidas"""
+        return {name: column[:self._size] for name, column in self._data.items()}
+    
+    def _session_aggregates(self) -> Dict[str, np.ndarray]:
+        """Somas e contagens por sessão via bincount (em cache até o próximo registro)"""
+        if "sessions" in self._cache:
+            return self._cache["sessions"]
+        
+        cols = self.columns()
+        codes = cols["session"]
+        n_sessions = len(self.session_ids)
+        memory_used = cols["memory_context_used"]
+        coherent = memory_used & cols["success"]
+        
+        # Primeira query de cada sessão não conta para a retenção
+        first_rows = np.unique(codes, return_index=True)[1]
+        follow_up = np.ones(codes.size, dtype=bool)
+        follow_up[first_rows] = False
+        
+        aggregates = {
+            "queries": np.bincount(codes, minlength=n_sessions),
+            "memory_used": np.bincount(codes, weights=memory_used, minlength=n_sessions),
+            "follow_up": np.bincount(codes, weights=follow_up, minlength=n_sessions),
+            "follow_up_memory": np.bincount(codes, weights=follow_up & memory_used, minlength=n_sessions),
+            "coherent": np.bincount(codes, weights=coherent, minlength=n_sessions),
+            "coherent_confidence": np.bincount(
+                codes, weights=np.where(coherent, cols["confidence"], 0.0), minlength=n_sessions
+            ),
+            "response_time": np.bincount(codes, weights=cols["response_time"], minlength=n_sessions),
+            "tokens_used": np.bincount(codes, weights=cols["tokens_used"], minlength=n_sessions),
+            "confidence": np.bincount(codes, weights=cols["confidence"], minlength=n_sessions),
+            "summary": np.bincount(codes, weights=cols["summary_available"], minlength=n_sessions),
+        }
+        self._cache["sessions"] = aggregates
+        return aggregates
+    
+    @staticmethod
+    def _ratio(numerator, denominator):
+        """Divisão elemento a elemento com 0 onde o denominador é 0"""
+        numerator = np.asarray(numerator, dtype=np.float64)
+        denominator = np.asarray(denominator, dtype=np.float64)
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+    
+    def calculate_all_session_metrics(self) -> Dict[str, SessionMetrics]:
+        """Métricas de todas as sessões em uma passada vetorizada"""
+        agg = self._session_aggregates()
+        queries = agg["queries"]
+        retention = self._ratio(agg["follow_up_memory"], agg["follow_up"])
+        coherence = self._ratio(agg["coherent_confidence"], agg["coherent"])
+        response_time = self._ratio(agg["response_time"], queries)
+        tokens = self._ratio(agg["tokens_used"], queries)
+        confidence = self._ratio(agg["confidence"], queries)
+        
+        return {
+            session_id: SessionMetrics(
+                session_id=session_id,
+                total_queries=int(queries[i]),
+                total_memory_contexts_used=int(agg["memory_used"][i]),
+                memory_retention_rate=float(retention[i]),
+                context_coherence_score=float(coherence[i]),
+                avg_response_time=float(response_time[i]),
+                avg_tokens_used=float(tokens[i]),
+                avg_confidence=float(confidence[i]),
+                summary_generated=bool(agg["summary"][i])
+            )
+            for i, session_id in enumerate(self.session_ids)
+            if queries[i]
+        }
+    
+    def calculate_session_metrics(self, session_id: str) -> SessionMetrics:
+        """Métricas de uma sessão"""
+        metrics = self._cache.get("all")
+        if metrics is None:
+            metrics = self._cache["all"] = self.calculate_all_session_metrics()
+        return metrics.get(session_id) or SessionMetrics(session_id, 0, 0, 0.0, 0.0, 0.0, 0.0, 0.0, False)
+    
+    def calculate_overall_metrics(self) -> OverallMetrics:
+        """Métricas gerais (vetorizadas)"""
+        if not self._size:
+            return OverallMetrics(0, 0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+        
+        agg = self._session_aggregates()
+        cols = self.columns()
+        return OverallMetrics(
+            total_sessions=int(np.count_nonzero(agg["queries"])),
+            total_queries=self._size,
+            overall_memory_retention=float(self._ratio(agg["follow_up_memory"].sum(), agg["follow_up"].sum())),
+            overall_context_coherence=float(self._ratio(agg["coherent_confidence"].sum(), agg["coherent"].sum())),
+            memory_utilization_rate=float(cols["memory_context_used"].mean()),
+            avg_response_time=float(cols["response_time"].mean()),
+            avg_tokens_used=float(cols["tokens_used"].mean()),
+            avg_confidence=float(cols["confidence"].mean())
+        )
+
+
 class MemoryMetrics:
-    """Sistema de métricas para validação da memória de longo prazo"""
+    """
+    Sistema de métricas para validação da memória de longo prazo
+    
+    As métricas são mantidas como contadores atualizados em record_query, então
+    calcular as métricas é O(1) independentemente do número de queries. Apenas
+    as últimas history_size queries ficam guardadas (amostra para relatórios).
+    Com collect_columns=True o histórico completo também é guardado em colunas
+    (self.collector) para os relatórios detalhados; a memória cresce com o número
+    de queries, então use só em execuções limitadas como a validação.
+    """
     
-    def __init__(self, output_dir: str = "metrics"):
+    def __init__(self, output_dir: str = "metrics", history_size: int = 1000, window_size: int = 100,
+                 collect_columns: bool = False):
+        """
+        Inicializa as métricas
+        
+        Args:
+            output_dir: Diretório dos relatórios
+            history_size: Queries mantidas no buffer circular de amostragem
+            window_size: Tamanho da janela móvel de tempos de resposta
+            collect_columns: Guarda o histórico completo em colunas (MemoryReportGenerator)
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
         
         # Métricas específicas do laboratório
         self.lab_metrics = {
@@ -28,7 +292,7 @@ class MemoryMetrics:
             "personalization_score": 0.0,  # Score de personalização
         }
         
-        # Métricas de performance
+        # Métricas de performance ("response_time" guarda apenas a janela móvel)
         self.performance_metrics = {
             "response_time": [],
             "memory_retrieval_time": [],
@@ -44,11 +308,34 @@ class MemoryMetrics:
             "user_satisfaction": 0.0,
         }
         
-        # Histórico de queries para análise
-        self.query_history = []
+        # Buffer circular de queries (apenas para amostragem nos relatórios)
+        self.query_history = deque(maxlen=history_size)
+        self._response_window = deque(maxlen=window_size)
+        
+        # Contadores incrementais
+        self._total_queries = 0
+        self._successful_queries = 0
+        self._memory_used_count = 0
+        self._cross_session_count = 0
+        self._coherent_pairs = 0
+        self._relevant_count = 0
+        self._personalized_count = 0
+        self._response_time_sum = 0.0
+        self._response_time_min = float('inf')
+        self._response_time_max = 0.0
+        self._previous_response_words: Optional[List[str]] = None
+        self._sessions: Dict[str, Dict[str, int]] = {}
+        
+        # Histórico completo em colunas para os relatórios detalhados (opcional, sem limite)
+        self.collector = MemoryMetricsCollector() if collect_columns else None
+        self._query_patterns = {
+            "information_queries": 0,  # Queries que pedem informações
+            "memory_test_queries": 0,  # Queries que testam memória
+            "conversation_queries": 0,  # Queries conversacionais
+        }
         
     def record_query(self, query_data: Dict[str, Any]):
-        """Registra dados de uma query para análise"""
+        """Registra dados de uma query e atualiza os contadores (O(1))"""
         timestamp = datetime.now().isoformat()
         
         query_record = {
@@ -62,138 +349,120 @@ class MemoryMetrics:
             "success": query_data.get("success", False),
         }
         
-        self.query_history.append(query_record)
-        
-        # Atualiza métricas de performance
-        if query_data.get("success", False):
-            self.performance_metrics["response_time"].append(query_data.get("response_time", 0.0))
-    
-    def calculate_lab_metrics(self) -> Dict[str, float]:
-        """Calcula métricas específicas do laboratório"""
-        
-        if not self.query_history:
-            return self.lab_metrics
-        
-        total_queries = len(self.query_history)
-        successful_queries = [q for q in self.query_history if q["success"]]
-        
-        if not successful_queries:
-            return self.lab_metrics
+        query_text = query_record["query"].lower()
+        response_text = query_record["response"].lower()
         
-        # 1. Taxa de uso de memória
-        memory_used_count = sum(1 for q in successful_queries if q["memory_used"])
-        self.lab_metrics["memory_usage_rate"] = (memory_used_count / len(successful_queries)) * 100
+        if self.collector is not None:
+            self.collector.record_query(query_data)
         
-        # 2. Retenção de contexto (queries que usam memória de sessões anteriores)
-        cross_session_count = 0
-        session_memory_map = {}
-        
-        for query in successful_queries:
-            session_id = query["session_id"]
-            if session_id not in session_memory_map:
-                session_memory_map[session_id] = []
+        with self._lock:
+            self.query_history.append(query_record)
+            self._total_queries += 1
             
-            if query["memory_used"] and len(session_memory_map[session_id]) > 0:
-                cross_session_count += 1
+            session = self._sessions.setdefault(
+                query_record["session_id"],
+                {"total_queries": 0, "memory_used_count": 0, "successful_queries": 0, "response_time_sum": 0.0}
+            )
+            session["total_queries"] += 1
+            if query_record["memory_used"]:
+                session["memory_used_count"] += 1
             
-            session_memory_map[session_id].append(query)
-        
-        self.lab_metrics["cross_session_memory"] = (cross_session_count / len(successful_queries)) * 100
-        
-        # 3. Coerência da conversa (análise de continuidade)
-        coherence_score = self._calculate_conversation_coherence(successful_queries)
-        self.lab_metrics["conversation_coherence"] = coherence_score
-        
-        # 4. Relevância das respostas (análise de conteúdo)
-        relevance_score = self._calculate_response_relevance(successful_queries)
-        self.lab_metrics["response_relevance"] = relevance_score
-        
-        # 5. Personalização (uso de informações específicas do usuário)
-        personalization_score = self._calculate_personalization_score(successful_queries)
-        self.lab_metrics["personalization_score"] = personalization_score
-        
-        # 6. Retenção de contexto geral
-        self.lab_metrics["context_retention"] = (
-            self.lab_metrics["memory_usage_rate"] * 0.4 +
-            self.lab_metrics["cross_session_memory"] * 0.3 +
-            self.lab_metrics["conversation_coherence"] * 0.3
-        )
-        
-        return self.lab_metrics
-    
-    def _calculate_conversation_coherence(self, queries: List[Dict[str, Any]]) -> float:
-        """Calcula a coerência da conversa baseada em continuidade temática"""
-        if len(queries) < 2:
-            return 0.0
-        
-        coherence_count = 0
-        total_pairs = len(queries) - 1
-        
-        for i in range(len(queries) - 1):
-            current_query = queries[i]["query"].lower()
-            next_query = queries[i + 1]["query"].lower()
-            current_response = queries[i]["response"].lower()
+            self._query_patterns[self._classify_query(query_text)] += 1
             
-            # Verifica se a próxima query referencia a resposta anterior
-            if any(word in next_query for word in current_response.split()[:10]):
-                coherence_count += 1
-            # Verifica se há palavras-chave de continuidade
-            elif any(word in next_query for word in ["isso", "aquilo", "você disse", "mencionou", "falou"]):
-                coherence_count += 1
-        
-        return (coherence_count / total_pairs) * 100
-    
-    def _calculate_response_relevance(self, queries: List[Dict[str, Any]]) -> float:
-        """Calcula a relevância das respostas baseada em palavras-chave"""
-        relevant_count = 0
-        
-        for query in queries:
-            query_text = query["query"].lower()
-            response_text = query["response"].lower()
+            if not query_record["success"]:
+                return
             
-            # Extrai palavras-chave da query
-            query_words = set(query_text.split())
+            self._successful_queries += 1
+            if query_record["memory_used"]:
+                self._memory_used_count += 1
+                # Memória usada numa sessão que já tinha queries anteriores
+                if session["successful_queries"] > 0:
+                    self._cross_session_count += 1
+            session["successful_queries"] += 1
             
-            # Verifica se a resposta contém palavras da query
-            if any(word in response_text for word in query_words if len(word) > 3):
-                relevant_count += 1
-        
-        return (relevant_count / len(queries)) * 100 if queries else 0.0
+            # Coerência: a query atual referencia a resposta anterior?
+            if self._previous_response_words is not None:
+                if any(word in query_text for word in self._previous_response_words):
+                    self._coherent_pairs += 1
+                elif any(word in query_text for word in CONTINUITY_KEYWORDS):
+                    self._coherent_pairs += 1
+            self._previous_response_words = response_text.split()[:10]
+            
+            # Relevância: a resposta contém palavras da query
+            if any(word in response_text for word in set(query_text.split()) if len(word) > 3):
+                self._relevant_count += 1
+            
+            # Personalização: a resposta usa linguagem personalizada
+            if any(keyword in response_text for keyword in PERSONALIZATION_KEYWORDS):
+                self._personalized_count += 1
+            
+            response_time = query_record["response_time"]
+            session["response_time_sum"] += response_time
+            self._response_time_sum += response_time
+            self._response_time_min = min(self._response_time_min, response_time)
+            self._response_time_max = max(self._response_time_max, response_time)
+            self._response_window.append(response_time)
+    
+    @staticmethod
+    def _classify_query(query_text: str) -> str:
+        """Classifica a query em um dos padrões conhecidos"""
+        if any(word in query_text for word in ["qual", "onde", "quando", "quem", "como"]):
+            return "information_queries"
+        if any(word in query_text for word in ["lembra", "lembro", "você disse", "mencionou"]):
+            return "memory_test_queries"
+        return "conversation_queries"
     
-    def _calculate_personalization_score(self, queries: List[Dict[str, Any]]) -> float:
-        """Calcula o score de personalização baseado no uso de informações específicas"""
-        personalization_count = 0
-        
-        # Palavras-chave que indicam personalização
-        personalization_keywords = [
-            "você", "seu", "sua", "você tem", "você é", "você trabalha",
-            "você mora", "você gosta", "você disse", "você mencionou"
-        ]
-        
-        for query in queries:
-            response_text = query["response"].lower()
+    def calculate_lab_metrics(self) -> Dict[str, float]:
+        """Calcula métricas específicas do laboratório a partir dos contadores (O(1))"""
+        with self._lock:
+            successful = self._successful_queries
+            if not successful:
+                return self.lab_metrics
             
-            # Verifica se a resposta usa linguagem personalizada
-            if any(keyword in response_text for keyword in personalization_keywords):
-                personalization_count += 1
-        
-        return (personalization_count / len(queries)) * 100 if queries else 0.0
+            # 1. Taxa de uso de memória
+            self.lab_metrics["memory_usage_rate"] = (self._memory_used_count / successful) * 100
+            
+            # 2. Retenção de contexto (queries que usam memória de sessões anteriores)
+            self.lab_metrics["cross_session_memory"] = (self._cross_session_count / successful) * 100
+            
+            # 3. Coerência da conversa (análise de continuidade entre queries consecutivas)
+            self.lab_metrics["conversation_coherence"] = (
+                (self._coherent_pairs / (successful - 1)) * 100 if successful > 1 else 0.0
+            )
+            
+            # 4. Relevância das respostas (análise de conteúdo)
+            self.lab_metrics["response_relevance"] = (self._relevant_count / successful) * 100
+            
+            # 5. Personalização (uso de informações específicas do usuário)
+            self.lab_metrics["personalization_score"] = (self._personalized_count / successful) * 100
+            
+            # 6. Retenção de contexto geral
+            self.lab_metrics["context_retention"] = (
+                self.lab_metrics["memory_usage_rate"] * 0.4 +
+                self.lab_metrics["cross_session_memory"] * 0.3 +
+                self.lab_metrics["conversation_coherence"] * 0.3
+            )
+            
+            return self.lab_metrics
     
     def calculate_performance_metrics(self) -> Dict[str, float]:
-        """Calcula métricas de performance"""
-        if not self.performance_metrics["response_time"]:
+        """Calcula métricas de performance a partir dos contadores (O(1))"""
+        with self._lock:
+            count = self._successful_queries
+            if not count:
+                return self.performance_metrics
+            
+            window = list(self._response_window)
+            self.performance_metrics.update({
+                "response_time": window,
+                "avg_response_time": self._response_time_sum / count,
+                "min_response_time": self._response_time_min,
+                "max_response_time": self._response_time_max,
+                "recent_avg_response_time": sum(window) / len(window),
+                "throughput": count / (self._response_time_sum / 60) if self._response_time_sum > 0 else 0
+            })
+            
             return self.performance_metrics
-        
-        response_times = self.performance_metrics["response_time"]
-        
-        self.performance_metrics.update({
-            "avg_response_time": sum(response_times) / len(response_times),
-            "min_response_time": min(response_times),
-            "max_response_time": max(response_times),
-            "throughput": len(response_times) / (sum(response_times) / 60) if sum(response_times) > 0 else 0
-        })
-        
-        return self.performance_metrics
     
     def generate_lab_report(self) -> Dict[str, Any]:
         """Gera relatório completo do laboratório"""
@@ -209,8 +478,9 @@ class MemoryMetrics:
         report = {
             "timestamp": timestamp,
             "lab_objective": "Provar através de métricas a solução de memória de longo prazo",
-            "total_queries": len(self.query_history),
-            "successful_queries": len([q for q in self.query_history if q["success"]]),
+            "total_queries": self._total_queries,
+            "successful_queries": self._successful_queries,
+            "sampled_queries": len(self.query_history),
             "lab_metrics": lab_metrics,
             "performance_metrics": performance_metrics,
             "solution_validation": solution_validation,
@@ -267,57 +537,28 @@ class MemoryMetrics:
             return "Insuficiente - Solução precisa de melhorias significativas"
     
     def _analyze_queries(self) -> Dict[str, Any]:
-        """Analisa padrões nas queries"""
-        if not self.query_history:
-            return {}
-        
-        # Análise por sessão
-        session_analysis = {}
-        for query in self.query_history:
-            session_id = query["session_id"]
-            if session_id not in session_analysis:
+        """Analisa padrões nas queries a partir dos contadores por sessão"""
+        with self._lock:
+            if not self._total_queries:
+                return {}
+            
+            session_analysis = {}
+            for session_id, counters in self._sessions.items():
                 session_analysis[session_id] = {
-                    "total_queries": 0,
-                    "memory_used_count": 0,
-                    "avg_response_time": 0.0
+                    "total_queries": counters["total_queries"],
+                    "memory_used_count": counters["memory_used_count"],
+                    "avg_response_time": (
+                        counters["response_time_sum"] / counters["successful_queries"]
+                        if counters["successful_queries"] else 0.0
+                    ),
+                    "memory_usage_rate": (counters["memory_used_count"] / counters["total_queries"]) * 100,
                 }
             
-            session_analysis[session_id]["total_queries"] += 1
-            if query["memory_used"]:
-                session_analysis[session_id]["memory_used_count"] += 1
-        
-        # Calcula médias por sessão
-        for session_data in session_analysis.values():
-            if session_data["total_queries"] > 0:
-                session_data["memory_usage_rate"] = (
-                    session_data["memory_used_count"] / session_data["total_queries"]
-                ) * 100
-        
-        return {
-            "total_sessions": len(session_analysis),
-            "session_analysis": session_analysis,
-            "query_patterns": self._identify_query_patterns()
-        }
-    
-    def _identify_query_patterns(self) -> Dict[str, Any]:
-        """Identifica padrões nas queries"""
-        patterns = {
-            "information_queries": 0,  # Queries que pedem informações
-            "memory_test_queries": 0,  # Queries que testam memória
-            "conversation_queries": 0,  # Queries conversacionais
-        }
-        
-        for query in self.query_history:
-            query_text = query["query"].lower()
-            
-            if any(word in query_text for word in ["qual", "onde", "quando", "quem", "como"]):
-                patterns["information_queries"] += 1
-            elif any(word in query_text for word in ["lembra", "lembro", "você disse", "mencionou"]):
-                patterns["memory_test_queries"] += 1
-            else:
-                patterns["conversation_queries"] += 1
-        
-        return patterns
+            return {
+                "total_sessions": len(session_analysis),
+                "session_analysis": session_analysis,
+                "query_patterns": dict(self._query_patterns)
+            }
     
     def _generate_recommendations(self, lab_metrics: Dict[str, float]) -> List[str]:
         """Gera recomendações baseadas nas métricas"""
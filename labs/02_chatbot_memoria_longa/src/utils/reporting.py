@@ -4,15 +4,28 @@ Relatórios para o laboratório de chatbot com memória de longo prazo
 """
 
 import json
-import statistics
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from pathlib import Path
 
+import numpy as np
+
 from src.utils.metrics import MemoryMetricsCollector, OverallMetrics, SessionMetrics
 
+def _stats(values: np.ndarray) -> Dict[str, float]:
+    """Mínimo, máximo, mediana e desvio padrão amostral de uma coluna"""
+    if values.size == 0:
+        return {"min": 0, "max": 0, "median": 0, "std_dev": 0}
+    return {
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "median": float(np.median(values)),
+        "std_dev": float(values.std(ddof=1)) if values.size > 1 else 0
+    }
+
+
 class MemoryReportGenerator:
-    """Gerador de relatórios para métricas de memória"""
+    """Gerador de relatórios para métricas de memória (vetorizado sobre as colunas do coletor)"""
     
     def __init__(self, output_dir: str = "reports"):
         self.output_dir = Path(output_dir)
@@ -31,21 +44,20 @@ class MemoryReportGenerator:
         overall_metrics = metrics_collector.calculate_overall_metrics()
         
         # Calcula métricas específicas de retenção
-        memory_metrics = [m for m in metrics_collector.metrics if m.memory_context_used]
+        columns = metrics_collector.columns()
+        memory_used = columns["memory_context_used"]
+        context_lengths = columns["memory_context_length"][memory_used]
         retention_analysis = {
-            "total_memory_usage": len(memory_metrics),
-            "total_queries": len(metrics_collector.metrics),
+            "total_memory_usage": int(np.count_nonzero(memory_used)),
+            "total_queries": len(metrics_collector),
             "retention_rate": overall_metrics.overall_memory_retention,
-            "avg_memory_context_length": statistics.mean([m.memory_context_length for m in memory_metrics]) if memory_metrics else 0,
+            "avg_memory_context_length": float(context_lengths.mean()) if context_lengths.size else 0,
             "memory_utilization_rate": overall_metrics.memory_utilization_rate
         }
         
-        # Análise por sessão
+        # Análise por sessão (agregada em uma passada)
         session_retention = {}
-        session_ids = list(set(m.session_id for m in metrics_collector.metrics))
-        
-        for session_id in session_ids:
-            session_metric = metrics_collector.calculate_session_metrics(session_id)
+        for session_id, session_metric in metrics_collector.calculate_all_session_metrics().items():
             session_retention[session_id] = {
                 "memory_retention_rate": session_metric.memory_retention_rate,
                 "total_memory_contexts_used": session_metric.total_memory_contexts_used,
@@ -77,10 +89,7 @@ class MemoryReportGenerator:
         
         # Análise de coerência por sessão
         session_coherence = {}
-        session_ids = list(set(m.session_id for m in metrics_collector.metrics))
-        
-        for session_id in session_ids:
-            session_metric = metrics_collector.calculate_session_metrics(session_id)
+        for session_id, session_metric in metrics_collector.calculate_all_session_metrics().items():
             session_coherence[session_id] = {
                 "context_coherence_score": session_metric.context_coherence_score,
                 "avg_confidence": session_metric.avg_confidence,
@@ -89,7 +98,7 @@ class MemoryReportGenerator:
             }
         
         # Análise temporal de coerência
-        temporal_analysis = self._analyze_temporal_coherence(metrics_collector.metrics)
+        temporal_analysis = self._analyze_temporal_coherence(metrics_collector.columns())
         
         report = {
             "report_type": "context_coherence",
@@ -115,39 +124,32 @@ class MemoryReportGenerator:
         overall_metrics = metrics_collector.calculate_overall_metrics()
         
         # Análise de performance
-        response_times = [m.response_time for m in metrics_collector.metrics]
-        tokens_used = [m.tokens_used for m in metrics_collector.metrics]
-        confidences = [m.confidence for m in metrics_collector.metrics]
+        columns = metrics_collector.columns()
+        tokens_stats = _stats(columns["tokens_used"])
+        confidence_stats = _stats(columns["confidence"])
         
         performance_analysis = {
             "avg_response_time": overall_metrics.avg_response_time,
-            "response_time_stats": {
-                "min": min(response_times) if response_times else 0,
-                "max": max(response_times) if response_times else 0,
-                "median": statistics.median(response_times) if response_times else 0,
-                "std_dev": statistics.stdev(response_times) if len(response_times) > 1 else 0
-            },
+            "response_time_stats": _stats(columns["response_time"]),
             "avg_tokens_used": overall_metrics.avg_tokens_used,
             "tokens_stats": {
-                "min": min(tokens_used) if tokens_used else 0,
-                "max": max(tokens_used) if tokens_used else 0,
-                "median": statistics.median(tokens_used) if tokens_used else 0,
-                "total": sum(tokens_used)
+                "min": tokens_stats["min"],
+                "max": tokens_stats["max"],
+                "median": tokens_stats["median"],
+                "total": int(columns["tokens_used"].sum())
             },
             "avg_confidence": overall_metrics.avg_confidence,
             "confidence_stats": {
-                "min": min(confidences) if confidences else 0,
-                "max": max(confidences) if confidences else 0,
-                "median": statistics.median(confidences) if confidences else 0
-            }
+                "min": confidence_stats["min"],
+                "max": confidence_stats["max"],
+                "median": confidence_stats["median"]
+            },
+            "token_breakdown": self._analyze_token_breakdown(columns)
         }
         
         # Análise de performance por sessão
         session_performance = {}
-        session_ids = list(set(m.session_id for m in metrics_collector.metrics))
-        
-        for session_id in session_ids:
-            session_metric = metrics_collector.calculate_session_metrics(session_id)
+        for session_id, session_metric in metrics_collector.calculate_all_session_metrics().items():
             session_performance[session_id] = {
                 "avg_response_time": session_metric.avg_response_time,
                 "avg_tokens_used": session_metric.avg_tokens_used,
@@ -165,6 +167,39 @@ class MemoryReportGenerator:
         
         return report
     
+    def _analyze_token_breakdown(self, columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """
+        Tokens de prompt e de resposta, participação de cada segmento do
+        prompt e vazão em tokens por minuto (janela entre a primeira e a
+        última query registradas)
+        """
+        prompt_total = int(columns["prompt_tokens"].sum())
+        completion_total = int(columns["completion_tokens"].sum())
+        queries = columns["prompt_tokens"].size
+        
+        segments = {}
+        for segment in ("system", "context", "memory", "user", "overhead"):
+            total = int(columns[f"{segment}_tokens"].sum())
+            segments[segment] = {
+                "total": total,
+                "avg": total / queries if queries else 0.0,
+                "share": total / prompt_total if prompt_total else 0.0
+            }
+        
+        timestamps = columns["timestamp"]
+        elapsed = float(timestamps.max() - timestamps.min()) if queries > 1 else 0.0
+        if elapsed <= 0:
+            elapsed = float(columns["response_time"].sum())
+        
+        return {
+            "prompt_tokens": prompt_total,
+            "completion_tokens": completion_total,
+            "avg_prompt_tokens": prompt_total / queries if queries else 0.0,
+            "avg_completion_tokens": completion_total / queries if queries else 0.0,
+            "segments": segments,
+            "tokens_per_minute": (prompt_total + completion_total) / elapsed * 60 if elapsed > 0 else 0.0
+        }
+    
     def generate_comprehensive_report(self, metrics_collector: MemoryMetricsCollector) -> Dict[str, Any]:
         """
         Gera relatório abrangente
@@ -183,7 +218,7 @@ class MemoryReportGenerator:
         performance_report = self.generate_performance_report(metrics_collector)
         
         # Análise de correlação
-        correlation_analysis = self._analyze_correlations(metrics_collector.metrics)
+        correlation_analysis = self._analyze_correlations(metrics_collector.columns())
         
         # Score geral do sistema
         system_score = self._calculate_system_score(overall_metrics)
@@ -235,30 +270,59 @@ class MemoryReportGenerator:
         
         return filepath
     
-    def _analyze_temporal_coherence(self, metrics: List) -> Dict[str, Any]:
-        """Analisa coerência temporal"""
-        # Agrupa por timestamp (simplificado)
+    def _analyze_temporal_coherence(self, columns: Dict[str, np.ndarray], bucket_seconds: int = 60,
+                                    max_buckets: int = 120) -> Dict[str, Any]:
+        """Analisa coerência temporal agrupando as queries em janelas de tempo"""
+        timestamps = columns["timestamp"]
+        if timestamps.size == 0:
+            return {"analysis_type": "temporal_coherence", "buckets": []}
+        
+        buckets, inverse = np.unique((timestamps // bucket_seconds).astype(np.int64), return_inverse=True)
+        counts = np.bincount(inverse)
+        memory_rate = np.bincount(inverse, weights=columns["memory_context_used"]) / counts
+        avg_confidence = np.bincount(inverse, weights=columns["confidence"]) / counts
+        avg_response_time = np.bincount(inverse, weights=columns["response_time"]) / counts
+        
+        # Apenas as janelas mais recentes entram no relatório
+        recent = slice(max(0, buckets.size - max_buckets), buckets.size)
         return {
             "analysis_type": "temporal_coherence",
-            "note": "Análise temporal simplificada - em produção implementar análise mais detalhada"
+            "bucket_seconds": bucket_seconds,
+            "total_buckets": int(buckets.size),
+            "buckets": [
+                {
+                    "start": datetime.fromtimestamp(int(bucket) * bucket_seconds).isoformat(),
+                    "queries": int(count),
+                    "memory_usage_rate": float(rate),
+                    "avg_confidence": float(confidence),
+                    "avg_response_time": float(response_time)
+                }
+                for bucket, count, rate, confidence, response_time in zip(
+                    buckets[recent], counts[recent], memory_rate[recent],
+                    avg_confidence[recent], avg_response_time[recent]
+                )
+            ],
+            "memory_usage_trend": float(np.polyfit(np.arange(buckets.size), memory_rate, 1)[0]) if buckets.size > 1 else 0.0
         }
     
-    def _analyze_correlations(self, metrics: List) -> Dict[str, Any]:
+    @staticmethod
+    def _correlation(x: np.ndarray, y: np.ndarray) -> float:
+        """Correlação de Pearson (0.0 quando uma das séries é constante)"""
+        if x.size < 2 or x.std() == 0 or y.std() == 0:
+            return 0.0
+        return float(np.corrcoef(x, y)[0, 1])
+    
+    def _analyze_correlations(self, columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
         """Analisa correlações entre métricas"""
-        if len(metrics) < 2:
+        if columns["confidence"].size < 2:
             return {"note": "Dados insuficientes para análise de correlação"}
         
-        # Correlação entre confiança e uso de memória
-        confidences = [m.confidence for m in metrics]
-        memory_usage = [1 if m.memory_context_used else 0 for m in metrics]
-        
-        try:
-            correlation = statistics.correlation(confidences, memory_usage)
-        except:
-            correlation = 0.0
-        
+        memory_usage = columns["memory_context_used"].astype(np.float64)
         return {
-            "confidence_memory_correlation": correlation,
+            "confidence_memory_correlation": self._correlation(columns["confidence"], memory_usage),
+            "response_time_context_length_correlation": self._correlation(
+                columns["response_time"], columns["memory_context_length"].astype(np.float64)
+            ),
             "note": "Correlação entre confiança e uso de memória"
         }
     
@@ -267,7 +331,9 @@ class MemoryReportGenerator:
         # Score baseado em múltiplos fatores
         memory_score = overall_metrics.overall_memory_retention * 0.3
         coherence_score = overall_metrics.overall_context_coherence * 0.3
-        performance_score = min(1.0, 3.0 / overall_metrics.avg_response_time) * 0.2
+        performance_score = (
+            min(1.0, 3.0 / overall_metrics.avg_response_time) if overall_metrics.avg_response_time > 0 else 1.0
+        ) * 0.2
         utilization_score = overall_metrics.memory_utilization_rate * 0.2
         
         total_score = memory_score + coherence_score + performance_score + utilization_score
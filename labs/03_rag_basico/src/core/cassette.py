@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Gravação e reprodução (cassete) das chamadas ao LLM e aos embeddings.
+
+No modo "record" cada chamada vai à API e o par requisição/resposta é gravado
+com a latência observada; no modo "replay" as respostas saem do cassete, sem
+rede nem credenciais, opcionalmente reproduzindo a latência gravada
+(latency_scale = 1.0) ou uma fração dela. Assim, mudanças de desempenho no
+código Python podem ser medidas de forma repetível.
+
+O cassete é um arquivo JSON Lines comprimido com gzip; os vetores de
+embedding são gravados em float32 codificado em base64.
+
+Author: AI Labs
+Version: 1.0.0
+"""
+
+import time
+import gzip
+import json
+import base64
+import atexit
+import asyncio
+import hashlib
+import logging
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMissError(KeyError):
+    """Chamada sem gravação correspondente no modo replay"""
+
+
+class Cassette:
+    """Armazena as interações gravadas, indexadas pelo hash da requisição"""
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 0.0,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Inicializa o cassete
+
+        Args:
+            path: Arquivo do cassete (.jsonl.gz)
+            mode: "record" (chama a API e grava) ou "replay" (responde do arquivo)
+            latency_scale: Fração da latência gravada reproduzida no replay (0 = sem espera)
+            logger: Logger opcional
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Modo de cassete inválido: {mode}")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._recorded = set()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        if self.path.exists():
+            self._load()
+        elif mode == "replay":
+            raise FileNotFoundError(f"Cassete não encontrado: {self.path}")
+
+        if mode == "record":
+            atexit.register(self.save)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @staticmethod
+    def make_key(kind: str, payload: Dict[str, Any]) -> str:
+        """Hash estável da requisição"""
+        raw = json.dumps({"kind": kind, **payload}, ensure_ascii=False, sort_keys=True,
+                         separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        self.logger.info(f"Cassete carregado: {self.path} ({len(self._entries)} requisições)")
+
+    def lookup(self, key: str) -> Dict[str, Any]:
+        """
+        Resposta gravada para a chave
+
+        Requisições repetidas recebem as respostas na ordem em que foram
+        gravadas; depois da última, a última se repete.
+
+        Raises:
+            CassetteMissError: Se a requisição não foi gravada
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMissError(f"Requisição não gravada no cassete {self.path} ({key[:12]})")
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            self.hits += 1
+            return entries[min(index, len(entries) - 1)]
+
+    def record(self, key: str, kind: str, response: Any, latency: float):
+        """Grava uma resposta (a primeira gravação da chave nesta execução substitui as antigas)"""
+        entry = {"key": key, "kind": kind, "latency": round(latency, 6), "response": response}
+        with self._lock:
+            if key not in self._recorded:
+                self._recorded.add(key)
+                self._entries[key] = []
+            self._entries[key].append(entry)
+            self._dirty = True
+
+    def replay_delay(self, entry: Dict[str, Any]) -> float:
+        """Espera a reproduzir para a entrada"""
+        return entry.get("latency", 0.0) * self.latency_scale
+
+    def save(self):
+        """Grava o cassete em disco (no modo record, também ao encerrar o processo)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                for entries in self._entries.values():
+                    for entry in entries:
+                        f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+            tmp_path.replace(self.path)
+            self._dirty = False
+        self.logger.info(f"Cassete salvo: {self.path} ({len(self._entries)} requisições)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas de uso do cassete"""
+        return {
+            "path": str(self.path),
+            "mode": self.mode,
+            "requests": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+def _encode_vector(vector: List[float]) -> str:
+    return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+
+def _decode_vector(data: str) -> List[float]:
+    values = array("f")
+    values.frombytes(base64.b64decode(data))
+    return values.tolist()
+
+
+class CassetteChatModel(BaseChatModel):
+    """Modelo de chat que grava ou reproduz as chamadas de outro modelo"""
+
+    inner: Any = None  # Modelo real (None no replay)
+    cassette: Any = None
+    model_key: str = ""  # Nome do modelo que entra na chave
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def _key(self, messages: List[BaseMessage], stop: Optional[List[str]]) -> str:
+        return Cassette.make_key("chat", {
+            "model": self.model_key,
+            "temperature": float(self.temperature),
+            "stop": stop,
+            "messages": [[message.type, message.content] for message in messages]
+        })
+
+    @staticmethod
+    def _serialize(message: BaseMessage) -> Dict[str, Any]:
+        return {
+            "content": message.content,
+            "usage_metadata": getattr(message, "usage_metadata", None),
+            "response_metadata": getattr(message, "response_metadata", None) or {}
+        }
+
+    @staticmethod
+    def _result(response: Dict[str, Any]) -> ChatResult:
+        fields = {"content": response["content"], "response_metadata": response.get("response_metadata") or {}}
+        if response.get("usage_metadata"):
+            fields["usage_metadata"] = response["usage_metadata"]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(**fields))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = self._key(messages, stop)
+        if self.cassette.recording:
+            start = time.perf_counter()
+            message = self.inner.invoke(messages, stop=stop, **kwargs)
+            self.cassette.record(key, "chat", self._serialize(message), time.perf_counter() - start)
+            return self._result(self._serialize(message))
+
+        entry = self.cassette.lookup(key)
+        delay = self.cassette.replay_delay(entry)
+        if delay > 0:
+            time.sleep(delay)
+        return self._result(entry["response"])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = self._key(messages, stop)
+        if self.cassette.recording:
+            start = time.perf_counter()
+            message = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+            self.cassette.record(key, "chat", self._serialize(message), time.perf_counter() - start)
+            return self._result(self._serialize(message))
+
+        entry = self.cassette.lookup(key)
+        delay = self.cassette.replay_delay(entry)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._result(entry["response"])
+
+    def get_num_tokens(self, text: str) -> int:
+        if self.inner is not None:
+            return self.inner.get_num_tokens(text)
+        return len(text.split())
+
+    def get_num_tokens_from_messages(self, messages: List[BaseMessage], *args: Any, **kwargs: Any) -> int:
+        if self.inner is not None:
+            return self.inner.get_num_tokens_from_messages(messages, *args, **kwargs)
+        return sum(self.get_num_tokens(str(message.content)) for message in messages)
+
+
+class CassetteEmbeddings(Embeddings):
+    """
+    Embeddings que gravam ou reproduzem as chamadas de outros embeddings
+
+    Cada texto é gravado separadamente (com a latência do lote dividida entre
+    os textos), então o replay independe de como os textos foram agrupados.
+    """
+
+    def __init__(self, inner: Optional[Embeddings], cassette: Cassette, model_key: str = "embeddings"):
+        self.inner = inner
+        self.cassette = cassette
+        self.model_key = model_key
+
+    def _key(self, text: str) -> str:
+        return Cassette.make_key("embedding", {"model": self.model_key, "text": text})
+
+    def _record(self, texts: List[str], vectors: List[List[float]], latency: float):
+        per_text = latency / max(len(texts), 1)
+        for text, vector in zip(texts, vectors):
+            self.cassette.record(self._key(text), "embedding", _encode_vector(vector), per_text)
+
+    def _replay(self, texts: List[str]):
+        entries = [self.cassette.lookup(self._key(text)) for text in texts]
+        delay = sum(self.cassette.replay_delay(entry) for entry in entries)
+        return [_decode_vector(entry["response"]) for entry in entries], delay
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cassette.recording:
+            start = time.perf_counter()
+            vectors = self.inner.embed_documents(texts)
+            self._record(texts, vectors, time.perf_counter() - start)
+            return vectors
+
+        vectors, delay = self._replay(texts)
+        if delay > 0:
+            time.sleep(delay)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cassette.recording:
+            start = time.perf_counter()
+            vectors = await self.inner.aembed_documents(texts)
+            self._record(texts, vectors, time.perf_counter() - start)
+            return vectors
+
+        vectors, delay = self._replay(texts)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def load_cassette(config: Dict[str, Any], logger: Optional[logging.Logger] = None) -> Optional[Cassette]:
+    """
+    Abre o cassete configurado
+
+    Args:
+        config: Configurações com cassette_mode, cassette_path e cassette_latency_scale
+        logger: Logger opcional
+
+    Returns:
+        Cassete ou None com cassette_mode = "off"
+    """
+    mode = config.get("cassette_mode", "off")
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"CASSETTE_MODE inválido: {mode} (use {', '.join(CASSETTE_MODES)})")
+    if mode == "off":
+        return None
+    return Cassette(
+        config.get("cassette_path", "cassettes/cassette.jsonl.gz"),
+        mode=mode,
+        latency_scale=config.get("cassette_latency_scale", 0.0),
+        logger=logger
+    )
@@ -28,6 +28,9 @@ from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from sentence_transformers import CrossEncoder
 
+from .cassette import CassetteChatModel, CassetteEmbeddings, load_cassette
+from ..utils.tracing import RequestScope, Span
+
 @dataclass
 class QueryContext:
     """Contexto da query para prompt engineering dinâmico."""
@@ -71,27 +74,40 @@ class RAGSystem:
             self.logger.warning(f"Cross-Encoder não disponível: {e}")
             self.cross_encoder = None
         
-        # 2. LLM para query expansion
+        # 2. Cassete de gravação/reprodução (no replay não há chamadas à API)
+        self.cassette = load_cassette(self.config, self.logger)
+        live = self.cassette is None or self.cassette.recording
+        
+        # 3. LLM para query expansion
         self.llm = ChatOpenAI(
             model=self.config["model_name"],
             temperature=self.config.get("temperature", 0.3),
             api_key=self.config["openai_api_key"]
-        )
+        ) if live else None
+        
+        # 4. Embeddings para busca vetorial
+        self.embeddings = OpenAIEmbeddings() if live else None
         
-        # 3. Embeddings para busca vetorial
-        self.embeddings = OpenAIEmbeddings()
+        if self.cassette is not None:
+            self.llm = CassetteChatModel(
+                inner=self.llm,
+                cassette=self.cassette,
+                model_key=self.config["model_name"],
+                temperature=self.config.get("temperature", 0.3)
+            )
+            self.embeddings = CassetteEmbeddings(self.embeddings, self.cassette)
         
-        # 4. Text splitter otimizado
+        # 5. Text splitter otimizado
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.config.get("chunk_size", 300),
             chunk_overlap=self.config.get("chunk_overlap", 100),
             separators=["\n\n", "\n", ". ", "! ", "? ", "; ", ", ", " ", ""]
         )
         
-        # 5. Configura vetorstore
+        # 6. Configura vetorstore
         self._setup_vectorstore()
         
-        # 6. Prompt templates
+        # 7. Prompt templates
         self._setup_prompt_templates()
     
     def _setup_vectorstore(self):
@@ -413,33 +429,50 @@ class RAGSystem:
         """
         Processa uma query usando o sistema RAG simplificado.
         
+        Os logs da query levam o mesmo request_id (incluído no resultado) e
+        cada estágio registra um span com a duração.
+        
         Args:
             query: Query do usuário
             
         Returns:
             Dict com resultado do processamento
         """
+        with RequestScope(self.logger, "process_query") as scope:
+            result = self._process_query(query)
+            if not result["success"]:
+                scope.status = "error"
+        result["request_id"] = scope.request_id
+        return result
+    
+    def _process_query(self, query: str) -> Dict[str, Any]:
+        """Processa a query dentro do escopo da requisição (ver process_query)."""
         start_time = time.time()
         
         try:
             # Analisa contexto da query
-            query_context = self._analyze_query_context(query)
+            with Span(self.logger, "query_analysis"):
+                query_context = self._analyze_query_context(query)
             
             # Expande query
-            expanded_queries = self._expand_query(query)
+            with Span(self.logger, "query_expansion"):
+                expanded_queries = self._expand_query(query)
             
             # Busca documentos com scores reais
-            documents, similarity_scores = self._retrieve_documents_with_similarity(expanded_queries)
+            with Span(self.logger, "retrieval"):
+                documents, similarity_scores = self._retrieve_documents_with_similarity(expanded_queries)
             
             # Re-ranking semântico com scores reais
             if self.config.get("use_semantic_reranking", True) and documents:
-                documents, final_scores = self._rerank_documents(query, documents)
+                with Span(self.logger, "rerank"):
+                    documents, final_scores = self._rerank_documents(query, documents)
             else:
                 final_scores = similarity_scores
             
             # Calcula métricas REAIS
-            context_recall = self._calculate_context_recall(query, documents, final_scores)
-            precision = self._calculate_precision(query, documents, final_scores)
+            with Span(self.logger, "metrics"):
+                context_recall = self._calculate_context_recall(query, documents, final_scores)
+                precision = self._calculate_precision(query, documents, final_scores)
             
             if documents:
                 # Combina contexto dos documentos
@@ -453,9 +486,10 @@ class RAGSystem:
                 prompt = self.prompt_templates[template_type]
                 
                 # Gera resposta
-                response = self.llm.invoke(
-                    prompt.format(context=context, question=query)
-                )
+                with Span(self.logger, "generation"):
+                    response = self.llm.invoke(
+                        prompt.format(context=context, question=query)
+                    )
                 
                 answer = response.content
                 documents_used = len(documents)
@@ -35,7 +35,7 @@ def load_config() -> Dict[str, Any]:
         Dict[str, Any]: Configurações do sistema
         
     Raises:
-        ValueError: Se OPENAI_API_KEY não for encontrada em modo não-teste
+        ValueError: Se OPENAI_API_KEY não for encontrada fora do modo de teste e do replay do cassete
     """
     config = {
         "openai_api_key": os.getenv("OPENAI_API_KEY"),
@@ -62,15 +62,21 @@ def load_config() -> Dict[str, Any]:
         # Modo de teste
         "test_mode": os.getenv("TEST_MODE", "false").lower() == "true",
         
+        # Cassete de gravação/reprodução do LLM e dos embeddings (off, record ou replay)
+        "cassette_mode": os.getenv("CASSETTE_MODE", "off").lower(),
+        "cassette_path": os.getenv("CASSETTE_PATH", "cassettes/rag.jsonl.gz"),
+        "cassette_latency_scale": float(os.getenv("CASSETTE_LATENCY_SCALE", "0")),
+        
         # Configurações de logging e relatórios
         "log_level": os.getenv("LOG_LEVEL", "INFO"),
+        "log_format": os.getenv("LOG_FORMAT", "text").lower(),
         "log_file": "logs/rag_system.log",
         "metrics_file": "metrics/rag_metrics.json",
         "reports_dir": "reports"
     }
     
-    # Se estiver em modo de teste, não requer API key
-    if not config["test_mode"] and not config["openai_api_key"]:
+    # Em modo de teste ou no replay do cassete, não requer API key
+    if not config["test_mode"] and config["cassette_mode"] != "replay" and not config["openai_api_key"]:
         raise ValueError("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
     
     # Tenta carregar configuração personalizada
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Logging não bloqueante: fila em memória + thread de escrita.
+
+A thread da requisição só enfileira o registro (QueueHandler); a formatação
+(JSON), a escrita em arquivo e o console ficam na thread do QueueListener.
+A escrita é feita em lotes: o arquivo só recebe flush quando a fila esvazia
+ou a cada batch_size registros. O arquivo é rotacionado por tamanho e, se a
+fila encher, novos registros são descartados (e contados) em vez de bloquear
+a requisição.
+
+Author: AI Labs
+Version: 2.0.0
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List
+
+# Padrões da configuração de logging
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 200
+
+class BatchingRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler que não faz flush a cada registro.
+
+    O tamanho do arquivo é contado pelos bytes escritos (sem stream.tell() a
+    cada registro); ao passar de max_bytes o arquivo é rotacionado
+    (app.log -> app.log.1 ...).
+    """
+
+    def __init__(self, filename: str, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                 batch_size: int = LOG_BATCH_SIZE, encoding: str = "utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.batch_size = batch_size
+        self._pending = 0
+        self._bytes = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            data = self.format(record) + self.terminator
+            size = len(data.encode(self.encoding or "utf-8"))
+            if self.maxBytes > 0 and self._bytes > 0 and self._bytes + size > self.maxBytes:
+                self.doRollover()
+                self._bytes = 0
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(data)
+            self._bytes += size
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self._pending = 0
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler que descarta o registro quando a fila está cheia (nunca bloqueia)."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener que faz flush dos handlers quando a fila esvazia."""
+
+    def handle(self, record: logging.LogRecord):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+# Listeners ativos por nome de logger (parados no encerramento do processo)
+_listeners: Dict[str, BatchingQueueListener] = {}
+
+def attach_queue_handlers(logger: logging.Logger, handlers: List[logging.Handler],
+                          queue_size: int = LOG_QUEUE_SIZE) -> DroppingQueueHandler:
+    """
+    Conecta os handlers ao logger através de uma fila com thread de escrita.
+
+    Handlers existentes do logger (e um listener anterior com o mesmo nome)
+    são removidos para evitar duplicação.
+
+    Args:
+        logger: Logger a configurar
+        handlers: Handlers executados na thread do listener
+        queue_size: Capacidade da fila (registros além disso são descartados)
+
+    Returns:
+        QueueHandler instalado no logger (dropped = registros descartados)
+    """
+    stop_queue_listener(logger.name)
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+
+    listener = BatchingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[logger.name] = listener
+    return queue_handler
+
+def stop_queue_listener(name: str):
+    """Esvazia a fila, grava o que falta e encerra o listener do logger."""
+    listener = _listeners.pop(name, None)
+    if listener is None:
+        return
+    listener.stop()
+    logger = logging.getLogger(name)
+    dropped = sum(getattr(handler, "dropped", 0) for handler in logger.handlers)
+    for handler in listener.handlers:
+        if dropped:
+            handler.handle(logger.makeRecord(
+                name, logging.WARNING, __file__, 0,
+                f"{dropped} registros de log descartados (fila cheia)", None, None,
+                func="stop_queue_listener"
+            ))
+        handler.flush()
+        handler.close()
+
+@atexit.register
+def _stop_all_listeners():
+    for name in list(_listeners):
+        try:
+            stop_queue_listener(name)
+        except Exception as e:
+            print(f"Erro ao encerrar logging: {e}", file=sys.stderr)
@@ -3,23 +3,74 @@
 Configuração de logging para o sistema RAG básico
 """
 
+import json
 import logging
+import os
 import sys
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+from .log_queue import (
+    BatchingRotatingFileHandler, attach_queue_handlers,
+    LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE
+)
+from .tracing import RequestContextFilter, ExcludeSpanEvents
+
+# Atributos padrão do LogRecord; os demais vieram de extra={...}
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "taskName"}
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formatter para logs em formato JSON (mesmo formato dos labs 01 e 02).
+    
+    Campos passados em extra={...} (ex.: request_id, span_id, event) viram
+    campos do JSON.
+    """
+    
+    def format(self, record):
+        log_entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno
+        }
+        
+        # Campos extras (ex.: request_id, span_id, event)
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in log_entry:
+                log_entry[key] = value
+        
+        return json.dumps(log_entry, ensure_ascii=False, default=str)
+
 def setup_logging(
     log_file: str = "logs/rag_system.log",
     log_level: str = "INFO",
-    logger_name: Optional[str] = None
+    logger_name: Optional[str] = None,
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUP_COUNT,
+    queue_size: int = LOG_QUEUE_SIZE,
+    log_format: Optional[str] = None
 ) -> logging.Logger:
     """
     Configura o sistema de logging
     
+    O logger só enfileira os registros; formatação e escrita (arquivo e
+    console) rodam na thread do QueueListener, em lotes (ver log_queue).
+    Cada registro recebe o request_id e o span_id do contexto (ver tracing);
+    no formato JSON o arquivo também recebe os eventos de span.
+    
     Args:
         log_file: Caminho do arquivo de log
         log_level: Nível de log (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         logger_name: Nome do logger (opcional)
+        max_bytes: Tamanho máximo do arquivo antes da rotação (0 = sem rotação)
+        backup_count: Arquivos rotacionados mantidos
+        queue_size: Capacidade da fila; com a fila cheia os registros são descartados
+        log_format: "text" ou "json" no arquivo (padrão: LOG_FORMAT ou "text")
     
     Returns:
         Logger configurado
@@ -32,12 +83,8 @@ def setup_logging(
     logger = logging.getLogger(logger_name or __name__)
     logger.setLevel(getattr(logging, log_level.upper()))
     
-    # Remove handlers existentes para evitar duplicação
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # Handler para arquivo
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    # Handler para arquivo (rotação por tamanho, escrita em lotes)
+    file_handler = BatchingRotatingFileHandler(log_file, max_bytes=max_bytes, backup_count=backup_count)
     file_handler.setLevel(getattr(logging, log_level.upper()))
     
     # Handler para console
@@ -50,12 +97,19 @@ def setup_logging(
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     
-    file_handler.setFormatter(formatter)
+    if (log_format or os.getenv("LOG_FORMAT", "text")).lower() == "json":
+        file_handler.setFormatter(JSONFormatter())
+    else:
+        file_handler.setFormatter(formatter)
+        file_handler.addFilter(ExcludeSpanEvents())
     console_handler.setFormatter(formatter)
+    console_handler.addFilter(ExcludeSpanEvents())
+    
+    # Fila entre o logger e os handlers (remove handlers existentes para evitar duplicação)
+    queue_handler = attach_queue_handlers(logger, [file_handler, console_handler], queue_size=queue_size)
     
-    # Adiciona handlers ao logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # request_id/span_id lidos na thread da requisição, antes de enfileirar
+    queue_handler.addFilter(RequestContextFilter())
     
     return logger
 